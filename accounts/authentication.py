@@ -0,0 +1,148 @@
+"""
+Token authentication remembering the users of recently used tokens.
+
+DRF's TokenAuthentication selects the token and its user on every request.
+CachingTokenAuthentication keeps them for LOCAL_TTL seconds in the memory of
+each worker and, when SHARED names an alias of CACHES, for SHARED_TTL seconds
+in that cache. Deleting a token, as a logout does, or saving its user evicts
+it from the shared cache and from the memory of the worker doing it. Other
+workers notice once their LOCAL_TTL ran out, so it is kept short.
+"""
+import hashlib
+import pickle
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from blockchain.cache import DjangoCache, LocalLRUCache
+from blockchain.metrics import span
+
+
+class TokenCache:
+    """
+    Users and creation times of tokens, pickled so every request gets its own
+    copy of the user. Keys are hashed, tokens are never stored in clear.
+    """
+
+    def __init__(self, local, local_ttl, shared=None, shared_ttl=0):
+        self.local = local
+        self.local_ttl = local_ttl
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self._lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _count(self, field, n=1):
+        with self._lock:
+            self._stats[field] += n
+
+    def _key(self, token):
+        return 'token:' + hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        """(user, created) of token, None if it is not cached."""
+        key = self._key(token)
+        value = self.local.get(key) if self.local_ttl > 0 else None
+        if value is not None:
+            self._count('local_hits')
+            return pickle.loads(value)
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self._count('shared_hits')
+                if self.local_ttl > 0:
+                    self.local.set(key, value, self.local_ttl)
+                return pickle.loads(value)
+        self._count('misses')
+        return None
+
+    def set(self, token, user, created):
+        key, value = self._key(token), pickle.dumps((user, created))
+        if self.local_ttl > 0:
+            self.local.set(key, value, self.local_ttl)
+        if self.shared is not None:
+            self.shared.set(key, value, self.shared_ttl)
+
+    def evict(self, tokens):
+        for token in tokens:
+            key = self._key(token)
+            self.local.delete(key)
+            if self.shared is not None:
+                self.shared.delete(key)
+            self._count('evictions')
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        return {**stats, 'local': self.local.info(),
+                'shared': self.shared.info() if self.shared is not None else None}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """Return the process wide token cache configured by TOKEN_AUTH_CACHE, None if it is disabled."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = settings.TOKEN_AUTH_CACHE
+                shared = DjangoCache(config['SHARED']) if config['SHARED'] and config['SHARED_TTL'] > 0 else None
+                _cache = TokenCache(LocalLRUCache(config['LOCAL_MAX_BYTES']), config['LOCAL_TTL'],
+                                    shared, config['SHARED_TTL'])
+    if _cache.local_ttl <= 0 and _cache.shared is None:
+        return None
+    return _cache
+
+
+def reset_token_cache():
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+class CachingTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication looking the token up in the token cache first."""
+
+    def authenticate_credentials(self, key):
+        with span('auth'):
+            cache = get_token_cache()
+            cached = cache.get(key) if cache is not None else None
+            if cached is None:
+                user, token = super().authenticate_credentials(key)
+                if cache is not None:
+                    cache.set(key, user, token.created)
+                return user, token
+            user, created = cached
+            if not user.is_active:
+                raise exceptions.AuthenticationFailed('User inactive or deleted.')
+            return user, Token(key=key, user=user, created=created)
+
+
+@receiver(post_delete, sender=Token)
+def _evict_deleted_token(instance, **kwargs):
+    cache = get_token_cache()
+    if cache is not None:
+        cache.evict([instance.key])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def _evict_saved_user(instance, **kwargs):
+    # Deleted users take their tokens with them, evicted one by one above.
+    cache = get_token_cache()
+    if cache is not None:
+        cache.evict(Token.objects.filter(user=instance).values_list('key', flat=True))
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    if setting == 'TOKEN_AUTH_CACHE':
+        reset_token_cache()
@@ -0,0 +1,58 @@
+"""
+Password hashers with the work factors of PASSWORD_HASHING.
+
+They keep the algorithm names of Django's hashers, so existing hashes keep
+verifying and are rehashed with the configured work factor on the next login.
+Work factors below the floors are refused rather than silently accepted.
+Hashes are computed on the hashing pool of accounts.hashing.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.exceptions import ImproperlyConfigured
+
+from accounts.hashing import get_hashing_pool
+
+# OWASP's minimum for argon2id is 19 MiB and 2 passes, PBKDF2-SHA256 is kept
+# above 100000 iterations.
+MIN_ITERATIONS = 100000
+MIN_ARGON2_TIME_COST = 2
+MIN_ARGON2_MEMORY_COST = 19 * 1024
+
+
+def _at_least(value, floor, name):
+    if value < floor:
+        raise ImproperlyConfigured(f"PASSWORD_HASHING {name} must be at least {floor}, got {value}.")
+    return value
+
+
+class PooledHasherMixin:
+    """Hashes on the hashing pool, HashingBusy when it is full."""
+
+    def encode(self, password, salt, *args):
+        return get_hashing_pool().run(super().encode, password, salt, *args)
+
+    def verify(self, password, encoded):
+        return get_hashing_pool().run(super().verify, password, encoded)
+
+
+class PBKDF2PasswordHasher(PooledHasherMixin, hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return _at_least(settings.PASSWORD_HASHING['ITERATIONS'], MIN_ITERATIONS, 'ITERATIONS')
+
+
+class Argon2PasswordHasher(PooledHasherMixin, hashers.Argon2PasswordHasher):
+    """Argon2id, needs the argon2-cffi package."""
+
+    @property
+    def time_cost(self):
+        return _at_least(settings.PASSWORD_HASHING['ARGON2_TIME_COST'], MIN_ARGON2_TIME_COST, 'ARGON2_TIME_COST')
+
+    @property
+    def memory_cost(self):
+        return _at_least(settings.PASSWORD_HASHING['ARGON2_MEMORY_COST'], MIN_ARGON2_MEMORY_COST,
+                         'ARGON2_MEMORY_COST')
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_HASHING['ARGON2_PARALLELISM']
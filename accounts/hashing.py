@@ -0,0 +1,113 @@
+"""
+Password hashing on a bounded pool of threads.
+
+Hashing a password costs tens of milliseconds of CPU. During a burst of
+registrations and logins every request worker could be busy hashing while
+searches wait. Hashes run on at most WORKERS threads per process instead,
+PBKDF2 and argon2 release the GIL so they do run in parallel, and at most
+QUEUE more wait for one. Requests beyond that, or waiting longer than
+TIMEOUT seconds, are refused with 503 rather than queued without bound.
+The hashers of accounts.hashers run their hashes here, so create_user and
+authenticate() keep working as they do.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import exceptions, status
+
+from blockchain.metrics import span
+
+
+class HashingBusy(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many logins and registrations in progress, try again shortly."
+    default_code = 'hashing_busy'
+
+
+# Marks the pool's threads, a hash started from one runs where it is.
+_local = threading.local()
+
+
+class HashingPool:
+    def __init__(self, workers=2, queue=32, timeout=5.0):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._lock = threading.Lock()
+        self._stats = {'hashed': 0, 'refused': 0, 'timed_out': 0}
+
+    def _count(self, field):
+        with self._lock:
+            self._stats[field] += 1
+
+    def run(self, fn, *args):
+        """Result of fn(*args) computed on the pool, HashingBusy when it is full or too slow."""
+        if getattr(_local, 'pooled', False):
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self._count('refused')
+            raise HashingBusy()
+        try:
+            future = self._executor.submit(self._call, fn, *args)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        with span('hash'):
+            try:
+                result = future.result(self.timeout)
+            except TimeoutError:
+                # Still queued it never starts, already running it finishes unobserved.
+                if future.cancel():
+                    self._slots.release()
+                self._count('timed_out')
+                raise HashingBusy()
+        self._count('hashed')
+        return result
+
+    def _call(self, fn, *args):
+        _local.pooled = True
+        try:
+            return fn(*args)
+        finally:
+            _local.pooled = False
+            self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    """Process wide pool configured by PASSWORD_HASHING."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = settings.PASSWORD_HASHING
+                _pool = HashingPool(config['WORKERS'], config['QUEUE'], config['TIMEOUT'])
+    return _pool
+
+
+def reset_hashing_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    if setting == 'PASSWORD_HASHING':
+        reset_hashing_pool()
+
@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import exceptions, status
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+from accounts.authentication import CachingTokenAuthentication, reset_token_cache
+
+SHARED = {**settings.TOKEN_AUTH_CACHE, 'LOCAL_TTL': 0, 'SHARED': 'default'}
+
+
+class TestCachingTokenAuthentication(TestCase):
+    def setUp(self):
+        reset_token_cache()
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.token = Token.objects.create(user=self.user)
+        self.key = self.token.key
+
+    def authenticate(self):
+        return CachingTokenAuthentication().authenticate_credentials(self.key)
+
+    def test_cached_token_needs_no_query(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+        self.assertEqual((user.pk, token.key, token.user_id), (self.user.pk, self.key, self.user.pk))
+
+    def test_deleted_token_is_evicted(self):
+        self.authenticate()
+        self.token.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    def test_saved_user_is_evicted(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(TOKEN_AUTH_CACHE=SHARED)
+    def test_shared_between_workers(self):
+        cache.clear()
+        self.authenticate()
+        reset_token_cache()
+        with self.assertNumQueries(0):
+            self.authenticate()
+        self.token.delete()
+        reset_token_cache()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(TOKEN_AUTH_CACHE={**settings.TOKEN_AUTH_CACHE, 'LOCAL_TTL': 0})
+    def test_disabled(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+
+class TestLogoutView(APITestCase):
+    def setUp(self):
+        reset_token_cache()
+        user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+
+    def test_token_stops_authenticating(self):
+        url = reverse("blockchain_api:past_searches")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        response = self.client.get(url)
+        self.assertIn('auth;dur=', response['Server-Timing'])
+        self.assertEqual(self.client.post(reverse("api_register:logout_view")).status_code,
+                         status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(Token.objects.count(), 0)
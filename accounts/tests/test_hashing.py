@@ -0,0 +1,107 @@
+import threading
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+from accounts.hashing import HashingBusy, HashingPool, get_hashing_pool
+
+FEWER_ITERATIONS = {**settings.PASSWORD_HASHING, 'ITERATIONS': 120000}
+
+
+class TestHashingPool(SimpleTestCase):
+    def test_full_pool_refuses(self):
+        pool = HashingPool(workers=1, queue=0, timeout=5)
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocked():
+            started.set()
+            release.wait(5)
+
+        thread = threading.Thread(target=pool.run, args=(blocked,))
+        thread.start()
+        started.wait(5)
+        with self.assertRaises(HashingBusy):
+            pool.run(len, 'x')
+        release.set()
+        thread.join()
+        self.assertEqual(pool.run(len, 'x'), 1)
+        self.assertEqual(pool.stats(), {'hashed': 2, 'refused': 1, 'timed_out': 0})
+        pool.shutdown()
+
+    def test_slow_hash_times_out(self):
+        pool = HashingPool(workers=1, queue=0, timeout=0.01)
+        release = threading.Event()
+        with self.assertRaises(HashingBusy):
+            pool.run(release.wait, 5)
+        release.set()
+        self.assertEqual(pool.stats()['timed_out'], 1)
+        pool.shutdown()
+
+    @override_settings(PASSWORD_HASHING={**settings.PASSWORD_HASHING, 'ITERATIONS': 1000})
+    def test_work_factor_floor(self):
+        with self.assertRaises(ImproperlyConfigured):
+            make_password('secret')
+
+
+class TestLogin(APITestCase):
+    def setUp(self):
+        self.url = reverse("accounts:login_view")
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.data = {'username': 'test', 'password': "passwordTesting.123"}
+
+    def test_authenticated_login_returns_token_without_hashing(self):
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+        with mock.patch('accounts.hashing.HashingPool.run') as run:
+            response = self.client.post(self.url, data=self.data)
+        run.assert_not_called()
+        self.assertEqual(response.json(), {'token': token.key})
+
+    def test_login_as_another_user_checks_the_password(self):
+        other = User.objects.create_user(username='other', password="passwordTesting.123")
+        self.client.force_authenticate(user=other)
+        response = self.client.post(self.url, data={**self.data, 'password': "wrong"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(PASSWORD_HASHING=FEWER_ITERATIONS)
+    def test_login_upgrades_work_factor(self):
+        response = self.client.post(self.url, data=self.data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$120000$'))
+        self.assertTrue(self.user.check_password("passwordTesting.123"))
+
+    def test_registration_and_login_hash_on_the_pool(self):
+        hashed = get_hashing_pool().stats()['hashed']
+        response = self.client.post(reverse("accounts:reg_view"), data={**self.data, 'username': 'new'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.post(self.url, data={**self.data, 'username': 'new'}).status_code,
+                         status.HTTP_200_OK)
+        self.assertEqual(get_hashing_pool().stats()['hashed'], hashed + 2)
+
+    def test_failed_login_goes_through_authenticate(self):
+        failed = []
+        user_login_failed.connect(lambda **kwargs: failed.append(kwargs['credentials']), weak=False,
+                                  dispatch_uid='test_failed_login')
+        self.addCleanup(user_login_failed.disconnect, dispatch_uid='test_failed_login')
+        response = self.client.post(self.url, data={**self.data, 'password': "wrong"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([credentials['username'] for credentials in failed], ['test'])
+
+    def test_inactive_user_cannot_log_in(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.post(self.url, data=self.data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_busy_pool_answers_503(self):
+        with mock.patch('accounts.hashing.HashingPool.run', side_effect=HashingBusy()):
+            response = self.client.post(self.url, data=self.data)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -1,12 +1,12 @@
 from django.urls import path
 from rest_framework.urlpatterns import format_suffix_patterns
-from rest_framework.authtoken.views import obtain_auth_token
 from . import views
 
 app_name = "accounts"
 urlpatterns = [
     path('register/', views.CreateUserView.as_view(), name="reg_view"),
-    path('login/', obtain_auth_token, name="login_view")
+    path('login/', views.LoginView.as_view(), name="login_view"),
+    path('logout/', views.LogoutView.as_view(), name="logout_view"),
 ]
 
 urlpatterns = format_suffix_patterns(urlpatterns)
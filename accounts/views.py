@@ -1,5 +1,9 @@
-from rest_framework import permissions
+from rest_framework import permissions, status
+from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.generics import CreateAPIView
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 
 from .serializers import UserSerializer
@@ -15,3 +19,32 @@ class CreateUserView(CreateAPIView):
         permissions.AllowAny
     ]
     serializer_class = UserSerializer
+
+
+class LoginView(ObtainAuthToken):
+    """
+    Login
+    Returns the token of the user. A request already authenticated, by its
+    token or session, gets its token back without checking the password again.
+    """
+
+    def post(self, request, *args, **kwargs):
+        username = request.data.get('username')
+        if request.user.is_authenticated and username in (None, '', request.user.get_username()):
+            token, _ = Token.objects.get_or_create(user=request.user)
+            return Response({'token': token.key})
+        return super().post(request, *args, **kwargs)
+
+
+class LogoutView(APIView):
+    """
+    Logout
+    Delete the token of the user, it stops authenticating at once.
+    """
+    permission_classes = [
+        permissions.IsAuthenticated
+    ]
+
+    def post(self, request, format=None):
+        Token.objects.filter(user=request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
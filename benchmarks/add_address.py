@@ -0,0 +1,81 @@
+"""
+Latency of marking an address as mine as a user's search history grows.
+
+Validation reads the one search summary row of the address, so it should
+not depend on the number of searches. The legacy row shows the scan of every search the
+serializer used to do, for reference.
+
+    python -m benchmarks.add_address --sizes 1000 10000 100000 --requests 200
+"""
+import argparse
+import time
+
+from benchmarks.common import Timer, create_user, print_table, setup_django, summarize
+
+
+def seed(user, start, stop):
+    from blockchain.models import SearchAddress
+    from blockchain.summaries import summarize as summarize_searches
+
+    summarize_searches(SearchAddress.objects.bulk_create(
+        [SearchAddress(user=user, address=f"1Seed{i:029d}", valid=i % 10 != 0) for i in range(start, stop)],
+        batch_size=5000,
+    ))
+
+
+def legacy_validate(user, address):
+    from blockchain.models import SearchAddress
+
+    return (address in [i.address for i in SearchAddress.objects.filter(user=user).all()] and
+            address in [i.address for i in SearchAddress.objects.filter(user=user, valid=True).all()])
+
+
+def run(client, user, size, requests):
+    from rest_framework.reverse import reverse
+    from blockchain.models import UserAddresses
+
+    url = reverse("blockchain_api:mine_addresses")
+    addresses = [f"1Seed{i:029d}" for i in range(1, size, max(1, size // requests)) if i % 10][:requests]
+
+    latencies = []
+    with Timer() as timer:
+        for address in addresses:
+            start = time.perf_counter()
+            response = client.post(url, data={'address': address})
+            assert response.status_code == 200, response.status_code
+            latencies.append(time.perf_counter() - start)
+    UserAddresses.objects.filter(user=user).delete()
+    rows = [summarize(f'indexed@{size}', latencies, timer.elapsed, searches=size)]
+
+    latencies = []
+    with Timer() as timer:
+        for address in addresses[:max(1, requests // 10)]:
+            start = time.perf_counter()
+            assert legacy_validate(user, address)
+            latencies.append(time.perf_counter() - start)
+    rows.append(summarize(f'legacy@{size}', latencies, timer.elapsed, searches=size))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='searches per user, ascending')
+    parser.add_argument('--requests', type=int, default=200, help='addresses marked per size')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+
+    user, token = create_user()
+    client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+    rows, seeded = [], 0
+    for size in sorted(args.sizes):
+        seed(user, seeded, size)
+        seeded = size
+        rows += run(client, user, size, args.requests)
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
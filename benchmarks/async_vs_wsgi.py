@@ -0,0 +1,88 @@
+"""
+Compare the WSGI and ASGI address search endpoints against a slow stub upstream.
+
+The WSGI path is driven by a pool of threads, like gthread workers, while the
+ASGI path runs every request on one event loop. Each request searches a
+different address, so neither the cache nor request coalescing hides the
+upstream latency.
+
+    python -m benchmarks.async_vs_wsgi --requests 2000 --latency 0.1
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import Timer, create_user, print_table, setup_django, summarize
+from blockchain.tests.stub_upstream import StubUpstream, stub_address
+
+
+def run_wsgi(url_for, token, requests, threads):
+    from django.test import Client
+
+    def one(i):
+        client = Client(HTTP_AUTHORIZATION=f"Token {token}")
+        start = time.perf_counter()
+        response = client.get(url_for(i))
+        assert response.status_code == 200, response.status_code
+        return time.perf_counter() - start
+
+    with Timer() as timer, ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(one, range(requests)))
+    return summarize('wsgi', latencies, timer.elapsed, concurrency=threads)
+
+
+def run_asgi(url_for, token, requests, concurrency):
+    from django.test import AsyncClient
+    from blockchain.providers import get_provider
+
+    async def main():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url_for(i), authorization=f"Token {token}")
+                assert response.status_code == 200, response.status_code
+                return time.perf_counter() - start
+
+        try:
+            return await asyncio.gather(*(one(i) for i in range(requests)))
+        finally:
+            await get_provider('BTC').async_client().aclose()
+
+    with Timer() as timer:
+        latencies = asyncio.run(main())
+    return summarize('asgi', latencies, timer.elapsed, concurrency=concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.1, help='stub upstream latency in seconds')
+    parser.add_argument('--threads', type=int, default=32, help='WSGI worker threads')
+    parser.add_argument('--concurrency', type=int, default=1000, help='ASGI in-flight requests')
+    args = parser.parse_args()
+
+    stub = StubUpstream(latency=args.latency).start()
+    setup_django(BTC_UPSTREAM_URL=stub.base_url, UPSTREAM_POOL_SIZE=args.threads,
+                 UPSTREAM_ASYNC_POOL_SIZE=args.concurrency, LOOKUP_CACHE_ADDRESS_TTL=0,
+                 RATE_LIMIT_SEARCH_RATE=0, RATE_LIMIT_BTC_UPSTREAM_RATE=0)
+    from rest_framework.reverse import reverse
+    _, token = create_user()
+
+    def url_for(prefix):
+        return lambda i: reverse(f"blockchain_api:{prefix}search_address", kwargs={'address': stub_address(i)})
+
+    rows = [
+        run_wsgi(url_for(''), token.key, args.requests, args.threads),
+        run_asgi(url_for('async_'), token.key, args.requests, args.concurrency),
+    ]
+    print(f"upstream latency {args.latency * 1000:.0f} ms, {stub.requests} upstream calls")
+    print_table(rows)
+    stub.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Throughput of marking addresses as mine and removing them, one call per
+address against the bulk endpoint.
+
+The single address rows only send --single requests and are extrapolated,
+at 10k addresses they would take minutes.
+
+    python -m benchmarks.bulk_addresses --addresses 10000 --single 500
+"""
+import argparse
+import time
+
+from benchmarks.common import Timer, create_user, print_table, setup_django, summarize
+
+
+def seed(user, count):
+    from blockchain.models import SearchAddress
+    from blockchain.summaries import summarize as summarize_searches
+
+    summarize_searches(SearchAddress.objects.bulk_create(
+        [SearchAddress(user=user, address=f"1Bulk{i:029d}") for i in range(count)], batch_size=5000))
+    return [f"1Bulk{i:029d}" for i in range(count)]
+
+
+def row(name, count, elapsed, queries, latencies=None):
+    return summarize(name, latencies or [elapsed], elapsed, addresses=count,
+                     addresses_s=round(count / elapsed, 1), queries=queries)
+
+
+def single(client, addresses):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.reverse import reverse
+
+    url = reverse("blockchain_api:mine_addresses")
+    rows = []
+    for method, expected in (('post', 200), ('delete', 204)):
+        latencies = []
+        with CaptureQueriesContext(connection) as queries, Timer() as timer:
+            for address in addresses:
+                start = time.perf_counter()
+                response = getattr(client, method)(url, data={'address': address}, content_type='application/json')
+                assert response.status_code == expected, response.status_code
+                latencies.append(time.perf_counter() - start)
+        rows.append(row(f'single {method}', len(addresses), timer.elapsed, len(queries), latencies))
+    return rows
+
+
+def bulk(client, addresses):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.reverse import reverse
+
+    url = reverse("blockchain_api:mine_addresses_bulk")
+    rows = []
+    for method, field in (('post', 'created'), ('delete', 'removed')):
+        with CaptureQueriesContext(connection) as queries, Timer() as timer:
+            response = getattr(client, method)(url, data={'addresses': addresses}, content_type='application/json')
+        assert response.status_code == 200, response.status_code
+        assert response.json()[field] == len(addresses), response.json()['failed']
+        rows.append(row(f'bulk {method}', len(addresses), timer.elapsed, len(queries)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--addresses', type=int, default=10000, help='addresses per bulk request')
+    parser.add_argument('--single', type=int, default=500, help='addresses sent one request each')
+    args = parser.parse_args()
+
+    # Throttling and the metrics log would dominate the single address calls.
+    setup_django(RATE_LIMIT_BACKEND='local', METRICS_LOG=0)
+    from django.test import Client
+
+    user, token = create_user()
+    addresses = seed(user, args.addresses)
+    client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+    rows = single(client, addresses[:args.single]) + bulk(client, addresses)
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import time
+
+
+def setup_django(**environ):
+    """
+    Configure Django for a benchmark run against a throwaway SQLite file.
+    environ overrides the variables nexchange.settings reads.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nexchange.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('ALLOWED_HOSTS', 'testserver 127.0.0.1 localhost')
+    os.environ.update({key: str(value) for key, value in environ.items()})
+
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    django.setup()
+    handle, path = tempfile.mkstemp(suffix='.sqlite3', prefix='nexchange-bench-')
+    os.close(handle)
+    settings.DATABASES['default']['NAME'] = path
+    call_command('migrate', verbosity=0)
+    return path
+
+
+def create_user(username='bench'):
+    from django.contrib.auth.models import User
+    from rest_framework.authtoken.models import Token
+
+    user = User.objects.create_user(username=username, password='benchmarkPassword.1')
+    return user, Token.objects.create(user=user)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(name, latencies, elapsed, **extra):
+    row = {
+        'name': name,
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+    row.update(extra)
+    return row
+
+
+def print_table(rows):
+    if not rows:
+        return
+    columns = list(rows[0])
+    for row in rows[1:]:
+        columns += [c for c in row if c not in columns]
+    widths = {c: max(len(c), *(len(str(r.get(c, ''))) for r in rows)) for c in columns}
+    print('  '.join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print('  '.join(str(row.get(c, '')).ljust(widths[c]) for c in columns))
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,117 @@
+"""
+Write concurrency of SQLite with Django's defaults against the tuned profile.
+
+Writer threads log searches one row per transaction, like unbuffered search
+logging, checking first whether the address was searched before, like the
+local index does. Reader threads page through the search history meanwhile. The default
+profile uses a rollback journal and a 5 second lock timeout, the tuned one
+write ahead logging, the pragmas of nexchange.database, immediate
+transactions and a longer timeout.
+Each profile runs on its own copy of a freshly migrated database.
+
+    python -m benchmarks.db_concurrency --writers 8 --readers 8 --seconds 5
+"""
+import argparse
+import os
+import shutil
+import threading
+import time
+
+from benchmarks.common import create_user, percentile, print_table, setup_django
+
+PROFILES = {
+    'default': {'OPTIONS': {'timeout': 5}, 'PRAGMAS': {}},
+    'tuned': {'OPTIONS': {'timeout': 20, 'transaction_mode': 'IMMEDIATE'}, 'PRAGMAS': None},
+}
+
+
+def configure(path, profile):
+    from django.conf import settings
+    from django.db import connections
+    from nexchange.database import SQLITE_PRAGMAS
+
+    connections.close_all()
+    database = settings.DATABASES['default']
+    database['NAME'] = path
+    database['OPTIONS'] = dict(profile['OPTIONS'])
+    database['PRAGMAS'] = SQLITE_PRAGMAS if profile['PRAGMAS'] is None else profile['PRAGMAS']
+
+
+def run(name, user, writers, readers, seconds):
+    from django.db import OperationalError, connections, transaction
+    from blockchain.models import SearchAddress
+
+    stop = threading.Event()
+    results = {'write': [], 'read': [], 'locked': 0}
+    lock = threading.Lock()
+
+    def worker(kind, n):
+        latencies, locked = [], 0
+        try:
+            i = 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    if kind == 'write':
+                        address = f"1Write{n:04d}{i:024d}"
+                        with transaction.atomic():
+                            if not SearchAddress.objects.filter(user=user, address=address).exists():
+                                SearchAddress.objects.create(user=user, address=address)
+                    else:
+                        list(SearchAddress.objects.filter(user=user).order_by('-timestamp')[:20])
+                except OperationalError:
+                    locked += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+                i += 1
+        finally:
+            connections.close_all()
+        with lock:
+            results[kind] += latencies
+            results['locked'] += locked
+
+    threads = [threading.Thread(target=worker, args=('write', n)) for n in range(writers)] + \
+        [threading.Thread(target=worker, args=('read', n)) for n in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {
+        'name': name,
+        'writes_s': round(len(results['write']) / seconds, 1),
+        'write_p50_ms': round(percentile(results['write'], 50) * 1000, 2),
+        'write_p99_ms': round(percentile(results['write'], 99) * 1000, 2),
+        'reads_s': round(len(results['read']) / seconds, 1),
+        'read_p99_ms': round(percentile(results['read'], 99) * 1000, 2),
+        'locked': results['locked'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--writers', type=int, default=8, help='threads logging searches')
+    parser.add_argument('--readers', type=int, default=8, help='threads reading the history')
+    parser.add_argument('--seconds', type=float, default=5.0, help='duration per profile')
+    args = parser.parse_args()
+
+    # Migrated without pragmas, WAL mode would stick to the file of the default profile.
+    migrated = setup_django(SQLITE_TUNED=0, DATABASE_CONN_MAX_AGE=0)
+    user, _ = create_user()
+    rows = []
+    for name, profile in PROFILES.items():
+        path = f'{migrated}.{name}'
+        shutil.copy(migrated, path)
+        configure(path, profile)
+        try:
+            rows.append(run(name, user, args.writers, args.readers, args.seconds))
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
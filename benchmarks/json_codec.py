@@ -0,0 +1,78 @@
+"""
+Throughput of decoding upstream bodies and rendering API responses.
+
+Decoding is measured on the recorded blockchain.info fixtures and on
+generated address bodies, rendering on the parsed address as the search view
+returns it. The stdlib rows are the codecs used before blockchain.fastjson.
+
+    python -m benchmarks.json_codec --txs 10 1000 10000 --seconds 1
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+from benchmarks.common import print_table, setup_django
+from blockchain.tests.stub_upstream import FIXTURES, address_payload, stub_address
+
+
+def measure(name, func, arg, size, seconds):
+    """Call func(arg) for about seconds and report its throughput."""
+    runs, start = 0, time.perf_counter()
+    while True:
+        func(arg)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            break
+    return {'name': name, 'kb': round(size / 1024, 1), 'ops': round(runs / elapsed, 1),
+            'mb_s': round(runs * size / elapsed / 2 ** 20, 1)}
+
+
+def compare(rows, label, size, seconds, stdlib, fast, arg):
+    baseline = measure(f'{label}/stdlib', stdlib, arg, size, seconds)
+    optimized = measure(f'{label}/fastjson', fast, arg, size, seconds)
+    optimized['speedup'] = round(optimized['ops'] / baseline['ops'], 2)
+    rows += [baseline, optimized]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--txs', type=int, nargs='+', default=[10, 1000, 10000],
+                        help='transactions of the generated address bodies')
+    parser.add_argument('--seconds', type=float, default=1.0, help='time spent per row')
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer as DRFJSONRenderer
+    from blockchain import fastjson
+    from blockchain.api.renderers import JSONRenderer
+    from blockchain.providers import get_provider
+
+    print(f"orjson: {'yes' if fastjson.orjson is not None else 'not installed, stdlib fallback'}")
+    bodies = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, '*', '*.json'))):
+        with open(path, 'rb') as fixture:
+            name = os.path.basename(os.path.dirname(path)) + '/' + os.path.basename(path)[:8]
+            bodies.append((name, fixture.read()))
+    for n_tx in args.txs:
+        address = stub_address(n_tx)
+        bodies.append((f'rawaddr@{n_tx}', json.dumps(address_payload(address, n_tx=n_tx)).encode()))
+
+    rows = []
+    for label, body in bodies:
+        compare(rows, f'decode {label}', len(body), args.seconds, json.loads, fastjson.loads, body)
+
+    provider = get_provider('BTC')
+    drf, fast = DRFJSONRenderer(), JSONRenderer()
+    for n_tx in args.txs:
+        address = stub_address(n_tx)
+        data = provider.parse_address(address_payload(address, n_tx=n_tx), address)
+        size = len(drf.render(data))
+        compare(rows, f'render address@{n_tx}', size, args.seconds, drf.render, fast.render, data)
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
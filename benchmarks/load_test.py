@@ -0,0 +1,122 @@
+"""
+Load test of the API endpoints a user goes through, against the stub upstream.
+
+Every virtual user registers and logs in, then repeats a session of an
+address and a transaction search, reading the past searches, marking the
+searched address as mine and reading the balance. Each endpoint reports its
+throughput, latency percentiles, failed requests and database queries per
+request, so a regression shows up as a changed number. Rate limits are off,
+the run measures the endpoints and not the budgets.
+
+    python -m benchmarks.load_test --users 8 --sessions 25 --latency 0.05 --error-rate 0.01 --output run.json
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import Timer, print_table, setup_django, summarize
+from blockchain.tests.stub_upstream import StubUpstream, stub_address
+
+ENDPOINTS = ['register', 'login', 'search_address', 'search_transaction', 'past_searches', 'mark_as_mine',
+             'balance']
+
+
+class Samples:
+    """Latency, query count and outcome of every request, per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(int)
+        self.failed = defaultdict(int)
+
+    def add(self, endpoint, latency, queries, ok):
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            self.queries[endpoint] += queries
+            self.failed[endpoint] += not ok
+
+    def rows(self, elapsed):
+        rows = []
+        for endpoint in ENDPOINTS:
+            latencies = self.latencies[endpoint]
+            rows.append(summarize(endpoint, latencies, elapsed, failed=self.failed[endpoint],
+                                  queries=round(self.queries[endpoint] / len(latencies), 2) if latencies else 0))
+        every = [latency for endpoint in ENDPOINTS for latency in self.latencies[endpoint]]
+        rows.append(summarize('total', every, elapsed, failed=sum(self.failed.values()),
+                              queries=round(sum(self.queries.values()) / len(every), 2) if every else 0))
+        return rows
+
+
+def call(samples, endpoint, method, url, **data):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = method(url, data=data or None)
+        latency = time.perf_counter() - start
+    samples.add(endpoint, latency, len(queries), 200 <= response.status_code < 300)
+    return response
+
+
+def virtual_user(number, sessions, samples):
+    from django.db import connection
+    from rest_framework.reverse import reverse
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    # Errors are counted as failed requests, such as SQLite lock timeouts under concurrent writes.
+    client.raise_request_exception = False
+    credentials = {'username': f'load{number}', 'password': 'loadTestPassword.1'}
+    call(samples, 'register', client.post, reverse("api_register:reg_view"), **credentials)
+    response = call(samples, 'login', client.post, reverse("api_register:login_view"), **credentials)
+    client.credentials(HTTP_AUTHORIZATION=f"Token {response.json()['token']}")
+    try:
+        for i in range(sessions):
+            address = stub_address(number * sessions + i)
+            transaction = hashlib.sha256(address.encode()).hexdigest()
+            call(samples, 'search_address', client.get,
+                 reverse("blockchain_api:search_address", kwargs={'address': address}))
+            call(samples, 'search_transaction', client.get,
+                 reverse("blockchain_api:search_transaction", kwargs={'transaction': transaction}))
+            call(samples, 'past_searches', client.get, reverse("blockchain_api:past_searches"))
+            call(samples, 'mark_as_mine', client.post, reverse("blockchain_api:mine_addresses"), address=address)
+            call(samples, 'balance', client.get, reverse("blockchain_api:balance"))
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=8, help='virtual users, each on its own thread')
+    parser.add_argument('--sessions', type=int, default=25, help='sessions per virtual user')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds the stub upstream takes to answer')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of failing upstream requests')
+    parser.add_argument('--txs', type=int, default=2, help='transactions per stub address')
+    parser.add_argument('--output', help='also write the rows as JSON to compare runs')
+    args = parser.parse_args()
+
+    stub = StubUpstream(latency=args.latency, error_rate=args.error_rate, txs=args.txs, seed=0).start()
+    setup_django(BTC_UPSTREAM_URL=stub.base_url, UPSTREAM_POOL_SIZE=args.users, RATE_LIMIT_BACKEND='local',
+                 RATE_LIMIT_SEARCH_RATE=0, RATE_LIMIT_BALANCE_RATE=0, RATE_LIMIT_UPSTREAM_RATE=0,
+                 RATE_LIMIT_BTC_UPSTREAM_RATE=0)
+
+    samples = Samples()
+    with Timer() as timer, ThreadPoolExecutor(max_workers=args.users) as pool:
+        list(pool.map(lambda number: virtual_user(number, args.sessions, samples), range(args.users)))
+    rows = samples.rows(timer.elapsed)
+    print_table(rows)
+    print(f"upstream requests: {stub.requests}, upstream errors: {stub.errors}, elapsed: {timer.elapsed:.2f}s")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=1)
+    stub.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Latency of opening and completing orders as the number of marked addresses grows.
+
+Most addresses of the user already serve an open order, the worst case for
+finding a free one. Allocation reads the free pool through an index, so it
+should not depend on the number of addresses or open orders. The legacy row
+shows the scan of all addresses against all open orders, for reference.
+Opening an order also looks up what its address received so far, on the
+stub upstream.
+
+    python -m benchmarks.order_allocation --sizes 100 1000 10000 100000 --requests 200
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import Timer, create_user, print_table, setup_django, summarize
+from blockchain.tests.stub_upstream import StubUpstream, stub_address
+
+
+def seed(user, start, stop, free_ratio):
+    from blockchain.models import UserAddresses
+    from orders.models import Order
+
+    free_every = max(1, int(1 / free_ratio))
+    UserAddresses.objects.bulk_create(
+        [UserAddresses(user=user, address=stub_address(i), allocated=i % free_every != 0)
+         for i in range(start, stop)],
+        batch_size=5000,
+    )
+    # SQLite does not return the ids of bulk created rows.
+    allocated = UserAddresses.objects.filter(user=user, allocated=True, orders__isnull=True)
+    Order.objects.bulk_create(
+        [Order(user=user, amount=1, chain='BTC', deposit_address=a.address, address=a) for a in allocated],
+        batch_size=5000,
+    )
+
+
+def legacy_free_address(user):
+    from blockchain.models import UserAddresses
+    from orders.models import Order
+
+    taken = {o.deposit_address for o in Order.objects.filter(user=user, status=Order.OPEN)}
+    return next(a for a in UserAddresses.objects.filter(user=user) if a.address not in taken)
+
+
+def run(client, user, size, requests, threads):
+    from rest_framework.reverse import reverse
+
+    url = reverse("orders_api:orders")
+
+    def one(_):
+        start = time.perf_counter()
+        response = client.post(url, data={'amount': 1000})
+        assert response.status_code == 201, response.status_code
+        order = response.json()['id']
+        response = client.post(reverse("orders_api:complete_order", kwargs={'pk': order}))
+        assert response.status_code == 200, response.status_code
+        return time.perf_counter() - start
+
+    with Timer() as timer, ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(one, range(requests)))
+    rows = [summarize(f'pool@{size}', latencies, timer.elapsed, addresses=size, threads=threads)]
+
+    latencies = []
+    with Timer() as timer:
+        for _ in range(max(1, requests // 20)):
+            start = time.perf_counter()
+            legacy_free_address(user)
+            latencies.append(time.perf_counter() - start)
+    rows.append(summarize(f'legacy@{size}', latencies, timer.elapsed, addresses=size, threads=1))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000],
+                        help='marked addresses per user, ascending')
+    parser.add_argument('--requests', type=int, default=200, help='orders opened and completed per size')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--free-ratio', type=float, default=0.1, help='share of addresses not serving an order')
+    args = parser.parse_args()
+
+    stub = StubUpstream().start()
+    setup_django(BTC_UPSTREAM_URL=stub.base_url, UPSTREAM_POOL_SIZE=args.threads, RATE_LIMIT_BACKEND='local',
+                 RATE_LIMIT_UPSTREAM_RATE=0, RATE_LIMIT_BTC_UPSTREAM_RATE=0)
+    from rest_framework.test import APIClient
+
+    user, token = create_user()
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    rows, seeded = [], 0
+    for size in sorted(args.sizes):
+        seed(user, seeded, size, args.free_ratio)
+        seeded = size
+        rows += run(client, user, size, args.requests, args.threads)
+    print_table(rows)
+    stub.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Registrations and logins per second, and per core, of the hashing profiles.
+
+Client threads register new users, then log them in with their password.
+The reused row logs in requests already authenticated by their token, which
+get it back without hashing. Rates per core divide by the cores the threads
+could use, the hashing pool has as many workers as there are client threads.
+
+    python -m benchmarks.password_hashing --threads 4 --seconds 5
+"""
+import argparse
+import itertools
+import os
+import threading
+import time
+
+from benchmarks.common import print_table, setup_django, summarize
+
+PROFILES = {
+    'pbkdf2_260k': {'HASHER': 'pbkdf2_sha256', 'ITERATIONS': 260000},
+    'pbkdf2_120k': {'HASHER': 'pbkdf2_sha256', 'ITERATIONS': 120000},
+    'argon2_19m': {'HASHER': 'argon2', 'ARGON2_MEMORY_COST': 19 * 1024, 'ARGON2_TIME_COST': 2},
+}
+
+
+def hammer(threads, seconds, request):
+    """Latencies of request(client, n) called in a loop by threads for seconds."""
+    from django.db import connections
+    from django.test import Client
+
+    stop = threading.Event()
+    latencies, lock = [], threading.Lock()
+    counter = itertools.count()
+
+    def worker():
+        client, own = Client(), []
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                response = request(client, next(counter))
+                assert response.status_code in (200, 201), response.status_code
+                own.append(time.perf_counter() - start)
+        finally:
+            connections.close_all()
+        with lock:
+            latencies.extend(own)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in pool:
+        thread.join()
+    return latencies
+
+
+def run(name, profile, threads, seconds, cores):
+    from django.conf import settings
+    from django.test.utils import override_settings
+    from rest_framework.reverse import reverse
+
+    hashers = {
+        'pbkdf2_sha256': ['accounts.hashers.PBKDF2PasswordHasher', 'accounts.hashers.Argon2PasswordHasher'],
+        'argon2': ['accounts.hashers.Argon2PasswordHasher', 'accounts.hashers.PBKDF2PasswordHasher'],
+    }[profile['HASHER']]
+    hashing = {**settings.PASSWORD_HASHING, **profile, 'WORKERS': threads, 'QUEUE': threads}
+    register, login = reverse("accounts:reg_view"), reverse("accounts:login_view")
+    password = 'benchmarkPassword.1'
+    rows = []
+    with override_settings(PASSWORD_HASHING=hashing, PASSWORD_HASHERS=hashers):
+        users = hammer(threads, seconds, lambda client, n: client.post(
+            register, {'username': f'{name}-{n}', 'password': password}))
+        registered = len(users)
+        rows.append(summarize(f'{name} register', users, seconds))
+        rows.append(summarize(f'{name} login', hammer(threads, seconds, lambda client, n: client.post(
+            login, {'username': f'{name}-{n % registered}', 'password': password})), seconds))
+    for row in rows:
+        row['per_core'] = round(row['rps'] / cores, 1)
+    return rows
+
+
+def run_reused(threads, seconds, cores):
+    from rest_framework.authtoken.models import Token
+    from rest_framework.reverse import reverse
+    from benchmarks.common import create_user
+
+    user, token = create_user('reused')
+    url = reverse("accounts:login_view")
+    latencies = hammer(threads, seconds, lambda client, n: client.post(
+        url, {'username': 'reused'}, HTTP_AUTHORIZATION=f"Token {token.key}"))
+    assert Token.objects.filter(user=user).count() == 1
+    row = summarize('reused token login', latencies, seconds)
+    row['per_core'] = round(row['rps'] / cores, 1)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=4, help='concurrent clients')
+    parser.add_argument('--seconds', type=float, default=5.0, help='duration per measurement')
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES))
+    args = parser.parse_args()
+
+    setup_django()
+    cores = min(args.threads, os.cpu_count() or 1)
+    rows = []
+    for name in args.profiles:
+        if PROFILES[name]['HASHER'] == 'argon2':
+            try:
+                import argon2  # noqa: F401
+            except ImportError:
+                print(f"Skipped {name}, argon2-cffi is not installed.")
+                continue
+        rows += run(name, PROFILES[name], args.threads, args.seconds, cores)
+    rows.append(run_reused(args.threads, args.seconds, cores))
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
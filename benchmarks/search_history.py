@@ -0,0 +1,76 @@
+"""
+Past searches and address marking as the same addresses are searched over and over.
+
+A user searches --addresses addresses --repeats times each. The history row
+pages through the whole history, the mark row validates every address.
+rows_read is the summary rows they read, one per address however many
+searches were logged.
+
+    python -m benchmarks.search_history --addresses 100 --repeats 1 100 1000
+"""
+import argparse
+import time
+
+from benchmarks.common import Timer, create_user, print_table, setup_django, summarize
+
+
+def seed(user, addresses, repeats):
+    from blockchain.models import SearchAddress
+    from blockchain.summaries import summarize as summarize_searches
+
+    for _ in range(repeats):
+        summarize_searches(SearchAddress.objects.bulk_create(
+            [SearchAddress(user=user, address=address) for address in addresses], batch_size=5000))
+
+
+def run(client, user, addresses, searches):
+    from rest_framework.reverse import reverse
+    from blockchain.api.serializers import UserAddressesSerializer
+    from blockchain.models import SearchSummary
+
+    rows_read = SearchSummary.objects.filter(user=user).count()
+    latencies = []
+    with Timer() as timer:
+        url = reverse("blockchain_api:past_searches") + '?page_size=100'
+        while url:
+            start = time.perf_counter()
+            response = client.get(url)
+            assert response.status_code == 200, response.status_code
+            latencies.append(time.perf_counter() - start)
+            url = response.json()['next']
+    rows = [summarize(f'history@{searches}', latencies, timer.elapsed, searches=searches, rows_read=rows_read)]
+
+    latencies = []
+    with Timer() as timer:
+        for address in addresses:
+            start = time.perf_counter()
+            assert UserAddressesSerializer(data={'user': user.id, 'address': address}).is_valid()
+            latencies.append(time.perf_counter() - start)
+    rows.append(summarize(f'mark@{searches}', latencies, timer.elapsed, searches=searches,
+                          rows_read=len(addresses)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--addresses', type=int, default=100, help='distinct addresses searched')
+    parser.add_argument('--repeats', type=int, nargs='+', default=[1, 100, 1000],
+                        help='searches per address, ascending')
+    args = parser.parse_args()
+
+    setup_django(SEARCH_LOG_BUFFERED=0)
+    from django.test import Client
+
+    user, token = create_user()
+    client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+    addresses = [f"1Hist{i:029d}" for i in range(args.addresses)]
+    rows, seeded = [], 0
+    for repeats in sorted(args.repeats):
+        seed(user, addresses, repeats - seeded)
+        seeded = repeats
+        rows += run(client, user, addresses, args.addresses * repeats)
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Cost of the local address and transaction checks made before upstream calls.
+
+Each row checks one input repeatedly, first without the memo, then through
+it. Compare with the milliseconds of an upstream round trip.
+
+    python -m benchmarks.validation --number 20000
+"""
+import argparse
+
+from benchmarks.common import Timer, print_table
+
+INPUTS = [
+    ('garbage', 'BTC', "test123"),
+    ('base58check', 'BTC', "1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1F"),
+    ('bech32', 'BTC', "bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq"),
+    ('bech32m', 'BTC', "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqzk5jj0"),
+    ('cashaddr', 'BCH', "bitcoincash:qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6a"),
+    ('eip55', 'ETH', "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed"),
+    ('bad checksum', 'BTC', "1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1G"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=20000, help='checks per input')
+    args = parser.parse_args()
+
+    from blockchain.validation import is_valid_address
+
+    rows = []
+    for name, chain, address in INPUTS:
+        check = is_valid_address.__wrapped__
+        with Timer() as cold:
+            for _ in range(args.number):
+                valid = check(address, chain)
+        is_valid_address(address, chain)
+        with Timer() as memo:
+            for _ in range(args.number):
+                is_valid_address(address, chain)
+        rows.append({'name': name, 'valid': valid, 'check_us': round(cold.elapsed / args.number * 1e6, 2),
+                     'memo_us': round(memo.elapsed / args.number * 1e6, 2)})
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Marking many addresses as mine, or removing them, in one call.
+
+Addresses are checked a chunk at a time with set based queries, so a list
+costs a few queries per CHUNK_SIZE addresses instead of a few per address.
+Each address gets a result in the order of the request, the errors are the
+ones of the single address endpoints.
+"""
+from blockchain.models import SearchSummary, UserAddresses
+from blockchain.versions import ADDRESSES, bump
+
+# Below the 999 parameters older SQLite versions accept in a query.
+CHUNK_SIZE = 900
+
+ALREADY_MARKED = "Address is already marked as mine."
+NOT_SEARCHED = "Address has not been searched"
+INVALID = "Invalid active address"
+DUPLICATE = "Address is repeated in the request."
+NOT_FOUND = "Not found."
+ALLOCATED = "Address is the deposit address of an open order."
+
+
+def _chunks(items):
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+def _unique(addresses, results):
+    """Addresses in order without repeats, repeats get their error in results."""
+    seen = {}
+    for i, address in enumerate(addresses):
+        if address in seen:
+            results[i] = {'address': address, 'errors': [DUPLICATE]}
+        else:
+            seen[address] = None
+    return list(seen)
+
+
+def _report(addresses, results, errors, success):
+    for i, address in enumerate(addresses):
+        if results[i] is None:
+            error = errors.get(address)
+            results[i] = {'address': address, 'errors': [error]} if error else {'address': address, success: True}
+    done = sum(1 for result in results if success in result)
+    return {success: done, 'failed': len(results) - done, 'results': results}
+
+
+def mark_addresses(user, addresses):
+    """Mark the searched addresses of user as mine, like UserAddressesSerializer one at a time."""
+    results = [None] * len(addresses)
+    errors, new = {}, []
+    for chunk in _chunks(_unique(addresses, results)):
+        marked = set(UserAddresses.objects.filter(user=user, address__in=chunk).values_list('address', flat=True))
+        # Valid as of the latest search, like in the single address validation.
+        searched = dict(SearchSummary.objects.filter(user=user, address__in=chunk).values_list('address', 'valid'))
+        for address in chunk:
+            if address in marked:
+                errors[address] = ALREADY_MARKED
+            elif address not in searched:
+                errors[address] = NOT_SEARCHED
+            elif not searched[address]:
+                errors[address] = INVALID
+            else:
+                new.append(UserAddresses(user=user, address=address))
+    # Addresses marked concurrently since are skipped by the unique constraint.
+    UserAddresses.objects.bulk_create(new, batch_size=CHUNK_SIZE, ignore_conflicts=True)
+    if new:
+        bump([user.id], ADDRESSES)
+    return _report(addresses, results, errors, 'created')
+
+
+def unmark_addresses(user, addresses):
+    """Remove addresses of user that are not the deposit address of an open order."""
+    results = [None] * len(addresses)
+    errors = {}
+    for chunk in _chunks(_unique(addresses, results)):
+        allocated = dict(UserAddresses.objects.filter(user=user, address__in=chunk)
+                         .values_list('address', 'allocated'))
+        removable = [address for address, flag in allocated.items() if not flag]
+        # Conditional, an order may be allocating one of them right now.
+        _, deleted = UserAddresses.objects.filter(user=user, address__in=removable, allocated=False).delete()
+        if deleted.get(UserAddresses._meta.label, 0) < len(removable):
+            for address in UserAddresses.objects.filter(user=user, address__in=removable) \
+                    .values_list('address', flat=True):
+                allocated[address] = True
+        for address in chunk:
+            if address not in allocated:
+                errors[address] = NOT_FOUND
+            elif allocated[address]:
+                errors[address] = ALLOCATED
+    report = _report(addresses, results, errors, 'removed')
+    if report['removed']:
+        bump([user.id], ADDRESSES)
+    return report
@@ -1,6 +1,8 @@
 from django.contrib import admin
-from blockchain.models import SearchAddress, SearchTransaction, UserAddresses
+from blockchain.models import IndexedAddress, IndexedTransaction, SearchAddress, SearchTransaction, UserAddresses
 
 admin.site.register(SearchAddress)
 admin.site.register(SearchTransaction)
-admin.site.register(UserAddresses)
\ No newline at end of file
+admin.site.register(UserAddresses)
+admin.site.register(IndexedAddress)
+admin.site.register(IndexedTransaction)
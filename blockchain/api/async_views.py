@@ -0,0 +1,136 @@
+"""
+ASGI versions of the upstream bound endpoints.
+
+DRF's APIView cannot run asynchronously, so these are plain Django async
+views doing token authentication themselves. Upstream calls don't block the
+event loop and searches are logged from the ORM's thread.
+"""
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from rest_framework import exceptions, status
+
+from blockchain.api.serializers import AddressPageSerializer, BalanceQuerySerializer
+from accounts.authentication import CachingTokenAuthentication
+from blockchain import fastjson
+from blockchain.api.throttling import athrottle_wait
+from blockchain.balances import afetch_balances
+from blockchain.lookups import afetch_address, afetch_transaction, valid_transaction
+from blockchain.metrics import span
+from blockchain.models import UserAddresses
+from blockchain.providers import UnknownChain
+from blockchain.recorder import record_address_search, record_transaction_search
+from blockchain.snapshots import snapshot_balances
+from blockchain.upstream import UpstreamError, UpstreamThrottled
+
+
+def _authenticate(request):
+    result = CachingTokenAuthentication().authenticate(request)
+    return result[0] if result else None
+
+
+def _json(data):
+    return HttpResponse(fastjson.dumps(data, default=DjangoJSONEncoder().default), content_type='application/json')
+
+
+def _throttled(wait):
+    exc = exceptions.Throttled(wait)
+    response = JsonResponse({'detail': exc.detail}, status=exc.status_code)
+    if exc.wait is not None:
+        response['Retry-After'] = '%d' % exc.wait
+    return response
+
+
+def async_api_view(handler=None, *, throttle_scope=None):
+    """
+    Allow GET requests of token authenticated users only, throttled like
+    the DRF views of the same throttle_scope.
+    """
+    if handler is None:
+        return partial(async_api_view, throttle_scope=throttle_scope)
+
+    @wraps(handler)
+    async def view(request, *args, **kwargs):
+        if request.method != 'GET':
+            return JsonResponse({'detail': f'Method "{request.method}" not allowed.'},
+                                status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        try:
+            user = await sync_to_async(_authenticate)(request)
+        except exceptions.AuthenticationFailed as exc:
+            return JsonResponse({'detail': exc.detail}, status=status.HTTP_401_UNAUTHORIZED)
+        if user is None:
+            return JsonResponse({'detail': exceptions.NotAuthenticated.default_detail},
+                                status=status.HTTP_401_UNAUTHORIZED)
+        request.user = user
+        wait = await athrottle_wait(throttle_scope, user.pk)
+        if wait is not None:
+            return _throttled(wait)
+        return await handler(request, *args, **kwargs)
+    return view
+
+
+@async_api_view(throttle_scope='search')
+async def search_address(request, address, format=None):
+    # Pages only, Django cannot stream to ASGI clients without blocking the loop.
+    page = AddressPageSerializer(data=request.GET.dict())
+    if not page.is_valid():
+        return JsonResponse(page.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        search_data = await afetch_address(address, chain=request.GET.get('chain'),
+                                           offset=page.validated_data['offset'], limit=page.validated_data.get('limit'))
+    except UnknownChain:
+        return JsonResponse({"chain": ["Unsupported chain."]}, status=status.HTTP_400_BAD_REQUEST)
+    except UpstreamThrottled as exc:
+        return _throttled(exc.retry_after)
+    except UpstreamError:
+        return HttpResponse(status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    await sync_to_async(record_address_search)(
+        request.user, search_data['address'] if search_data else address, valid=search_data is not None)
+    if search_data is None:
+        return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+    with span('render'):
+        return _json(search_data)
+
+
+@async_api_view(throttle_scope='search')
+async def search_transaction(request, transaction, format=None):
+    chain = request.GET.get('chain')
+    try:
+        if not valid_transaction(transaction, chain):
+            return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+        await sync_to_async(record_transaction_search)(request.user, transaction)
+        search_data = await afetch_transaction(transaction, chain=chain)
+    except UnknownChain:
+        return JsonResponse({"chain": ["Unsupported chain."]}, status=status.HTTP_400_BAD_REQUEST)
+    except UpstreamThrottled as exc:
+        return _throttled(exc.retry_after)
+    except UpstreamError:
+        return HttpResponse(status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if search_data is None:
+        return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+    with span('render'):
+        return _json(search_data)
+
+
+@async_api_view(throttle_scope='balance')
+async def balance(request, format=None):
+    query = BalanceQuerySerializer(data=request.GET.dict())
+    if not query.is_valid():
+        return JsonResponse(query.errors, status=status.HTTP_400_BAD_REQUEST)
+    if settings.BLOCKCHAIN_BALANCE_SNAPSHOTS['ENABLED'] and not query.validated_data['fresh']:
+        report = await sync_to_async(snapshot_balances)(request.user)
+        if report is not None:
+            with span('render'):
+                return _json(report)
+    queryset = UserAddresses.objects.filter(user=request.user).values_list('address', flat=True)
+    addresses = await sync_to_async(list)(queryset)
+    # Snapshots are stored by the DRF view and the refresh_balances command only.
+    report = await afetch_balances(addresses)
+    if addresses and len(report['failed']) == len(addresses):
+        return HttpResponse(status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    with span('render'):
+        return _json({**report, 'as_of': timezone.now()})
@@ -0,0 +1,96 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from collections import OrderedDict
+from heapq import merge
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class MergedCursorPagination:
+    """
+    Keyset pagination over querysets of different models merged into one
+    stream, newest first. Rows are ordered by (timestamp, kind, id) and the
+    cursor is the position of the last row served, so every page costs one
+    indexed range query per kind however deep it is. A row whose timestamp
+    grows while paging, like a summary searched again, moves ahead of the
+    cursor: it is not served again, nor on later pages if it was not yet.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page_size = api_settings.PAGE_SIZE or 10
+
+    def paginate(self, streams, request):
+        """
+        streams maps a kind to a queryset having timestamp and id fields.
+        Returns the page as a list of model instances.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        rows = []
+        for kind, queryset in sorted(streams.items()):
+            if position is not None:
+                queryset = queryset.filter(self.after(kind, *position))
+            page = queryset.order_by('-timestamp', '-id')[:self.page_size + 1]
+            rows.append([((obj.timestamp, kind, obj.id), obj) for obj in page])
+
+        merged = list(merge(*rows, key=lambda row: row[0], reverse=True))
+        page = merged[:self.page_size]
+        self.next_position = page[-1][0] if len(merged) > self.page_size else None
+        return [obj for _, obj in page]
+
+    @staticmethod
+    def after(kind, timestamp, cursor_kind, cursor_id):
+        """Rows of kind coming after the cursor in the merged descending order."""
+        if kind < cursor_kind:
+            return Q(timestamp__lte=timestamp)
+        if kind > cursor_kind:
+            return Q(timestamp__lt=timestamp)
+        return Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=cursor_id)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            timestamp, kind, pk = urlsafe_b64decode(encoded.encode()).decode().split('|')
+            timestamp = parse_datetime(timestamp)
+            pk = int(pk)
+        except (DecodeError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if timestamp is None:
+            raise NotFound(self.invalid_cursor_message)
+        return timestamp, kind, pk
+
+    def encode_cursor(self, position):
+        timestamp, kind, pk = position
+        return urlsafe_b64encode(f'{timestamp.isoformat()}|{kind}|{pk}'.encode()).decode()
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
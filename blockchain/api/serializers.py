@@ -1,6 +1,8 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from blockchain.models import SearchAddress, SearchTransaction, UserAddresses
-from rest_framework.validators import UniqueTogetherValidator
+from rest_framework.settings import api_settings
+from blockchain.models import SearchAddress, SearchSummary, SearchTransaction, UserAddresses
+from blockchain.versions import ADDRESSES, bump
 
 
 class SearchAddressSerializer(serializers.ModelSerializer):
@@ -19,20 +21,66 @@ class UserAddressesSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserAddresses
         fields = ['user', 'address']
-        validators = [
-            UniqueTogetherValidator(
-                queryset=UserAddresses.objects.all(),
-                fields=['user', 'address'],
-                message="Address is already marked as mine."
-            )
-        ]
 
     def validate(self, value):
-        addresses = [i.address for i in SearchAddress.objects.filter(user=value['user']).all()]
-        if value['address'] not in addresses:
+        if UserAddresses.objects.filter(user=value['user'], address=value['address']).exists():
+            raise serializers.ValidationError("Address is already marked as mine.")
+        # One row however often the address was searched, valid as of the latest search.
+        valid = SearchSummary.objects.filter(user=value['user'], address=value['address']) \
+            .values_list('valid', flat=True).first()
+        if valid is None:
             raise serializers.ValidationError("Address has not been searched")
-        addresses = [i.address for i in SearchAddress.objects.filter(user=value['user'], valid=True).all()]
-        if value['address'] not in addresses:
+        if not valid:
             raise serializers.ValidationError("Invalid active address")
         return value
 
+    def create(self, validated_data):
+        # The unique constraint settles concurrent requests marking the same address.
+        try:
+            with transaction.atomic():
+                instance = super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: ["Address is already marked as mine."]})
+        bump([instance.user_id], ADDRESSES)
+        return instance
+
+
+class SearchHistorySerializer(serializers.Serializer):
+    """
+    Entry of the merged address and transaction search history. Addresses
+    are listed once, at their latest search, with the time of the first one
+    and how many there were.
+    """
+    kind = serializers.SerializerMethodField()
+    timestamp = serializers.DateTimeField()
+    address = serializers.CharField(required=False)
+    transaction = serializers.CharField(required=False)
+    valid = serializers.BooleanField(required=False)
+    first_seen = serializers.DateTimeField(required=False)
+    count = serializers.IntegerField(required=False)
+
+    def get_kind(self, obj):
+        return 'address' if isinstance(obj, SearchSummary) else 'transaction'
+
+
+class BulkAddressesSerializer(serializers.Serializer):
+    addresses = serializers.ListField(child=serializers.CharField(max_length=90), allow_empty=False,
+                                      max_length=10000)
+
+
+class AddressPageSerializer(serializers.Serializer):
+    offset = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, required=False)
+    stream = serializers.BooleanField(default=False)
+
+
+class BalanceQuerySerializer(serializers.Serializer):
+    fresh = serializers.BooleanField(default=False)
+
+
+class SearchHistoryFilterSerializer(serializers.Serializer):
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    valid = serializers.BooleanField(required=False)
+    kind = serializers.ChoiceField(choices=['address', 'transaction'], required=False)
@@ -0,0 +1,68 @@
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework import status
+from blockchain.models import SearchAddress, SearchTransaction, UserAddresses
+from blockchain.tests.test_cache import CACHE_SETTINGS
+from blockchain.tests.test_validation import TRANSACTION
+
+
+def upstream(status_code, content):
+    client = mock.Mock()
+    client.get = mock.AsyncMock(return_value=mock.Mock(status_code=status_code, content=content))
+    return mock.patch('blockchain.providers.base.get_async_client', return_value=client)
+
+
+@override_settings(BLOCKCHAIN_CACHE=CACHE_SETTINGS)
+class TestAsyncViews(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.token = Token.objects.create(user=self.user)
+        # The async test client takes headers by their plain names.
+        self.auth = {'authorization': "Token " + self.token.key}
+
+    async def test_search_address(self):
+        url = reverse("blockchain_api:async_search_address", kwargs={'address': "1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1F"})
+        with upstream(200, b'{"final_balance": 1}'):
+            response = await self.async_client.get(url, **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['balance'], 1)
+        self.assertTrue(await sync_to_async(SearchAddress.objects.filter(user=self.user, valid=True).exists)())
+
+    async def test_search_rejected_address_is_logged_invalid(self):
+        url = reverse("blockchain_api:async_search_address", kwargs={'address': "test123"})
+        with upstream(400, b''):
+            response = await self.async_client.get(url, **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(await sync_to_async(SearchAddress.objects.filter(user=self.user, valid=False).exists)())
+
+    async def test_search_transaction(self):
+        url = reverse("blockchain_api:async_search_transaction", kwargs={'transaction': TRANSACTION})
+        with upstream(200, b'{"hash": "%s"}' % TRANSACTION.encode()):
+            response = await self.async_client.get(url, **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(await sync_to_async(SearchTransaction.objects.count)(), 1)
+
+    async def test_balance(self):
+        await sync_to_async(UserAddresses.objects.create)(user=self.user, address="a")
+        with upstream(200, b'{"a": {"final_balance": 5}, "b": {"final_balance": 7}}'):
+            response = await self.async_client.get(reverse("blockchain_api:async_balance"), **self.auth)
+        report = response.json()
+        self.assertIsNotNone(report.pop('as_of'))
+        self.assertEqual(report, {"balances": {"BTC": 5}, "failed": []})
+
+    async def test_unauthenticated(self):
+        response = await self.async_client.get(reverse("blockchain_api:async_balance"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_bad_token(self):
+        response = await self.async_client.get(reverse("blockchain_api:async_balance"),
+                                               authorization="Token nope")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_method_not_allowed(self):
+        response = await self.async_client.post(reverse("blockchain_api:async_balance"), **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
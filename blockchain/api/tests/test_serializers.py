@@ -1,4 +1,6 @@
 from blockchain.api.serializers import SearchAddressSerializer, SearchTransactionSerializer, UserAddressesSerializer
+from blockchain.models import UserAddresses
+from rest_framework.exceptions import ValidationError
 from rest_framework.test import APITestCase
 from rest_framework.reverse import reverse
 
@@ -125,3 +127,15 @@ class TestUserAddressesSerializer(APITestCase):
         ser = UserAddressesSerializer(data=data)
         self.assertFalse(ser.is_valid())
         self.assertEqual(ser.errors.keys(), {"non_field_errors"})
+
+    def test_concurrent_duplicate_is_rejected_by_constraint(self):
+        data = {'user': 1, 'address': 'adsadasdgsdf564f63d4f3241d'}
+        first = UserAddressesSerializer(data=data)
+        second = UserAddressesSerializer(data=data)
+        self.assertTrue(first.is_valid())
+        self.assertTrue(second.is_valid())
+        first.save()
+        with self.assertRaises(ValidationError) as ctx:
+            second.save()
+        self.assertEqual(ctx.exception.detail.keys(), {"non_field_errors"})
+        self.assertEqual(UserAddresses.objects.count(), 1)
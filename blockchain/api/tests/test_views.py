@@ -1,11 +1,38 @@
+from datetime import timedelta
+from urllib.parse import urlencode
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 from rest_framework.reverse import reverse
 from rest_framework import status
 import json
-import time
+from blockchain.addresses import CHUNK_SIZE
 from blockchain.api.serializers import SearchAddressSerializer
+from blockchain.models import SearchAddress, SearchSummary, SearchTransaction, UserAddresses
+from blockchain.summaries import summarize
+from blockchain.tests.stub_upstream import StubUpstream
+
+stub = StubUpstream()
+upstream_settings = None
+
+
+def setUpModule():
+    # Searches are answered by the recorded fixtures of a local stub instead of blockchain.info.
+    global upstream_settings
+    stub.start()
+    btc = {**settings.BLOCKCHAIN_PROVIDERS['BTC'], 'BASE_URL': stub.base_url}
+    upstream_settings = override_settings(BLOCKCHAIN_PROVIDERS={**settings.BLOCKCHAIN_PROVIDERS, 'BTC': btc})
+    upstream_settings.enable()
+
+
+def tearDownModule():
+    upstream_settings.disable()
+    stub.stop()
 
 
 class TestSearchByAddressView(APITestCase):
@@ -21,12 +48,10 @@ class TestSearchByAddressView(APITestCase):
     def test_search_address_authenticated(self):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        time.sleep(10)
 
     def test_search_not_existing_address(self):
         response = self.client.get(reverse("blockchain_api:search_address", kwargs={'address': "test123"}))
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        time.sleep(10)
 
     def test_search_address_unauthenticated(self):
         self.client.force_authenticate(user=None)
@@ -48,12 +73,10 @@ class TestSearchByTransactionView(APITestCase):
     def test_search_transaction_authenticated(self):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        time.sleep(10)
 
     def test_search_not_existing_transaction(self):
         response = self.client.get(reverse("blockchain_api:search_transaction", kwargs={'transaction': "test123"}))
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        time.sleep(10)
 
     def test_search_transaction_unauthenticated(self):
         self.client.force_authenticate(user=None)
@@ -69,7 +92,6 @@ class TestUserSearchesView(APITestCase):
         self.url = reverse("blockchain_api:past_searches")
         self.client.get(
             reverse("blockchain_api:search_address", kwargs={'address': "1A8JiWcwvpY7tAopUkSnGuEYHmzGYfZPiq"}))
-        time.sleep(10)
 
     def api_auth(self):
         self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
@@ -77,7 +99,7 @@ class TestUserSearchesView(APITestCase):
     def test_searches_authenticated(self):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(json.loads(response.content)), 1)
+        self.assertEqual(len(json.loads(response.content)['results']), 1)
 
     def test_searches_unauthenticated(self):
         self.client.force_authenticate(user=None)
@@ -85,6 +107,75 @@ class TestUserSearchesView(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class TestUserSearchesPagination(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("blockchain_api:past_searches")
+        start = timezone.now() - timedelta(days=1)
+        for i in range(25):
+            search = SearchAddress.objects.create(user=self.user, address=f"a{i}", valid=i % 5 != 0)
+            # Pairs of searches share a timestamp to exercise the id tie break.
+            timestamp = start + timedelta(minutes=i // 2)
+            SearchAddress.objects.filter(pk=search.pk).update(timestamp=timestamp)
+            SearchSummary.objects.filter(address=search.address).update(first_seen=timestamp, last_seen=timestamp)
+        for i in range(5):
+            search = SearchTransaction.objects.create(user=self.user, transaction=f"t{i}")
+            SearchTransaction.objects.filter(pk=search.pk).update(timestamp=start + timedelta(minutes=i * 3))
+
+    def collect(self, url, queries=3):
+        entries = []
+        while url:
+            # The versions and one query per kind of search, however deep the page.
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            entries += response.json()['results']
+            url = response.json()['next']
+        return entries
+
+    def test_pages_cover_merged_history_newest_first(self):
+        entries = self.collect(self.url + '?page_size=7')
+        self.assertEqual(len(entries), 30)
+        keys = [(e['kind'], e.get('address') or e['transaction']) for e in entries]
+        self.assertEqual(len(set(keys)), 30)
+        timestamps = [e['timestamp'] for e in entries]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+
+    def test_search_again_while_paging(self):
+        first = self.client.get(self.url + '?page_size=10').json()
+        seen = [e.get('address') or e['transaction'] for e in first['results']]
+        served = next(e['address'] for e in first['results'] if e['kind'] == 'address')
+        # One address already served and one not yet move to the top.
+        for address in (served, 'a0'):
+            SearchAddress.objects.create(user=self.user, address=address)
+        rest = [e.get('address') or e['transaction'] for e in self.collect(first['next'])]
+        self.assertEqual(len(seen + rest), len(set(seen + rest)))
+        self.assertEqual(set(seen + rest), {f"a{i}" for i in range(1, 25)} | {f"t{i}" for i in range(5)})
+        top = self.client.get(self.url + '?page_size=2').json()['results']
+        self.assertEqual([e['address'] for e in top], ['a0', served])
+
+    def test_filters(self):
+        self.assertEqual(len(self.collect(self.url + '?kind=transaction', queries=2)), 5)
+        invalid = self.collect(self.url + '?valid=false', queries=2)
+        self.assertEqual({e['address'] for e in invalid}, {'a0', 'a5', 'a10', 'a15', 'a20'})
+        since = SearchSummary.objects.get(address='a20').last_seen.isoformat()
+        recent = self.collect(self.url + '?' + urlencode({'since': since}))
+        self.assertEqual({e.get('address') or e['transaction'] for e in recent},
+                         {'a20', 'a21', 'a22', 'a23', 'a24', 't4'})
+
+    def test_page_size_is_capped(self):
+        summarize(SearchAddress.objects.bulk_create(
+            [SearchAddress(user=self.user, address=f"b{i}") for i in range(200)]))
+        response = self.client.get(self.url + '?page_size=1000')
+        self.assertEqual(len(response.json()['results']), 100)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url + '?cursor=nope').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(self.url + '?since=yesterday').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url + '?kind=block').status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class TestUserAddressesView(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='test', password="passwordTesting.123")
@@ -138,6 +229,61 @@ class TestUserAddressesView(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
 
+class TestBulkUserAddressesView(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.url = reverse("blockchain_api:mine_addresses_bulk")
+        summarize(SearchAddress.objects.bulk_create(
+            [SearchAddress(user=self.user, address=f"1Bulk{i:029d}") for i in range(2000)] +
+            [SearchAddress(user=self.user, address="ttt123", valid=False)]))
+
+    def queries(self, addresses):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data={'addresses': addresses}, format='json')
+        self.assertEqual(response.json()['created'], len(addresses))
+        return len(queries)
+
+    def test_queries_do_not_grow_with_addresses(self):
+        # Up to a chunk and what the backend inserts in one statement, SQLite takes 999 parameters.
+        many = min(CHUNK_SIZE, connection.ops.bulk_batch_size(UserAddresses._meta.concrete_fields[1:], []))
+        addresses = [f"1Bulk{i:029d}" for i in range(1 + 10 + many)]
+        # The first bump creates the version row, later ones update it.
+        self.queries(addresses[:1])
+        self.assertEqual(self.queries(addresses[1:11]), self.queries(addresses[11:]))
+
+    def test_mark_many_addresses_as_mine(self):
+        addresses = [f"1Bulk{i:029d}" for i in range(2000)]
+        response = self.client.post(self.url, data={'addresses': addresses}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.json()['created'], response.json()['failed']), (2000, 0))
+        self.assertEqual(UserAddresses.objects.filter(user=self.user).count(), 2000)
+
+    def test_results_per_address(self):
+        UserAddresses.objects.create(user=self.user, address="1Bulk" + "0" * 29)
+        addresses = ["1Bulk" + "0" * 29, "1Bulk" + "0" * 28 + "1", "ttt123", "dasdfdsf", "1Bulk" + "0" * 28 + "1"]
+        response = self.client.post(self.url, data={'addresses': addresses}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result.get('errors', ['created'])[0] for result in response.json()['results']],
+                         ["Address is already marked as mine.", "created", "Invalid active address",
+                          "Address has not been searched", "Address is repeated in the request."])
+
+    def test_remove_many_addresses(self):
+        addresses = [f"1Bulk{i:029d}" for i in range(3)]
+        UserAddresses.objects.bulk_create([UserAddresses(user=self.user, address=address) for address in addresses])
+        UserAddresses.objects.filter(address=addresses[1]).update(allocated=True)
+        response = self.client.delete(self.url, data={'addresses': addresses + ["dasdfdsf"]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.json()['removed'], response.json()['failed']), (2, 2))
+        self.assertEqual(list(UserAddresses.objects.values_list('address', flat=True)), [addresses[1]])
+
+    def test_invalid_list(self):
+        for data in ({}, {'addresses': []}, {'addresses': ["x" * 91]}):
+            response = self.client.post(self.url, data=data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class TestUserBalanceView(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='test', password="passwordTesting.123")
@@ -161,7 +307,7 @@ class TestUserBalanceView(APITestCase):
                          data={'address': "1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1F"})
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreater(json.loads(response.content)['balance'], 0)
+        self.assertGreater(json.loads(response.content)['balances']['BTC'], 0)
 
     def test_balance_unauthenticated(self):
         self.client.force_authenticate(user=None)
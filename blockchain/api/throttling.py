@@ -0,0 +1,47 @@
+from rest_framework.throttling import BaseThrottle
+
+from blockchain.ratelimit import get_limiter, user_limit
+
+
+def _user_bucket(scope, ident):
+    limit = scope and user_limit(scope)
+    if not limit:
+        return None
+    return f'user:{scope}:{ident}', limit['RATE'], limit['BURST'], 0, f'user:{scope}'
+
+
+def throttle_wait(scope, ident):
+    """
+    Seconds until ident may call an endpoint of scope again, None while it
+    has tokens left. Scopes without a limit in BLOCKCHAIN_RATE_LIMITS['USER']
+    are never throttled.
+    """
+    bucket = _user_bucket(scope, ident)
+    if bucket is None:
+        return None
+    admitted, wait = get_limiter().reserve(*bucket)
+    return None if admitted else wait
+
+
+async def athrottle_wait(scope, ident):
+    bucket = _user_bucket(scope, ident)
+    if bucket is None:
+        return None
+    admitted, wait = await get_limiter().areserve(*bucket)
+    return None if admitted else wait
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per user and view throttle_scope. Anonymous requests are
+    keyed by their client address.
+    """
+
+    def allow_request(self, request, view):
+        user = request.user
+        ident = user.pk if user and user.is_authenticated else self.get_ident(request)
+        self.retry_after = throttle_wait(getattr(view, 'throttle_scope', None), ident)
+        return self.retry_after is None
+
+    def wait(self):
+        return self.retry_after
@@ -1,6 +1,6 @@
 from django.urls import path
 from rest_framework.urlpatterns import format_suffix_patterns
-from . import views
+from . import async_views, views
 
 app_name = "blockchain_api"
 urlpatterns = [
@@ -8,7 +8,14 @@ urlpatterns = [
     path('search/transaction/<str:transaction>', views.SearchByTransactionView.as_view(), name="search_transaction"),
     path('searches/', views.UserSearchesView.as_view(), name="past_searches"),
     path('addresses/', views.UserAddressesView.as_view(), name="mine_addresses"),
+    path('addresses/bulk/', views.BulkUserAddressesView.as_view(), name="mine_addresses_bulk"),
     path('balance/', views.UserBalanceView.as_view(), name="balance"),
+    path('async/search/address/<str:address>/', async_views.search_address, name="async_search_address"),
+    path('async/search/transaction/<str:transaction>', async_views.search_transaction,
+         name="async_search_transaction"),
+    path('async/balance/', async_views.balance, name="async_balance"),
+    path('upstream/stats/', views.UpstreamStatsView.as_view(), name="upstream_stats"),
+    path('metrics/', views.MetricsView.as_view(), name="metrics"),
 ]
 
 urlpatterns = format_suffix_patterns(urlpatterns)
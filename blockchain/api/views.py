@@ -1,80 +1,161 @@
-from blockchain.models import SearchAddress, UserAddresses
-from blockchain.api.serializers import SearchAddressSerializer, SearchTransactionSerializer, UserAddressesSerializer
-from django.http import Http404
+from accounts.authentication import get_token_cache
+from accounts.hashing import get_hashing_pool
+from blockchain.models import SearchSummary, SearchTransaction, UserAddresses
+from blockchain.api.pagination import MergedCursorPagination
+from blockchain.addresses import mark_addresses, unmark_addresses
+from blockchain.api.serializers import AddressPageSerializer, BalanceQuerySerializer, BulkAddressesSerializer, \
+    UserAddressesSerializer, SearchHistoryFilterSerializer, SearchHistorySerializer
+from blockchain.balances import fetch_balances
+from blockchain.database import replica_reads
+from blockchain.cache import get_cache
+from blockchain.lookups import fetch_address, fetch_transaction, flight, stream_address, valid_transaction
+from blockchain.metrics import get_metrics, span
+from blockchain.recorder import flush_pending, get_recorder, record_address_search, record_transaction_search
+from blockchain.providers import UnknownChain
+from blockchain.ratelimit import get_limiter
+from blockchain.snapshots import snapshot_balances, store_snapshots
+from blockchain.upstream import UpstreamError, UpstreamThrottled, client_stats
+from blockchain.versions import ADDRESSES, BALANCES, SEARCHES, address_validators, bump, conditional, \
+    transaction_validators, validated_response
+from django.conf import settings
+from django.db.models import F
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, permissions
-import requests
+from rest_framework import exceptions, status, permissions
 
 
-# TODO validate user requests using a 10sec pause
 class SearchByAddressView(APIView):
     """
     Search By Address
     Required attributes:
-    address - Bitcoin address can be base58 or hash160 max len=50
+    address - BTC (base58 or bech32), BCH (cashaddr) or ETH (hex) address max len=90
+    Optional query parameters:
+    chain - BTC, BCH or ETH, detected from the address format when omitted
+    offset, limit - page of the transactions, newest first, limit is capped by the provider's page size
+    stream - true to stream the transactions as they arrive from the provider, for very busy addresses,
+    a stream the provider breaks off ends with an error member instead of the balances
     """
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'search'
 
     def get(self, request, address, format=None):
-        data = {"address": address, "user": request.user.id}
-        url = f"https://blockchain.info/rawaddr/{address}"
-        header = {'content-type': 'application/json'}
-        res = requests.get(url=url, headers=header)
-        if res.status_code == 200:
-            serializer = SearchAddressSerializer(data=data)
-            if serializer.is_valid():
-                serializer.save()
-            search_data = res.json()
-            return Response(search_data, status=status.HTTP_200_OK)
-        data['valid'] = False
-        serializer = SearchAddressSerializer(data=data)
-        if serializer.is_valid():
-            serializer.save()
+        page = AddressPageSerializer(data=request.query_params.dict())
+        page.is_valid(raise_exception=True)
+        page = page.validated_data
+        chain = request.query_params.get('chain')
+        try:
+            if page['stream']:
+                return self.stream(request, address, chain, page)
+            search_data = fetch_address(address, chain=chain, offset=page['offset'], limit=page.get('limit'))
+        except UnknownChain:
+            return Response({"chain": ["Unsupported chain."]}, status=status.HTTP_400_BAD_REQUEST)
+        except UpstreamThrottled as exc:
+            raise exceptions.Throttled(exc.retry_after)
+        except UpstreamError:
+            return Response(status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if search_data is not None:
+            record_address_search(request.user, search_data['address'])
+            return validated_response(request, search_data, *address_validators(search_data))
+        record_address_search(request.user, address, valid=False)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
+    def stream(self, request, address, chain, page):
+        address, chunks = stream_address(address, chain=chain, offset=page['offset'], limit=page.get('limit'))
+        record_address_search(request.user, address, valid=chunks is not None)
+        if chunks is None:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        return StreamingHttpResponse(chunks, content_type='application/json')
+
 
-# TODO validate user requests using a 10sec pause
 class SearchByTransactionView(APIView):
     """
     Search By Transaction
     Required attributes:
-    transaction - Transaction hex max len=64
+    transaction - Transaction hex len=64, 0x prefixed (len=66) for ETH
+    Optional query parameters:
+    chain - BTC, BCH or ETH, detected from the hash format when omitted
     """
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'search'
 
     def get(self, request, transaction, format=None):
-        data = {"transaction": transaction, "user": request.user.id}
-        serializer = SearchTransactionSerializer(data=data)
-        if serializer.is_valid():
-            serializer.save()
-
-        url = f"https://blockchain.info/rawtx/{transaction}"
-        header = {'content-type': 'application/json'}
-        res = requests.get(url=url, headers=header)
-        if res.status_code == 200:
-            search_data = res.json()
-            return Response(search_data, status=status.HTTP_200_OK)
+        chain = request.query_params.get('chain')
+        try:
+            # Malformed hashes are refused before they are logged or sent upstream.
+            if not valid_transaction(transaction, chain):
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+            record_transaction_search(request.user, transaction)
+            search_data = fetch_transaction(transaction, chain=chain)
+        except UnknownChain:
+            return Response({"chain": ["Unsupported chain."]}, status=status.HTTP_400_BAD_REQUEST)
+        except UpstreamThrottled as exc:
+            raise exceptions.Throttled(exc.retry_after)
+        except UpstreamError:
+            return Response(status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if search_data is not None:
+            return validated_response(request, search_data, *transaction_validators(search_data))
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
 class UserSearchesView(APIView):
     """
     Past Searches
-    Returns a list of all previous (past) searches made by the user.
+    Returns the address and transaction searches made by the user, newest first,
+    one page at a time. Follow the "next" link for older searches. An address
+    searched repeatedly is listed once, at its latest search, with the time of
+    the first one and the number of searches. The history is live: an address
+    searched again while paging moves to the top, the pages that follow do not
+    list it again and a new first page does.
+    Optional query parameters:
+    since, until - ISO 8601 datetimes bounding the search time, until is exclusive
+    valid - true or false, only address searches have a validity, the one of the latest search
+    kind - address or transaction
+    page_size - entries per page, at most 100
+    Send the ETag of a page as If-None-Match to get 304 while no search was made.
     """
     permission_classes = [permissions.IsAuthenticated]
 
+    @replica_reads
     def get(self, request, format=None):
-        search_addresses = SearchAddress.objects.filter(user=request.user.id)
-        serializer = SearchAddressSerializer(search_addresses, many=True)
-        return Response(serializer.data)
+        # Searches queued in this worker are written, and counted, first.
+        flush_pending()
+        return self.history(request)
+
+    @conditional(SEARCHES)
+    def history(self, request):
+        filters = SearchHistoryFilterSerializer(data=request.query_params.dict())
+        filters.is_valid(raise_exception=True)
+        filters = filters.validated_data
+
+        streams = {
+            'address': SearchSummary.objects.filter(user=request.user.id).annotate(timestamp=F('last_seen')),
+            'transaction': SearchTransaction.objects.filter(user=request.user.id),
+        }
+        if 'valid' in filters:
+            streams = {'address': streams['address'].filter(valid=filters['valid'])}
+        if 'kind' in filters:
+            streams = {kind: qs for kind, qs in streams.items() if kind == filters['kind']}
+        for kind, queryset in streams.items():
+            if 'since' in filters:
+                queryset = queryset.filter(timestamp__gte=filters['since'])
+            if 'until' in filters:
+                queryset = queryset.filter(timestamp__lt=filters['until'])
+            streams[kind] = queryset
+
+        paginator = MergedCursorPagination()
+        page = paginator.paginate(streams, request)
+        with span('serialize'):
+            data = SearchHistorySerializer(page, many=True).data
+        return paginator.get_paginated_response(data)
 
 
 class UserAddressesView(APIView):
     """
     Address marking as mine
     You can mark an address as 'mine' using all previous (past) searches
+    GET answers 304 to the ETag of the list until an address is marked or removed.
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -84,12 +165,17 @@ class UserAddressesView(APIView):
         except UserAddresses.DoesNotExist:
             raise Http404
 
+    @replica_reads
+    @conditional(ADDRESSES)
     def get(self, request, format=None):
         search_addresses = UserAddresses.objects.filter(user=request.user.id)
-        serializer = UserAddressesSerializer(search_addresses, many=True)
-        return Response(serializer.data)
+        with span('serialize'):
+            data = UserAddressesSerializer(search_addresses, many=True).data
+        return Response(data)
 
     def post(self, request, format=None):
+        # The search being marked may still be queued in this worker.
+        flush_pending()
         data = {'user': request.user.id, 'address': request.data['address']}
         serializer = UserAddressesSerializer(data=data)
         if serializer.is_valid():
@@ -99,24 +185,106 @@ class UserAddressesView(APIView):
 
     def delete(self, request, format=None):
         address = self.get_object(address=request.data['address'], user_id=request.user.id)
-        address.delete()
+        # Conditional, an order may be allocating the address right now.
+        deleted, _ = UserAddresses.objects.filter(pk=address.pk, allocated=False).delete()
+        if not deleted:
+            return Response({"address": ["Address is the deposit address of an open order."]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        bump([request.user.id], ADDRESSES)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class BulkUserAddressesView(APIView):
+    """
+    Bulk address marking as mine
+    Required attributes:
+    addresses - list of up to 10000 addresses
+    POST marks them as mine, DELETE removes them. Every address gets a result,
+    in the order of the list, with the errors of the single address endpoint.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def addresses(self, request):
+        serializer = BulkAddressesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['addresses']
+
+    def post(self, request, format=None):
+        addresses = self.addresses(request)
+        # The searches being marked may still be queued in this worker.
+        flush_pending()
+        return Response(mark_addresses(request.user, addresses))
+
+    def delete(self, request, format=None):
+        return Response(unmark_addresses(request.user, self.addresses(request)))
+
+
+def _live_balances(request):
+    # Invalid queries are answered by the view.
+    query = BalanceQuerySerializer(data=request.query_params)
+    return not settings.BLOCKCHAIN_BALANCE_SNAPSHOTS['ENABLED'] or not query.is_valid() \
+        or query.validated_data['fresh']
+
+
 class UserBalanceView(APIView):
     """
     Balance of all user addresses
+    Returns the balance aggregated per currency, in satoshi or wei, the
+    addresses whose balance could not be fetched and is left out, and as_of,
+    the time of the oldest balance. Balances come from the snapshots kept up
+    to date by the refresh_balances command.
+    Optional query parameters:
+    fresh - true to fetch the balances from the providers
+    Snapshot balances answer 304 to their ETag until an address or its balance changes.
     """
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'balance'
+
+    @conditional(ADDRESSES, BALANCES, skip=_live_balances)
+    def get(self, request, format=None):
+        query = BalanceQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        if settings.BLOCKCHAIN_BALANCE_SNAPSHOTS['ENABLED'] and not query.validated_data['fresh']:
+            report = snapshot_balances(request.user)
+            if report is not None:
+                return Response(report, status=status.HTTP_200_OK)
+        addresses = list(UserAddresses.objects.filter(user=request.user.id).values_list('address', flat=True))
+        report = fetch_balances(addresses, store=store_snapshots)
+        if addresses and len(report['failed']) == len(addresses):
+            return Response(status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({**report, 'as_of': timezone.now()}, status=status.HTTP_200_OK)
+
+
+class UpstreamStatsView(APIView):
+    """
+    Upstream connection pool, response cache, request coalescing, rate limit,
+    search log, token cache and password hashing statistics of the worker that
+    served the request.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, format=None):
+        search_log = get_recorder()
+        token_cache = get_token_cache()
+        return Response({
+            "pool": client_stats(),
+            "cache": get_cache().stats(),
+            "coalescing": flight.stats(),
+            "rate_limits": get_limiter().stats(),
+            "search_log": search_log.stats() if search_log is not None else None,
+            "token_cache": token_cache.stats() if token_cache is not None else None,
+            "password_hashing": get_hashing_pool().stats(),
+        })
+
+
+class MetricsView(APIView):
+    """
+    Request metrics of the worker that served the request
+    Histograms per endpoint of the duration, the time spent upstream, in the
+    database, serializing and rendering, of the queries and response sizes.
+    Durations are in milliseconds, buckets count the requests up to each bound.
+    """
+    permission_classes = [permissions.IsAdminUser]
 
     def get(self, request, format=None):
-        addresses = [i.address for i in UserAddresses.objects.filter(user=request.user.id).all()]
-        url = f"https://blockchain.info/balance?active={'|'.join(addresses)}"
-        header = {'content-type': 'application/json'}
-        res = requests.get(url=url, headers=header)
-        if res.status_code == 200:
-            data = res.json()
-            agg_balance = sum([data[i]['final_balance'] for i in data])
-
-            return Response({"balance": agg_balance}, status=status.HTTP_200_OK)
-        return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(get_metrics().snapshot())
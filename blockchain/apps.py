@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BlockchainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blockchain'
+
+    def ready(self):
+        # Connects the receivers checking database connections and summarizing searches.
+        from . import database, summaries  # noqa: F401
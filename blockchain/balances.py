@@ -0,0 +1,150 @@
+"""
+Balances of many addresses across chains.
+
+Addresses are grouped by chain and split into chunks of the provider's
+batch_size. Chunks run in parallel, at most max_concurrency at a time per
+provider, and each address balance is cached for BALANCE_TTL seconds. A
+recompute after one address was added therefore fetches that address only.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from blockchain import fastjson
+from blockchain.cache import get_cache
+from blockchain.lookups import _encode, afetch_balance, fetch_balance
+from blockchain.providers import UnknownChain, detect_address_chain, get_provider
+from blockchain.upstream import UpstreamError
+
+
+def locate(address):
+    """Provider and canonical form of address, raises UnknownChain."""
+    provider = get_provider(detect_address_chain(address))
+    return provider, provider.canonical_address(address)
+
+
+def _plan(addresses):
+    """Per chain provider and canonical addresses, plus the ones no provider serves."""
+    chains, failed = {}, []
+    for address in addresses:
+        try:
+            provider, canonical = locate(address)
+        except UnknownChain:
+            failed.append(address)
+            continue
+        chains.setdefault(provider.chain, (provider, set()))[1].add(canonical)
+    return chains, failed
+
+
+def _cached(chains):
+    """Cached balances keyed by (chain, address) and the chunks left to fetch."""
+    cache = get_cache()
+    found, chunks = {}, []
+    for chain, (provider, addresses) in chains.items():
+        missing = []
+        for address in sorted(addresses):
+            body = cache.get('balance', f'{chain}:{address}')
+            if body is None:
+                missing.append(address)
+            else:
+                found[chain, address] = fastjson.loads(body)
+        chunks += [(provider, chunk) for chunk in provider.chunks(missing)]
+    return found, chunks
+
+
+def _store(provider, chunk, data):
+    """Cache the balances of a fetched chunk and return them keyed by (chain, address)."""
+    cache = get_cache()
+    ttl = settings.BLOCKCHAIN_CACHE['BALANCE_TTL']
+    found = {}
+    for address in chunk:
+        if data and address in data:
+            found[provider.chain, address] = data[address]
+            cache.set('balance', f'{provider.chain}:{address}', _encode(data[address]), ttl)
+    return found
+
+
+def _report(found, chains, failed):
+    balances = {chain: 0 for chain in chains}
+    for (chain, address), data in found.items():
+        balances[chain] += data['balance']
+    failed += sorted(address for chain, (_, addresses) in chains.items()
+                     for address in addresses if (chain, address) not in found)
+    return {'balances': balances, 'failed': failed}
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor_pid != pid:
+        with _executor_lock:
+            if _executor_pid != pid:
+                _executor = ThreadPoolExecutor(max_workers=settings.BLOCKCHAIN_UPSTREAM['POOL_SIZE'],
+                                               thread_name_prefix='balances')
+                _executor_pid = pid
+    return _executor
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    global _executor_pid
+    if setting == 'BLOCKCHAIN_UPSTREAM':
+        _executor_pid = None
+
+
+def _fetch_chunk(provider, chunk):
+    with provider.slots:
+        try:
+            return _store(provider, chunk, fetch_balance(chunk, provider.chain))
+        except UpstreamError:
+            return {}
+
+
+def fetch_balances(addresses, store=None):
+    """
+    {'balances': {chain: total}, 'failed': [address]} of addresses of any chain.
+    Totals are in the smallest unit of each chain and leave out the failed
+    addresses, whose chunk was rejected or whose provider is unreachable.
+    store, when given, is called with addresses and the balances found keyed
+    by chain and canonical address, see blockchain.snapshots.
+    """
+    chains, failed = _plan(addresses)
+    found, chunks = _cached(chains)
+    if len(chunks) == 1:
+        found.update(_fetch_chunk(*chunks[0]))
+    elif chunks:
+        # Each chunk runs in a copy of the request context, for its timings.
+        jobs = [(contextvars.copy_context(), job) for job in chunks]
+        for result in _get_executor().map(lambda item: item[0].run(_fetch_chunk, *item[1]), jobs):
+            found.update(result)
+    if store is not None:
+        store(addresses, found)
+    return _report(found, chains, failed)
+
+
+async def afetch_balances(addresses):
+    chains, failed = _plan(addresses)
+    found, chunks = _cached(chains)
+    slots = {chain: asyncio.Semaphore(provider.max_concurrency) for chain, (provider, _) in chains.items()}
+
+    async def fetch_chunk(provider, chunk):
+        async with slots[provider.chain]:
+            try:
+                return _store(provider, chunk, await afetch_balance(chunk, provider.chain))
+            except UpstreamError:
+                return {}
+
+    for result in await asyncio.gather(*(fetch_chunk(*job) for job in chunks)):
+        found.update(result)
+    return _report(found, chains, failed)
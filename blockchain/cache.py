@@ -0,0 +1,301 @@
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+LOCK_POLL_INTERVAL = 0.01
+
+
+def _wait_for(acquire, timeout):
+    deadline = time.monotonic() + timeout
+    while not acquire():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(LOCK_POLL_INTERVAL)
+    return True
+
+
+class LocalLRUCache:
+    """
+    In-process cache bounded by the total size of the stored values.
+    Least recently used entries are evicted first, expired ones lazily.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (time.monotonic() + ttl, value)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                self._pop(next(iter(self._data)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+
+    def _pop(self, key):
+        _, value = self._data.pop(key)
+        self.size -= len(value)
+
+    def lock(self, key, timeout):
+        # Nothing outside this process can see the entries.
+        return nullcontext()
+
+    def info(self):
+        return {'backend': 'lru', 'entries': len(self._data), 'bytes': self.size,
+                'max_bytes': self.max_bytes, 'evictions': self.evictions}
+
+
+class FileCache:
+    """
+    Cache stored as one file per key, shared by every worker on the host.
+    The first line of a file holds its expiry timestamp. When the directory
+    grows past max_bytes the least recently read files are removed.
+    """
+    LOCK_STRIPES = 64
+
+    def __init__(self, location, max_bytes):
+        self.location = location or os.path.join(tempfile.gettempdir(), 'nexchange-lookups')
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._written = 0
+        os.makedirs(self.location, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.location, hashlib.sha1(key.encode()).hexdigest())
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fh:
+                expires = float(fh.readline())
+                value = fh.read()
+        except (OSError, ValueError):
+            return None
+        if expires < time.time():
+            self._remove(path)
+            return None
+        os.utime(path)
+        return value
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.location, prefix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(b'%f\n' % (time.time() + ttl))
+            fh.write(value)
+            self._written += fh.tell()
+        os.replace(tmp, path)
+        # Scanning the directory is comparatively expensive, so it is only
+        # done once roughly a tenth of the budget has been written.
+        if self._written * 10 >= self.max_bytes:
+            self._written = 0
+            self.cull()
+
+    def delete(self, key):
+        self._remove(self._path(key))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @contextmanager
+    def lock(self, key, timeout):
+        # Keys share a fixed set of lock files so they never pile up.
+        stripe = int(hashlib.sha1(key.encode()).hexdigest(), 16) % self.LOCK_STRIPES
+        with open(os.path.join(self.location, f'.lock-{stripe}'), 'a') as fh:
+            def acquire():
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+                return True
+
+            acquired = _wait_for(acquire, timeout)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _entries(self):
+        for entry in os.scandir(self.location):
+            if entry.is_file() and not entry.name.startswith('.'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def cull(self):
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        size = sum(e[1] for e in entries)
+        for path, file_size, _ in entries:
+            if size <= self.max_bytes:
+                break
+            self._remove(path)
+            size -= file_size
+            self.evictions += 1
+
+    def info(self):
+        entries = list(self._entries())
+        return {'backend': 'file', 'entries': len(entries), 'bytes': sum(e[1] for e in entries),
+                'max_bytes': self.max_bytes, 'evictions': self.evictions}
+
+
+class DjangoCache:
+    """
+    Cache stored in one of the aliases of Django's CACHES setting.
+    Size limits are whatever that cache backend is configured with.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias or 'default'
+        self.cache = caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, ttl):
+        self.cache.set(key, value, ttl)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    @contextmanager
+    def lock(self, key, timeout):
+        lock_key = f'lock:{key}'
+        token = uuid.uuid4().hex
+        acquired = _wait_for(lambda: self.cache.add(lock_key, token, timeout), timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired and self.cache.get(lock_key) == token:
+                self.cache.delete(lock_key)
+
+    def info(self):
+        return {'backend': 'django', 'alias': self.alias}
+
+
+class ResponseCache:
+    """
+    Upstream response bodies keyed by endpoint and lookup value,
+    with hit and miss counters kept per endpoint.
+    """
+
+    def __init__(self, backend, lock_timeout=None):
+        self.backend = backend
+        self.lock_timeout = lock_timeout
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, endpoint, field):
+        with self._lock:
+            counts = self._stats.setdefault(endpoint, {'hits': 0, 'misses': 0, 'sets': 0})
+            counts[field] += 1
+
+    def get(self, endpoint, key):
+        value = self.backend.get(f'{endpoint}:{key}')
+        self._count(endpoint, 'misses' if value is None else 'hits')
+        return value
+
+    def peek(self, endpoint, key):
+        """Like get, without touching the hit and miss counters."""
+        return self.backend.get(f'{endpoint}:{key}')
+
+    def lock(self, endpoint, key):
+        """
+        Lock shared with the other processes using the same backend, held
+        while one of them fetches the entry. Without a lock timeout configured,
+        or if it runs out, callers simply go ahead unlocked.
+        """
+        if not self.lock_timeout:
+            return nullcontext()
+        return self.backend.lock(f'{endpoint}:{key}', self.lock_timeout)
+
+    def set(self, endpoint, key, value, ttl):
+        if ttl <= 0:
+            return
+        self.backend.set(f'{endpoint}:{key}', value, ttl)
+        self._count(endpoint, 'sets')
+
+    def delete(self, endpoint, key):
+        self.backend.delete(f'{endpoint}:{key}')
+
+    def stats(self):
+        with self._lock:
+            endpoints = {name: dict(counts) for name, counts in self._stats.items()}
+        return {'endpoints': endpoints, **self.backend.info()}
+
+
+BACKENDS = {
+    'lru': lambda config: LocalLRUCache(config['MAX_BYTES']),
+    'file': lambda config: FileCache(config['LOCATION'], config['MAX_BYTES']),
+    'django': lambda config: DjangoCache(config['LOCATION']),
+}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process wide response cache configured by BLOCKCHAIN_CACHE."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = settings.BLOCKCHAIN_CACHE
+                lock_timeout = config['LOCK_TIMEOUT'] if config['CROSS_PROCESS_LOCK'] else None
+                _cache = ResponseCache(BACKENDS[config['BACKEND']](config), lock_timeout)
+    return _cache
+
+
+def reset_cache():
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    if setting == 'BLOCKCHAIN_CACHE':
+        reset_cache()
@@ -0,0 +1,56 @@
+"""
+Routing of read-only endpoints to a replica and connection health checks.
+
+Views wrapped in replica_reads read from the REPLICA alias when it is
+configured, writes and everything else use the default database. Persistent
+connections with CONN_HEALTH_CHECKS are checked before a request reuses
+them, instead of failing its first query.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+
+REPLICA = 'replica'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_reads(method):
+    """Let the reads of a view method go to the replica, it may lag behind."""
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and REPLICA in settings.DATABASES:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return False if db == REPLICA else None
+
+
+@receiver(request_started)
+def _check_connections(**kwargs):
+    for connection in connections.all():
+        if connection.connection is not None and connection.settings_dict.get('CONN_HEALTH_CHECKS') \
+                and not connection.in_atomic_block and not connection.is_usable():
+            connection.close()
@@ -0,0 +1,44 @@
+"""
+JSON through orjson when it is installed, through the stdlib otherwise.
+
+orjson only handles integers of 64 bits. Bodies holding longer numbers, such
+as wei amounts, are decoded by the stdlib so they never turn into floats, and
+data orjson cannot encode is encoded by the stdlib.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Numbers of 19 digits may already be out of range. Mapping the digits to 0 and
+# what may precede a number to : lets a substring search find them, in a
+# fraction of the decoding time and without matching digits inside strings
+# such as hashes.
+_NUMBERS = bytes.maketrans(b'0123456789 \t\n\r,:[-', b'0' * 10 + b':' * 8)
+_LONG_NUMBER = b':' + b'0' * 19
+
+
+def loads(data):
+    """Decode bytes or str."""
+    if orjson is not None:
+        raw = data.encode() if isinstance(data, str) else data
+        if _LONG_NUMBER not in raw.translate(_NUMBERS):
+            return orjson.loads(raw)
+    return json.loads(data)
+
+
+def dumps(data, default=None):
+    """
+    Compact UTF-8 encoded bytes. default is called for the types the stdlib
+    does not encode, datetimes included.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=default,
+                                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            pass
+    return json.dumps(data, default=default, ensure_ascii=False, separators=(',', ':')).encode()
+
@@ -0,0 +1,162 @@
+"""
+Persistent index of the transactions and addresses fetched from upstreams.
+
+Confirmed transactions never change, once indexed they are served from the
+database. Addresses keep the highest confirmed block height they were synced
+to, so a later sync only needs the transactions newer than that.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from blockchain.models import AddressTransaction, IndexedAddress, IndexedTransaction, IndexedTransactionIO
+
+
+def _int(value):
+    return None if value is None else int(value)
+
+
+def load_transaction(chain, tx_hash):
+    """Normalized confirmed transaction, or None if it is not indexed yet."""
+    tx = (IndexedTransaction.objects
+          .filter(chain=chain, hash=tx_hash, complete=True, block_height__isnull=False)
+          .prefetch_related('ios').first())
+    if tx is None:
+        return None
+    ios = list(tx.ios.all())
+    return {
+        'chain': tx.chain,
+        'hash': tx.hash,
+        'block_height': tx.block_height,
+        'time': tx.time,
+        'fee': _int(tx.fee),
+        'inputs': [{'address': io.address, 'value': int(io.value)} for io in ios if not io.is_output],
+        'outputs': [{'address': io.address, 'value': int(io.value)} for io in ios if io.is_output],
+    }
+
+
+def store_transaction(data):
+    """Index a normalized transaction. Unconfirmed ones may still change and are skipped."""
+    if data['block_height'] is None:
+        return
+    try:
+        with db_transaction.atomic():
+            tx, created = IndexedTransaction.objects.update_or_create(
+                chain=data['chain'], hash=data['hash'],
+                defaults={'block_height': data['block_height'], 'time': data['time'],
+                          'fee': data['fee'], 'complete': True},
+            )
+            if not created:
+                tx.ios.all().delete()
+            IndexedTransactionIO.objects.bulk_create(
+                [IndexedTransactionIO(transaction=tx, is_output=False, position=i, **io)
+                 for i, io in enumerate(data['inputs'])] +
+                [IndexedTransactionIO(transaction=tx, is_output=True, position=i, **io)
+                 for i, io in enumerate(data['outputs'])]
+            )
+    except IntegrityError:
+        # Another worker indexed it at the same time.
+        pass
+
+
+def address_state(chain, address):
+    return IndexedAddress.objects.filter(chain=chain, address=address).first()
+
+
+def is_fresh(state):
+    """Whether the indexed address was synced recently enough to skip the upstream."""
+    max_age = timedelta(seconds=settings.BLOCKCHAIN_INDEX['ADDRESS_MAX_AGE'])
+    return state is not None and state.synced >= timezone.now() - max_age
+
+
+def needs_next_page(state, pages, page_size):
+    """
+    Whether the pages fetched so far, newest first, may still miss transactions
+    newer than the indexed ones. A first sync indexes the newest page only.
+    """
+    if state is None or state.synced_height is None:
+        return False
+    if len(pages) >= settings.BLOCKCHAIN_INDEX['ADDRESS_MAX_PAGES']:
+        return False
+    txs = pages[-1]['txs']
+    if len(txs) < page_size:
+        return False
+    oldest = txs[-1]['block_height']
+    return oldest is None or oldest > state.synced_height
+
+
+def serve_address(state):
+    """Normalized address with its latest transactions, straight from the index."""
+    rows = (AddressTransaction.objects
+            .filter(address=state)
+            .order_by(F('block_height').desc(nulls_first=True), '-id')
+            .values_list('transaction__hash', 'block_height', 'transaction__time', 'value')
+            [:settings.BLOCKCHAIN_INDEX['ADDRESS_TXS']])
+    return {
+        'chain': state.chain,
+        'address': state.address,
+        'balance': int(state.balance),
+        'total_received': int(state.total_received),
+        'total_sent': int(state.total_sent),
+        'tx_count': state.tx_count,
+        'txs': [{'hash': tx_hash, 'block_height': height, 'time': time, 'value': int(value)}
+                for tx_hash, height, time, value in rows],
+    }
+
+
+def store_address(chain, address, pages):
+    """
+    Merge pages of a normalized address, newest first, into the index
+    and return the address as served from it.
+    """
+    summary = pages[0]
+    txs = {tx['hash']: tx for page in pages for tx in page['txs']}
+    heights = [tx['block_height'] for tx in txs.values() if tx['block_height'] is not None]
+    try:
+        with db_transaction.atomic():
+            state, _ = IndexedAddress.objects.select_for_update().get_or_create(
+                chain=chain, address=address, defaults={'synced': timezone.now()})
+            state.balance = summary['balance']
+            state.total_received = summary['total_received']
+            state.total_sent = summary['total_sent']
+            state.tx_count = summary['tx_count']
+            state.synced = timezone.now()
+            if heights:
+                state.synced_height = max(heights + [state.synced_height or 0])
+            state.save()
+            _index_address_transactions(state, txs)
+    except IntegrityError:
+        # Lost a race with another worker creating the address, serve the fetched page.
+        return summary
+    return serve_address(state)
+
+
+def _index_address_transactions(state, txs):
+    IndexedTransaction.objects.bulk_create(
+        [IndexedTransaction(chain=state.chain, hash=tx['hash'], block_height=tx['block_height'], time=tx['time'])
+         for tx in txs.values()],
+        ignore_conflicts=True,
+    )
+    tx_ids = dict(IndexedTransaction.objects
+                  .filter(chain=state.chain, hash__in=list(txs))
+                  .values_list('hash', 'id'))
+
+    # Transactions indexed while unconfirmed got mined since.
+    mined = [tx for tx in IndexedTransaction.objects.filter(id__in=tx_ids.values(), block_height__isnull=True)
+             if txs[tx.hash]['block_height'] is not None]
+    for tx in mined:
+        tx.block_height = txs[tx.hash]['block_height']
+    IndexedTransaction.objects.bulk_update(mined, ['block_height'])
+
+    # Unconfirmed transactions come first on the newest page, the fetched ones
+    # replace the indexed ones which were mined, dropped or replaced since.
+    AddressTransaction.objects.filter(address=state, block_height__isnull=True).delete()
+    AddressTransaction.objects.bulk_create(
+        [AddressTransaction(address=state, transaction_id=tx_ids[tx['hash']],
+                            block_height=tx['block_height'], value=tx['value'])
+         for tx in txs.values()],
+        ignore_conflicts=True,
+    )
@@ -0,0 +1,393 @@
+import codecs
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from blockchain import fastjson, index
+from blockchain.cache import get_cache
+from blockchain.coalesce import AsyncSingleFlight, SingleFlight
+from blockchain.metrics import span
+from blockchain.providers import detect_address_chain, detect_transaction_chain, get_provider
+from blockchain.ratelimit import aacquire_upstream, acquire_upstream
+from blockchain.streaming import ObjectScanner
+from blockchain.upstream import UpstreamError, UpstreamThrottled
+from blockchain.validation import is_valid_address, is_valid_transaction
+
+logger = logging.getLogger(__name__)
+
+flight = SingleFlight()
+async_flight = AsyncSingleFlight()
+
+STREAM_CHUNK_SIZE = 64 * 1024
+# Cache entry of what the upstream rejected, it loads as None.
+REJECTED = b'null'
+
+
+def _encode(data):
+    return fastjson.dumps(data)
+
+
+def _retry_after(res):
+    try:
+        return float(res.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse(provider, res):
+    """Payload of a 200 response, None if the upstream rejected the request with a 4xx."""
+    if res.status_code == 429:
+        raise UpstreamThrottled(f'{provider.chain} upstream is rate limiting us', retry_after=_retry_after(res))
+    if res.status_code >= 500:
+        # Failing after the retries says nothing of the request, it must not be cached as rejected.
+        raise UpstreamError(f'{provider.chain} upstream answered {res.status_code}')
+    if res.status_code != 200:
+        return None
+    with span('decode'):
+        return fastjson.loads(res.content)
+
+
+def _fetch(provider, request):
+    """Payload of an upstream call made within the chain's call budget, None if rejected."""
+    path, params = request
+    with span('throttle'):
+        acquire_upstream(provider.chain)
+    with span('upstream'):
+        res = provider.client().get(path, params=params)
+    return _parse(provider, res)
+
+
+async def _afetch(provider, request):
+    path, params = request
+    with span('throttle'):
+        await aacquire_upstream(provider.chain)
+    with span('upstream'):
+        res = await provider.async_client().get(path, params=params)
+    return _parse(provider, res)
+
+
+def _store(cache, endpoint, key, data, ttl):
+    if data is not None:
+        cache.set(endpoint, key, _encode(data), ttl(data))
+    else:
+        # Repeated searches of what the upstream rejected are answered locally.
+        cache.set(endpoint, key, REJECTED, settings.BLOCKCHAIN_CACHE['INVALID_TTL'])
+
+
+def _cached(endpoint, key, load_data, ttl):
+    """
+    Serve endpoint/key from the cache, otherwise load it once no matter how
+    many threads ask for it at the same time. load_data returns the normalized
+    result which is cached, ttl picks how long it may be kept.
+    """
+    cache = get_cache()
+    body = cache.get(endpoint, key)
+    if body is not None:
+        return fastjson.loads(body)
+
+    def load():
+        with cache.lock(endpoint, key):
+            # Another worker may have stored it while we waited for the lock.
+            body = cache.peek(endpoint, key)
+            if body is not None:
+                return fastjson.loads(body)
+            data = load_data()
+            _store(cache, endpoint, key, data, ttl)
+            return data
+
+    return flight.do(f'{endpoint}:{key}', load)
+
+
+async def _acached(endpoint, key, load_data, ttl):
+    """
+    Event loop version of _cached. The cross process lock is not taken
+    here, waiting for it would block every other request on the loop.
+    """
+    cache = get_cache()
+    body = cache.get(endpoint, key)
+    if body is not None:
+        return fastjson.loads(body)
+
+    async def load():
+        data = await load_data()
+        _store(cache, endpoint, key, data, ttl)
+        return data
+
+    return await async_flight.do(f'{endpoint}:{key}', load)
+
+
+def _address_ttl(data):
+    return settings.BLOCKCHAIN_CACHE['ADDRESS_TTL']
+
+
+def _transaction_ttl(data):
+    config = settings.BLOCKCHAIN_CACHE
+    return config['TX_TTL'] if data.get('block_height') else config['UNCONFIRMED_TX_TTL']
+
+
+def _address_lookup(address, chain):
+    """Provider, canonical address and cache key, the address is None when malformed."""
+    provider = get_provider(chain or detect_address_chain(address))
+    # Checked before canonicalizing, that drops the case of EIP-55 checksums.
+    if not is_valid_address(address, provider.chain):
+        return provider, None, None
+    address = provider.canonical_address(address)
+    return provider, address, f'{provider.chain}:{address}'
+
+
+def _transaction_lookup(transaction, chain):
+    """Provider and cache key, the key is None when the hash is malformed."""
+    provider = get_provider(chain or detect_transaction_chain(transaction))
+    if not is_valid_transaction(transaction, provider.chain):
+        return provider, None
+    return provider, f'{provider.chain}:{transaction}'
+
+
+def valid_transaction(transaction, chain=None):
+    """
+    Whether transaction has the format of a hash of chain, detected from it
+    unless given. Raises UnknownChain for chains without a provider.
+    """
+    return _transaction_lookup(transaction, chain)[1] is not None
+
+
+def _load_address(provider, address):
+    """
+    Address from the index if it was synced recently, otherwise fetch the
+    pages newer than the indexed transactions and merge them into it. When
+    the upstream budget is exhausted the indexed address is served as is.
+    """
+    if not settings.BLOCKCHAIN_INDEX['ENABLED']:
+        payload = _fetch(provider, provider.address_request(address))
+        return None if payload is None else provider.parse_address(payload, address)
+
+    state = index.address_state(provider.chain, address)
+    if index.is_fresh(state):
+        return index.serve_address(state)
+    pages = []
+    while not pages or index.needs_next_page(state, pages, provider.ADDRESS_PAGE_SIZE):
+        try:
+            payload = _fetch(provider, provider.address_request(address, offset=len(pages) * provider.ADDRESS_PAGE_SIZE))
+        except UpstreamThrottled:
+            if pages:
+                return pages[0]
+            if state is None:
+                raise
+            return index.serve_address(state)
+        page = None if payload is None else provider.parse_address(payload, address)
+        if page is None:
+            # Without the older pages the index would be left with a gap.
+            return pages[0] if pages else None
+        pages.append(page)
+    return index.store_address(provider.chain, address, pages)
+
+
+async def _aload_address(provider, address):
+    if not settings.BLOCKCHAIN_INDEX['ENABLED']:
+        payload = await _afetch(provider, provider.address_request(address))
+        return None if payload is None else provider.parse_address(payload, address)
+
+    state = await sync_to_async(index.address_state)(provider.chain, address)
+    if index.is_fresh(state):
+        return await sync_to_async(index.serve_address)(state)
+    pages = []
+    while not pages or index.needs_next_page(state, pages, provider.ADDRESS_PAGE_SIZE):
+        try:
+            payload = await _afetch(provider, provider.address_request(address, offset=len(pages) * provider.ADDRESS_PAGE_SIZE))
+        except UpstreamThrottled:
+            if pages:
+                return pages[0]
+            if state is None:
+                raise
+            return await sync_to_async(index.serve_address)(state)
+        page = None if payload is None else provider.parse_address(payload, address)
+        if page is None:
+            return pages[0] if pages else None
+        pages.append(page)
+    return await sync_to_async(index.store_address)(provider.chain, address, pages)
+
+
+def _load_transaction(provider, transaction):
+    """Confirmed transactions are served from the index once fetched."""
+    enabled = settings.BLOCKCHAIN_INDEX['ENABLED']
+    data = index.load_transaction(provider.chain, transaction) if enabled else None
+    if data is None:
+        payload = _fetch(provider, provider.transaction_request(transaction))
+        data = None if payload is None else provider.parse_transaction(payload)
+        if data is not None and enabled:
+            index.store_transaction(data)
+    return data
+
+
+async def _aload_transaction(provider, transaction):
+    enabled = settings.BLOCKCHAIN_INDEX['ENABLED']
+    data = await sync_to_async(index.load_transaction)(provider.chain, transaction) if enabled else None
+    if data is None:
+        payload = await _afetch(provider, provider.transaction_request(transaction))
+        data = None if payload is None else provider.parse_transaction(payload)
+        if data is not None and enabled:
+            await sync_to_async(index.store_transaction)(data)
+    return data
+
+
+def _latest_txs(provider):
+    """How many of the newest transactions of an address every lookup returns."""
+    if settings.BLOCKCHAIN_INDEX['ENABLED']:
+        return min(settings.BLOCKCHAIN_INDEX['ADDRESS_TXS'], provider.ADDRESS_PAGE_SIZE)
+    return provider.ADDRESS_PAGE_SIZE
+
+
+def _page(data, offset, limit):
+    if data is None:
+        return None
+    return {**data, 'txs': data['txs'][offset:offset + limit]}
+
+
+def _load_address_page(provider, address, offset, limit):
+    payload = _fetch(provider, provider.address_request(address, offset=offset, limit=limit))
+    return None if payload is None else provider.parse_address(payload, address)
+
+
+async def _aload_address_page(provider, address, offset, limit):
+    payload = await _afetch(provider, provider.address_request(address, offset=offset, limit=limit))
+    return None if payload is None else provider.parse_address(payload, address)
+
+
+def fetch_address(address, chain=None, offset=0, limit=None):
+    """
+    Normalized address summary with its latest transactions, or None when
+    the address is malformed or the upstream does not recognise it. The chain
+    is detected from the address unless given. Raises UpstreamError if it is
+    unreachable and UnknownChain for chains without a provider.
+    offset and limit select an older page of transactions, without a limit
+    the latest transactions are returned. Pages within them are cut from
+    them, older ones are requested from the provider with the same offset
+    and limit.
+    """
+    provider, address, key = _address_lookup(address, chain)
+    if address is None:
+        return None
+    latest = _latest_txs(provider)
+    # By default the latest transactions, which the cache and the index hold.
+    limit = latest if limit is None else provider.page_size(limit)
+    if offset + limit <= latest:
+        data = _cached('address', key, lambda: _load_address(provider, address), _address_ttl)
+        return data if offset == 0 and limit == latest else _page(data, offset, limit)
+    return _cached('address', f'{key}:{offset}:{limit}',
+                   lambda: _load_address_page(provider, address, offset, limit), _address_ttl)
+
+
+def stream_address(address, chain=None, offset=0, limit=None):
+    """
+    (address, chunks) where chunks is fetch_address as an iterator of JSON
+    chunks, normalized while the upstream body arrives, without the cache
+    and the index. Only one transaction of the body is held in memory at a
+    time. chunks is None when the address is malformed or the upstream does
+    not recognise it, errors are raised before the first chunk. A body that
+    turns out malformed or breaks off ends the document with an error member
+    instead of the summary. Providers whose payloads cannot be streamed are
+    fetched as usual.
+    """
+    provider, canonical, key = _address_lookup(address, chain)
+    if canonical is None:
+        return address, None
+    address = canonical
+    if provider.ADDRESS_TXS_KEY is None:
+        data = fetch_address(address, provider.chain, offset, limit)
+        return address, None if data is None else iter([_encode(data)])
+    path, params = provider.address_request(address, offset=offset, limit=limit)
+    with span('throttle'):
+        acquire_upstream(provider.chain)
+    with span('upstream'):
+        res = provider.client().get(path, params=params, stream=True)
+    if res.status_code != 200:
+        res.close()
+        return address, _parse(provider, res)
+    return address, _stream_address(provider, address, res)
+
+
+def _stream_address(provider, address, res):
+    txs_key = provider.ADDRESS_TXS_KEY
+    scanner = ObjectScanner(arrays=[txs_key])
+    text = codecs.getincrementaldecoder('utf-8')()
+    members, separator = {}, b''
+    yield b'{"txs":['
+    try:
+        for chunk in res.iter_content(STREAM_CHUNK_SIZE):
+            for kind, key, value in scanner.feed(text.decode(chunk)):
+                if kind == ObjectScanner.ITEM:
+                    yield separator + _encode(provider.parse_address_tx(value, address))
+                    separator = b','
+                elif key != txs_key:
+                    members[key] = value
+        scanner.feed(text.decode(b'', final=True))
+        scanner.close()
+    except (ValueError, OSError):
+        # The status is sent already, the document ends with an error instead of the summary.
+        logger.exception("Streaming %s address %s failed", provider.chain, address)
+        yield b'],"error":"The upstream response was malformed or interrupted."}'
+        return
+    finally:
+        res.close()
+    summary = provider.parse_address({**members, txs_key: []}, address)
+    del summary['txs']
+    yield b'],' + _encode(summary)[1:]
+
+
+def fetch_transaction(transaction, chain=None):
+    """
+    Normalized transaction, or None when the upstream does not know the hash.
+    Confirmed transactions can no longer change and are cached much longer.
+    """
+    provider, key = _transaction_lookup(transaction, chain)
+    if key is None:
+        return None
+    return _cached('transaction', key, lambda: _load_transaction(provider, transaction), _transaction_ttl)
+
+
+def fetch_balance(addresses, chain='BTC'):
+    """
+    Normalized balances of addresses of one chain keyed by address,
+    or None if rejected.
+    """
+    provider = get_provider(chain)
+    addresses = sorted(set(addresses))
+
+    def load():
+        payload = _fetch(provider, provider.balance_request(addresses))
+        return None if payload is None else provider.parse_balances(payload)
+
+    return flight.do(f"balance:{provider.chain}:{'|'.join(addresses)}", load)
+
+
+async def afetch_address(address, chain=None, offset=0, limit=None):
+    provider, address, key = _address_lookup(address, chain)
+    if address is None:
+        return None
+    latest = _latest_txs(provider)
+    # By default the latest transactions, which the cache and the index hold.
+    limit = latest if limit is None else provider.page_size(limit)
+    if offset + limit <= latest:
+        data = await _acached('address', key, lambda: _aload_address(provider, address), _address_ttl)
+        return data if offset == 0 and limit == latest else _page(data, offset, limit)
+    return await _acached('address', f'{key}:{offset}:{limit}',
+                          lambda: _aload_address_page(provider, address, offset, limit), _address_ttl)
+
+
+async def afetch_transaction(transaction, chain=None):
+    provider, key = _transaction_lookup(transaction, chain)
+    if key is None:
+        return None
+    return await _acached('transaction', key, lambda: _aload_transaction(provider, transaction), _transaction_ttl)
+
+
+async def afetch_balance(addresses, chain='BTC'):
+    provider = get_provider(chain)
+    addresses = sorted(set(addresses))
+
+    async def load():
+        payload = await _afetch(provider, provider.balance_request(addresses))
+        return None if payload is None else provider.parse_balances(payload)
+
+    return await async_flight.do(f"balance:{provider.chain}:{'|'.join(addresses)}", load)
@@ -0,0 +1,35 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blockchain.snapshots import refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = "Refresh the balance snapshots of the addresses marked as mine, recently active users first."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Refresh once and exit.")
+        parser.add_argument('--interval', type=float,
+                            help="Overrides BLOCKCHAIN_BALANCE_SNAPSHOTS['INTERVAL'].")
+
+    def handle(self, *args, **options):
+        config = settings.BLOCKCHAIN_BALANCE_SNAPSHOTS
+        interval = options['interval'] if options['interval'] is not None else config['INTERVAL']
+
+        stop = threading.Event()
+        if not options['once']:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *args: stop.set())
+
+        while not stop.is_set():
+            stats = refresh_snapshots(config)
+            if options['verbosity'] > 0:
+                self.stdout.write(
+                    "{addresses} stale addresses in {batches} batches, {refreshed} refreshed, "
+                    "{failed} failed".format(**stats))
+            if options['once']:
+                break
+            stop.wait(interval)
@@ -0,0 +1,190 @@
+"""
+Per request timing of the hot path and in-process histograms of it.
+
+The middleware starts a RequestTimings for every request in a context
+variable. span() adds the time of a block to the running request, the
+database execute wrapper adds the time and number of queries, and code
+outside of a request (background threads, commands) pays one context
+variable lookup per span. Context variables follow the request into
+sync_to_async threads and event loop tasks. Threads of a pool have to run
+the work in a copy of the context to be accounted.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_current = ContextVar('request_timings', default=None)
+
+QUERY_BOUNDS = [0, 1, 2, 5, 10, 20, 50, 100]
+BYTES_BOUNDS = [1000, 10000, 100000, 1000000, 10000000]
+
+
+class RequestTimings:
+    """Seconds spent per span name and the queries of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.queries = 0
+        # Chunks of a balance request are fetched by several threads.
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, queries=0):
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+            self.queries += queries
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def start_request():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def span(name):
+    """Account the time of the block to name in the running request, if any."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', time.perf_counter() - start, queries=1)
+
+
+def instrument(connection):
+    """Account the queries of connection to the running request."""
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+@receiver(connection_created)
+def _instrument_new_connection(connection, **kwargs):
+    instrument(connection)
+
+
+class Histogram:
+    """Counts of observed values per bucket of upper bounds, the last bucket is unbounded."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q quantile, None when it is the unbounded one."""
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.bounds + ['+Inf'], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {'count': self.count, 'sum': round(self.sum, 3), 'buckets': buckets,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95), 'p99': self.quantile(0.99)}
+
+
+class EndpointMetrics:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.statuses = {}
+        self.duration = Histogram(bounds)
+        self.spans = {}
+        self.queries = Histogram(QUERY_BOUNDS)
+        self.bytes = Histogram(BYTES_BOUNDS)
+
+    def observe(self, status, duration_ms, spans_ms, queries, size):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.duration.observe(duration_ms)
+        for name, value in spans_ms.items():
+            histogram = self.spans.get(name)
+            if histogram is None:
+                histogram = self.spans[name] = Histogram(self.bounds)
+            histogram.observe(value)
+        self.queries.observe(queries)
+        if size is not None:
+            self.bytes.observe(size)
+
+    def snapshot(self):
+        return {'status': dict(self.statuses), 'duration_ms': self.duration.snapshot(),
+                'spans_ms': {name: histogram.snapshot() for name, histogram in self.spans.items()},
+                'queries': self.queries.snapshot(), 'bytes': self.bytes.snapshot()}
+
+
+class RequestMetrics:
+    """Histograms of the requests served by this worker, per endpoint."""
+
+    def __init__(self, bounds):
+        self.bounds = sorted(bounds)
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def observe(self, endpoint, status, duration_ms, spans_ms, queries, size):
+        with self._lock:
+            metrics = self._endpoints.get(endpoint)
+            if metrics is None:
+                metrics = self._endpoints[endpoint] = EndpointMetrics(self.bounds)
+            metrics.observe(status, duration_ms, spans_ms, queries, size)
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: metrics.snapshot() for endpoint, metrics in self._endpoints.items()}
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Process wide histograms with the BLOCKCHAIN_METRICS buckets."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = RequestMetrics(settings.BLOCKCHAIN_METRICS['BUCKETS'])
+    return _metrics
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    global _metrics
+    if setting == 'BLOCKCHAIN_METRICS':
+        _metrics = None
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+from django.db import connections
+
+from blockchain.metrics import end_request, get_metrics, instrument, start_request
+
+logger = logging.getLogger('blockchain.requests')
+
+
+class RequestMetricsMiddleware:
+    """
+    Times every request and the spans accounted during it. The breakdown is
+    sent in a Server-Timing header, logged as one JSON line per request and
+    aggregated per endpoint for the metrics endpoint.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.BLOCKCHAIN_METRICS['ENABLED']:
+            return self.get_response(request)
+        # Connections opened before the middleware was loaded missed the signal.
+        for connection in connections.all():
+            instrument(connection)
+        timings, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        self.report(request, response, timings)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.BLOCKCHAIN_METRICS['ENABLED']:
+            return await self.get_response(request)
+        timings, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        self.report(request, response, timings)
+        return response
+
+    def report(self, request, response, timings):
+        config = settings.BLOCKCHAIN_METRICS
+        duration = timings.elapsed() * 1000
+        spans = {name: round(seconds * 1000, 3) for name, seconds in timings.spans.items()}
+        size = None if response.streaming else len(response.content)
+        match = request.resolver_match
+        endpoint = match.view_name if match else 'unmatched'
+
+        get_metrics().observe(endpoint, response.status_code, duration, spans, timings.queries, size)
+        if config['SERVER_TIMING']:
+            entries = [f'{name};dur={value}' for name, value in spans.items()]
+            entries.append(f'total;dur={duration:.3f};desc="{timings.queries} queries"')
+            response['Server-Timing'] = ', '.join(entries)
+        if config['LOG'] and logger.isEnabledFor(logging.INFO):
+            user = getattr(request, 'user', None)
+            logger.info(json.dumps({
+                'method': request.method, 'endpoint': endpoint, 'path': request.path,
+                'status': response.status_code, 'duration_ms': round(duration, 3), 'spans_ms': spans,
+                'queries': timings.queries, 'bytes': size,
+                'user': user.pk if user is not None and user.is_authenticated else None,
+            }, separators=(',', ':')))
@@ -0,0 +1,93 @@
+# Generated by Django 3.2.2 on 2026-10-18 15:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AddressTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('block_height', models.PositiveIntegerField(null=True)),
+                ('value', models.DecimalField(decimal_places=0, max_digits=40)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IndexedAddress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chain', models.CharField(max_length=3)),
+                ('address', models.CharField(max_length=66)),
+                ('balance', models.DecimalField(decimal_places=0, default=0, max_digits=40)),
+                ('total_received', models.DecimalField(decimal_places=0, default=0, max_digits=40)),
+                ('total_sent', models.DecimalField(decimal_places=0, default=0, max_digits=40)),
+                ('tx_count', models.PositiveIntegerField(default=0)),
+                ('synced_height', models.PositiveIntegerField(null=True)),
+                ('synced', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IndexedTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chain', models.CharField(max_length=3)),
+                ('hash', models.CharField(max_length=66)),
+                ('block_height', models.PositiveIntegerField(null=True)),
+                ('time', models.BigIntegerField(null=True)),
+                ('fee', models.DecimalField(decimal_places=0, max_digits=40, null=True)),
+                ('complete', models.BooleanField(default=False)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IndexedTransactionIO',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_output', models.BooleanField()),
+                ('position', models.PositiveIntegerField()),
+                ('address', models.CharField(max_length=66, null=True)),
+                ('value', models.DecimalField(decimal_places=0, max_digits=40)),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ios', to='blockchain.indexedtransaction')),
+            ],
+            options={
+                'ordering': ['is_output', 'position'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='indexedtransaction',
+            constraint=models.UniqueConstraint(fields=('chain', 'hash'), name='unique_indexed_transaction'),
+        ),
+        migrations.AddConstraint(
+            model_name='indexedaddress',
+            constraint=models.UniqueConstraint(fields=('chain', 'address'), name='unique_indexed_address'),
+        ),
+        migrations.AddField(
+            model_name='addresstransaction',
+            name='address',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='blockchain.indexedaddress'),
+        ),
+        migrations.AddField(
+            model_name='addresstransaction',
+            name='transaction',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='blockchain.indexedtransaction'),
+        ),
+        migrations.AddIndex(
+            model_name='indexedtransactionio',
+            index=models.Index(fields=['address'], name='indexed_io_address'),
+        ),
+        migrations.AddIndex(
+            model_name='addresstransaction',
+            index=models.Index(fields=['address', 'block_height'], name='address_tx_height'),
+        ),
+        migrations.AddConstraint(
+            model_name='addresstransaction',
+            constraint=models.UniqueConstraint(fields=('address', 'transaction'), name='unique_address_transaction'),
+        ),
+    ]
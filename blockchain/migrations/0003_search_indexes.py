@@ -0,0 +1,38 @@
+# Generated by Django 3.2.2 on 2026-10-18 15:05
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_user_addresses(apps, schema_editor):
+    # The validator the constraint replaces let concurrent requests through.
+    UserAddresses = apps.get_model('blockchain', 'UserAddresses')
+    keep = UserAddresses.objects.values('user', 'address').annotate(keep=Min('id')).values('keep')
+    UserAddresses.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0002_local_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='searchaddress',
+            index=models.Index(fields=['user', 'address', 'valid'], name='search_address_lookup'),
+        ),
+        migrations.AddIndex(
+            model_name='searchaddress',
+            index=models.Index(fields=['user', 'timestamp'], name='search_address_history'),
+        ),
+        migrations.AddIndex(
+            model_name='searchtransaction',
+            index=models.Index(fields=['user', 'timestamp'], name='search_transaction_history'),
+        ),
+        migrations.RunPython(remove_duplicate_user_addresses, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='useraddresses',
+            constraint=models.UniqueConstraint(fields=('user', 'address'), name='unique_user_address'),
+        ),
+    ]
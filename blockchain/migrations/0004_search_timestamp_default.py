@@ -0,0 +1,24 @@
+# Generated by Django 3.2.2 on 2026-10-18 15:11
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0003_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchaddress',
+            name='timestamp',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='searchtransaction',
+            name='timestamp',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, editable=False),
+        ),
+    ]
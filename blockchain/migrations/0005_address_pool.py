@@ -0,0 +1,22 @@
+# Generated by Django 3.2.2 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0004_search_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useraddresses',
+            name='allocated',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='useraddresses',
+            index=models.Index(fields=['user', 'allocated'], name='user_address_pool'),
+        ),
+    ]
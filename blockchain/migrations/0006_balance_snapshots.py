@@ -0,0 +1,31 @@
+# Generated by Django 3.2.2 on 2026-10-18 15:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0005_address_pool'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chain', models.CharField(max_length=3)),
+                ('address', models.CharField(max_length=50, unique=True)),
+                ('balance', models.DecimalField(decimal_places=0, max_digits=40)),
+                ('total_received', models.DecimalField(decimal_places=0, max_digits=40)),
+                ('tx_count', models.PositiveIntegerField(default=0)),
+                ('refreshed', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='useraddresses',
+            name='snapshot',
+            field=models.ForeignObject(from_fields=('address',), null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='blockchain.balancesnapshot', to_fields=('address',)),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.2.2 on 2026-10-18 16:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+
+
+def summarize_searches(apps, schema_editor):
+    SearchAddress = apps.get_model('blockchain', 'SearchAddress')
+    SearchSummary = apps.get_model('blockchain', 'SearchSummary')
+    groups = SearchAddress.objects.order_by().values('user', 'address').annotate(
+        first_seen=Min('timestamp'), last_seen=Max('timestamp'), count=Count('id'))
+    batch = []
+    for group in groups.iterator(chunk_size=900):
+        batch.append(SearchSummary(user_id=group['user'], address=group['address'], first_seen=group['first_seen'],
+                                   last_seen=group['last_seen'], count=group['count']))
+        if len(batch) >= 900:
+            SearchSummary.objects.bulk_create(batch)
+            batch = []
+    SearchSummary.objects.bulk_create(batch)
+    # The validity of the latest search, a subquery in the grouping above would be grouped by.
+    latest = SearchAddress.objects.filter(user=OuterRef('user'), address=OuterRef('address')) \
+        .order_by('-timestamp', '-id').values('valid')[:1]
+    SearchSummary.objects.update(valid=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('blockchain', '0007_data_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(max_length=50)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('valid', models.BooleanField(default=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchsummary',
+            index=models.Index(fields=['user', 'last_seen'], name='search_summary_history'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchsummary',
+            constraint=models.UniqueConstraint(fields=('user', 'address'), name='unique_search_summary'),
+        ),
+        migrations.RunPython(summarize_searches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.2 on 2026-10-18 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0008_search_summaries'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='balancesnapshot',
+            name='address',
+            field=models.CharField(max_length=90, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='indexedaddress',
+            name='address',
+            field=models.CharField(max_length=90),
+        ),
+        migrations.AlterField(
+            model_name='indexedtransactionio',
+            name='address',
+            field=models.CharField(max_length=90, null=True),
+        ),
+        migrations.AlterField(
+            model_name='searchaddress',
+            name='address',
+            field=models.CharField(max_length=90),
+        ),
+        migrations.AlterField(
+            model_name='searchsummary',
+            name='address',
+            field=models.CharField(max_length=90),
+        ),
+        migrations.AlterField(
+            model_name='searchtransaction',
+            name='transaction',
+            field=models.CharField(max_length=66),
+        ),
+        migrations.AlterField(
+            model_name='useraddresses',
+            name='address',
+            field=models.CharField(max_length=90),
+        ),
+    ]
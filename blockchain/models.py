@@ -1,27 +1,58 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.core.exceptions import NON_FIELD_ERRORS
 
 
 # For search by address logging.
+# Timestamps are taken when the search is made, the row may be written later.
 class SearchAddress(models.Model):
-    timestamp = models.DateTimeField(auto_now_add=True, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False, blank=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
-    address = models.CharField(max_length=50)
+    address = models.CharField(max_length=90)
     valid = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'address', 'valid'], name='search_address_lookup'),
+            models.Index(fields=['user', 'timestamp'], name='search_address_history'),
+        ]
+
+
+# Address searches of a user folded per address, see blockchain.summaries.
+# valid is the one of the latest search.
+class SearchSummary(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    address = models.CharField(max_length=90)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    valid = models.BooleanField(default=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'address'], name='unique_search_summary'),
+        ]
+        indexes = [models.Index(fields=['user', 'last_seen'], name='search_summary_history')]
+
 
 # For search by transaction logging.
 class SearchTransaction(models.Model):
-    timestamp = models.DateTimeField(auto_now_add=True, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False, blank=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
-    transaction = models.CharField(max_length=64)
+    transaction = models.CharField(max_length=66)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'timestamp'], name='search_transaction_history')]
 
 
 class UserAddresses(models.Model):
@@ -29,4 +60,105 @@ class UserAddresses(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
-    address = models.CharField(max_length=50)
+    address = models.CharField(max_length=90)
+    # Deposit address of an open order, see orders.allocation.
+    allocated = models.BooleanField(default=False)
+    # Joins the balance snapshot of the address, there is no column.
+    snapshot = models.ForeignObject('BalanceSnapshot', on_delete=models.DO_NOTHING, from_fields=('address',),
+                                    to_fields=('address',), null=True, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'address'], name='unique_user_address'),
+        ]
+        indexes = [models.Index(fields=['user', 'allocated'], name='user_address_pool')]
+
+
+# Balance of an address as of its last refresh, see blockchain.snapshots.
+# The address is stored as users mark it, amounts like in the local index.
+class BalanceSnapshot(models.Model):
+    chain = models.CharField(max_length=3)
+    address = models.CharField(max_length=90, unique=True)
+    balance = models.DecimalField(max_digits=40, decimal_places=0)
+    total_received = models.DecimalField(max_digits=40, decimal_places=0)
+    tx_count = models.PositiveIntegerField(default=0)
+    refreshed = models.DateTimeField()
+
+
+# Version of the data of a user behind a read endpoint, bumped when it
+# changes, see blockchain.versions.
+class DataVersion(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    kind = models.CharField(max_length=10)
+    version = models.PositiveBigIntegerField(default=0)
+    modified = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind'], name='unique_data_version'),
+        ]
+
+
+# Local index of upstream data, so repeat searches need no upstream call.
+# Amounts are in the smallest unit of the chain, wei overflow a bigint.
+class IndexedTransaction(models.Model):
+    chain = models.CharField(max_length=3)
+    hash = models.CharField(max_length=66)
+    block_height = models.PositiveIntegerField(null=True)
+    time = models.BigIntegerField(null=True)
+    fee = models.DecimalField(max_digits=40, decimal_places=0, null=True)
+    # Transactions only seen in address listings have no inputs and outputs yet.
+    complete = models.BooleanField(default=False)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['chain', 'hash'], name='unique_indexed_transaction'),
+        ]
+
+
+class IndexedTransactionIO(models.Model):
+    transaction = models.ForeignKey(IndexedTransaction, on_delete=models.CASCADE, related_name='ios')
+    is_output = models.BooleanField()
+    position = models.PositiveIntegerField()
+    address = models.CharField(max_length=90, null=True)
+    value = models.DecimalField(max_digits=40, decimal_places=0)
+
+    class Meta:
+        ordering = ['is_output', 'position']
+        indexes = [models.Index(fields=['address'], name='indexed_io_address')]
+
+
+class IndexedAddress(models.Model):
+    chain = models.CharField(max_length=3)
+    address = models.CharField(max_length=90)
+    balance = models.DecimalField(max_digits=40, decimal_places=0, default=0)
+    total_received = models.DecimalField(max_digits=40, decimal_places=0, default=0)
+    total_sent = models.DecimalField(max_digits=40, decimal_places=0, default=0)
+    tx_count = models.PositiveIntegerField(default=0)
+    # Highest confirmed block of the indexed transactions, the next sync
+    # only fetches what is newer.
+    synced_height = models.PositiveIntegerField(null=True)
+    synced = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['chain', 'address'], name='unique_indexed_address'),
+        ]
+
+
+class AddressTransaction(models.Model):
+    address = models.ForeignKey(IndexedAddress, on_delete=models.CASCADE, related_name='transactions')
+    transaction = models.ForeignKey(IndexedTransaction, on_delete=models.CASCADE)
+    # Copied from the transaction so the listing is served from one index.
+    block_height = models.PositiveIntegerField(null=True)
+    value = models.DecimalField(max_digits=40, decimal_places=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['address', 'transaction'], name='unique_address_transaction'),
+        ]
+        indexes = [models.Index(fields=['address', 'block_height'], name='address_tx_height')]
@@ -0,0 +1,61 @@
+import re
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+ETH_ADDRESS = re.compile(r'^0x[0-9a-fA-F]{40}$')
+ETH_TRANSACTION = re.compile(r'^0x[0-9a-fA-F]{64}$')
+CASHADDR = re.compile(r'^(bitcoincash:)?[qp][02-9ac-hj-np-z]{41}$', re.IGNORECASE)
+
+
+class UnknownChain(ValueError):
+    pass
+
+
+def detect_address_chain(address):
+    """
+    Chain an address belongs to, told apart by its format. Legacy base58
+    addresses are shared by BTC and BCH and resolve to BTC.
+    """
+    if ETH_ADDRESS.match(address):
+        return 'ETH'
+    if CASHADDR.match(address):
+        return 'BCH'
+    return 'BTC'
+
+
+def detect_transaction_chain(transaction):
+    """BTC and BCH hashes look alike, those resolve to BTC."""
+    if ETH_TRANSACTION.match(transaction):
+        return 'ETH'
+    return 'BTC'
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(chain):
+    """Adapter configured for chain in BLOCKCHAIN_PROVIDERS."""
+    chain = chain.upper()
+    provider = _providers.get(chain)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(chain)
+            if provider is None:
+                try:
+                    config = settings.BLOCKCHAIN_PROVIDERS[chain]
+                except KeyError:
+                    raise UnknownChain(chain)
+                adapter = import_string(config['ADAPTER'])
+                provider = _providers[chain] = adapter(chain, config, settings.BLOCKCHAIN_UPSTREAM)
+    return provider
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    if setting in ('BLOCKCHAIN_UPSTREAM', 'BLOCKCHAIN_PROVIDERS'):
+        _providers.clear()
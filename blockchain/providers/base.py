@@ -0,0 +1,110 @@
+import threading
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from blockchain.upstream import get_async_client, get_client
+
+
+def to_int(value):
+    """Amounts arrive as ints, numeric strings or floats depending on the provider."""
+    if value in (None, ''):
+        return 0
+    if isinstance(value, int):
+        return value
+    return int(Decimal(str(value)))
+
+
+def to_timestamp(value):
+    """Unix timestamp of an int or a 'YYYY-MM-DD HH:MM:SS' UTC string."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc).timestamp())
+
+
+class Provider:
+    """
+    Adapter for the upstream API serving one chain.
+
+    Subclasses describe the request behind every lookup and turn the provider
+    payload into the compact schema the API responds with, so raw payloads
+    never reach the renderer:
+
+    address      chain, address, balance, total_received, total_sent, tx_count,
+                 txs: [hash, block_height, time, value]
+    transaction  chain, hash, block_height, time, fee,
+                 inputs/outputs: [address, value]
+    balances     {address: {balance, total_received, tx_count}}
+
+    value of an address transaction is the net amount it moved in or out of
+    that address. Amounts are in the smallest unit of the chain (satoshi, wei)
+    and block_height is None while a transaction is unconfirmed.
+
+    BATCH_SIZE is the most addresses one balance request may carry and
+    MAX_CONCURRENCY the most balance requests of a worker to run against the
+    provider at once, slots enforces it across threads.
+    ADDRESS_PAGE_SIZE is how many transactions, newest first, one address
+    request returns at most. Address payloads holding their transactions in
+    a top level array named ADDRESS_TXS_KEY can be streamed, see
+    parse_address_tx. Timeouts left as None fall back to BLOCKCHAIN_UPSTREAM.
+    """
+    BATCH_SIZE = 1
+    ADDRESS_PAGE_SIZE = 50
+    ADDRESS_TXS_KEY = None
+    MAX_CONCURRENCY = 4
+    CONNECT_TIMEOUT = None
+    READ_TIMEOUT = None
+
+    def __init__(self, chain, config, defaults):
+        self.chain = chain
+        self.batch_size = config.get('BATCH_SIZE', self.BATCH_SIZE)
+        self.max_concurrency = config.get('MAX_CONCURRENCY', self.MAX_CONCURRENCY)
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+        declared = {'CONNECT_TIMEOUT': self.CONNECT_TIMEOUT, 'READ_TIMEOUT': self.READ_TIMEOUT}
+        self.client_config = {
+            **defaults,
+            **{key: value for key, value in declared.items() if value is not None},
+            **config,
+        }
+
+    def client(self):
+        return get_client(self.chain, self.client_config)
+
+    def async_client(self):
+        return get_async_client(self.chain, self.client_config)
+
+    def chunks(self, addresses):
+        for start in range(0, len(addresses), self.batch_size):
+            yield addresses[start:start + self.batch_size]
+
+    def canonical_address(self, address):
+        return address
+
+    def page_size(self, limit=None):
+        return self.ADDRESS_PAGE_SIZE if limit is None else min(limit, self.ADDRESS_PAGE_SIZE)
+
+    def address_request(self, address, offset=0, limit=None):
+        """(path, params) of the address summary with a page of at most limit transactions."""
+        raise NotImplementedError
+
+    def transaction_request(self, transaction):
+        raise NotImplementedError
+
+    def balance_request(self, addresses):
+        """(path, params) of the balances of at most batch_size addresses."""
+        raise NotImplementedError
+
+    def parse_address(self, payload, address):
+        """Normalized address, or None if the payload does not describe one."""
+        raise NotImplementedError
+
+    def parse_address_tx(self, tx, address):
+        """Normalized item of the ADDRESS_TXS_KEY array of an address payload."""
+        raise NotImplementedError
+
+    def parse_transaction(self, payload):
+        raise NotImplementedError
+
+    def parse_balances(self, payload):
+        raise NotImplementedError
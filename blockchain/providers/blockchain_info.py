@@ -0,0 +1,61 @@
+from blockchain.providers.base import Provider, to_int
+
+
+class BlockchainInfoProvider(Provider):
+    """Bitcoin through the blockchain.info data API."""
+    BATCH_SIZE = 50
+    MAX_CONCURRENCY = 4
+    ADDRESS_TXS_KEY = 'txs'
+
+    def address_request(self, address, offset=0, limit=None):
+        return f"rawaddr/{address}", {'limit': self.page_size(limit), 'offset': offset}
+
+    def transaction_request(self, transaction):
+        return f"rawtx/{transaction}", None
+
+    def balance_request(self, addresses):
+        return "balance", {'active': '|'.join(addresses)}
+
+    def parse_address(self, payload, address):
+        return {
+            'chain': self.chain,
+            'address': payload.get('address') or address,
+            'balance': to_int(payload.get('final_balance')),
+            'total_received': to_int(payload.get('total_received')),
+            'total_sent': to_int(payload.get('total_sent')),
+            'tx_count': payload.get('n_tx', 0),
+            'txs': [self.parse_address_tx(tx, address) for tx in payload.get('txs', [])],
+        }
+
+    def parse_address_tx(self, tx, address):
+        return {
+            'hash': tx['hash'],
+            'block_height': tx.get('block_height'),
+            'time': tx.get('time'),
+            'value': to_int(tx.get('result')),
+        }
+
+    def parse_transaction(self, payload):
+        return {
+            'chain': self.chain,
+            'hash': payload['hash'],
+            'block_height': payload.get('block_height'),
+            'time': payload.get('time'),
+            'fee': to_int(payload.get('fee')),
+            # Coinbase inputs spend no previous output.
+            'inputs': [{
+                'address': (tx_in.get('prev_out') or {}).get('addr'),
+                'value': to_int((tx_in.get('prev_out') or {}).get('value')),
+            } for tx_in in payload.get('inputs', [])],
+            'outputs': [{
+                'address': tx_out.get('addr'),
+                'value': to_int(tx_out.get('value')),
+            } for tx_out in payload.get('out', [])],
+        }
+
+    def parse_balances(self, payload):
+        return {address: {
+            'balance': to_int(entry.get('final_balance')),
+            'total_received': to_int(entry.get('total_received')),
+            'tx_count': entry.get('n_tx', 0),
+        } for address, entry in payload.items()}
@@ -0,0 +1,145 @@
+from blockchain.providers.base import Provider, to_int, to_timestamp
+
+
+def _block_height(block_id):
+    # Mempool transactions have a block_id of -1.
+    return block_id if block_id is not None and block_id >= 0 else None
+
+
+def _entry(payload):
+    data = payload.get('data') or {}
+    return next(iter(data.values()), None)
+
+
+class BlockchairProvider(Provider):
+    """
+    Bitcoin-like chains through api.blockchair.com,
+    BASE_URL ends with the chain path, e.g. /bitcoin-cash/.
+    """
+    BATCH_SIZE = 100
+    MAX_CONCURRENCY = 2
+    READ_TIMEOUT = 15
+    ADDRESS_PAGE_SIZE = 100
+    PREFIX = 'bitcoincash:'
+
+    def canonical_address(self, address):
+        if address.lower().startswith(self.PREFIX):
+            address = address[len(self.PREFIX):]
+        return address.lower()
+
+    def address_request(self, address, offset=0, limit=None):
+        params = {'transaction_details': 'true', 'limit': self.page_size(limit), 'offset': offset}
+        return f"dashboards/address/{address}", params
+
+    def transaction_request(self, transaction):
+        return f"dashboards/transaction/{transaction}", None
+
+    def balance_request(self, addresses):
+        return f"dashboards/addresses/{','.join(addresses)}", None
+
+    def parse_address(self, payload, address):
+        entry = _entry(payload)
+        if not entry:
+            return None
+        info = entry['address']
+        return {
+            'chain': self.chain,
+            'address': address,
+            'balance': to_int(info.get('balance')),
+            'total_received': to_int(info.get('received')),
+            'total_sent': to_int(info.get('spent')),
+            'tx_count': info.get('transaction_count') or 0,
+            'txs': [{
+                'hash': tx['hash'],
+                'block_height': _block_height(tx.get('block_id')),
+                'time': to_timestamp(tx.get('time')),
+                'value': to_int(tx.get('balance_change')),
+            } for tx in entry.get('transactions', []) if isinstance(tx, dict)],
+        }
+
+    def parse_transaction(self, payload):
+        entry = _entry(payload)
+        if not entry:
+            return None
+        tx = entry['transaction']
+        return {
+            'chain': self.chain,
+            'hash': tx['hash'],
+            'block_height': _block_height(tx.get('block_id')),
+            'time': to_timestamp(tx.get('time')),
+            'fee': to_int(tx.get('fee')),
+            'inputs': [{'address': i.get('recipient'), 'value': to_int(i.get('value'))}
+                       for i in entry.get('inputs', [])],
+            'outputs': [{'address': o.get('recipient'), 'value': to_int(o.get('value'))}
+                        for o in entry.get('outputs', [])],
+        }
+
+    def parse_balances(self, payload):
+        addresses = (payload.get('data') or {}).get('addresses') or {}
+        return {address: {
+            'balance': to_int(info.get('balance')),
+            'total_received': to_int(info.get('received')),
+            'tx_count': info.get('transaction_count') or 0,
+        } for address, info in addresses.items()}
+
+
+class BlockchairEthereumProvider(BlockchairProvider):
+    """
+    Ethereum through api.blockchair.com. It has no multi address dashboard,
+    so balances are fetched one address per request.
+    """
+    BATCH_SIZE = 1
+    MAX_CONCURRENCY = 4
+
+    def canonical_address(self, address):
+        return address.lower()
+
+    def address_request(self, address, offset=0, limit=None):
+        return f"dashboards/address/{address}", {'limit': self.page_size(limit), 'offset': offset}
+
+    def balance_request(self, addresses):
+        return f"dashboards/address/{addresses[0]}", None
+
+    def parse_address(self, payload, address):
+        entry = _entry(payload)
+        if not entry:
+            return None
+        info = entry['address']
+        return {
+            'chain': self.chain,
+            'address': address,
+            'balance': to_int(info.get('balance')),
+            'total_received': to_int(info.get('received_approximate')),
+            'total_sent': to_int(info.get('spent_approximate')),
+            'tx_count': info.get('transaction_count') or 0,
+            'txs': [{
+                'hash': call['transaction_hash'],
+                'block_height': _block_height(call.get('block_id')),
+                'time': to_timestamp(call.get('time')),
+                'value': (1 if (call.get('recipient') or '').lower() == address else -1) * to_int(call.get('value')),
+            } for call in entry.get('calls', [])],
+        }
+
+    def parse_transaction(self, payload):
+        entry = _entry(payload)
+        if not entry:
+            return None
+        tx = entry['transaction']
+        value = to_int(tx.get('value'))
+        return {
+            'chain': self.chain,
+            'hash': tx['hash'],
+            'block_height': _block_height(tx.get('block_id')),
+            'time': to_timestamp(tx.get('time')),
+            'fee': to_int(tx.get('fee')),
+            'inputs': [{'address': tx.get('sender'), 'value': value}],
+            'outputs': [{'address': tx.get('recipient'), 'value': value}],
+        }
+
+    def parse_balances(self, payload):
+        data = payload.get('data') or {}
+        return {address.lower(): {
+            'balance': to_int(entry['address'].get('balance')),
+            'total_received': to_int(entry['address'].get('received_approximate')),
+            'tx_count': entry['address'].get('transaction_count') or 0,
+        } for address, entry in data.items() if entry}
@@ -0,0 +1,164 @@
+"""
+Token bucket rate limits of users and of the calls made to upstreams.
+
+A bucket holds up to burst tokens and refills at rate tokens a second. A
+call over budget may reserve a future token and wait for it, up to max_wait
+seconds, so callers are queued in arrival order instead of failing at once.
+"""
+import asyncio
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from blockchain.upstream import UpstreamThrottled
+
+
+def _take(state, now, rate, burst, max_wait):
+    """New bucket state and (admitted, wait) of a call taking one token."""
+    tokens, updated = state if state is not None else (burst, now)
+    tokens = min(burst, tokens + (now - updated) * rate)
+    wait = max(0.0, (1 - tokens) / rate)
+    if wait > max_wait:
+        return (tokens, now), (False, wait)
+    return (tokens - 1, now), (True, wait)
+
+
+class LocalBuckets:
+    """Buckets of one process."""
+    blocking = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def transact(self, key, fn):
+        with self._lock:
+            self._state[key], result = fn(self._state.get(key))
+        return result
+
+
+class FileBuckets:
+    """Buckets shared by every worker on the host, one locked file each."""
+    # Waits for the file lock, coroutines reserve from a thread instead.
+    blocking = True
+
+    def __init__(self, location):
+        self.location = location or os.path.join(tempfile.gettempdir(), 'nexchange-rate-limits')
+        os.makedirs(self.location, exist_ok=True)
+
+    def transact(self, key, fn):
+        path = os.path.join(self.location, hashlib.sha1(key.encode()).hexdigest())
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.read(fd, 64).split()
+            state = (float(raw[0]), float(raw[1])) if len(raw) == 2 else None
+            state, result = fn(state)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, f'{state[0]!r} {state[1]!r}'.encode())
+        finally:
+            os.close(fd)
+        return result
+
+
+class RateLimiter:
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {'served': 0, 'queued': 0, 'throttled': 0})
+
+    def reserve(self, key, rate, burst, max_wait=0, label=None):
+        """
+        (admitted, wait) of one call against the bucket key. An admitted call
+        must wait that many seconds first, a rejected one could retry then.
+        A rate of 0 disables the limit. Outcomes are counted per label, the
+        key by default.
+        """
+        if rate <= 0:
+            admitted, wait = True, 0.0
+        else:
+            admitted, wait = self.backend.transact(key, lambda state: _take(state, time.time(), rate, burst, max_wait))
+        outcome = 'throttled' if not admitted else 'queued' if wait else 'served'
+        with self._lock:
+            self._counts[label or key][outcome] += 1
+        return admitted, wait
+
+    async def areserve(self, key, rate, burst, max_wait=0, label=None):
+        """Like reserve, run off the event loop when the backend blocks."""
+        if self.backend.blocking and rate > 0:
+            return await sync_to_async(self.reserve, thread_sensitive=False)(key, rate, burst, max_wait, label)
+        return self.reserve(key, rate, burst, max_wait, label)
+
+    def stats(self):
+        with self._lock:
+            return {key: dict(counts) for key, counts in self._counts.items()}
+
+
+BACKENDS = {
+    'local': lambda config: LocalBuckets(),
+    'file': lambda config: FileBuckets(config['LOCATION']),
+}
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Process wide limiter over the BLOCKCHAIN_RATE_LIMITS backend."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                config = settings.BLOCKCHAIN_RATE_LIMITS
+                _limiter = RateLimiter(BACKENDS[config['BACKEND']](config))
+    return _limiter
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    global _limiter
+    if setting == 'BLOCKCHAIN_RATE_LIMITS':
+        _limiter = None
+
+
+def user_limit(scope):
+    return settings.BLOCKCHAIN_RATE_LIMITS['USER'].get(scope)
+
+
+def upstream_limit(chain):
+    limits = settings.BLOCKCHAIN_RATE_LIMITS['UPSTREAM']
+    return {**limits['DEFAULT'], **limits.get(chain, {})}
+
+
+def _upstream_bucket(chain):
+    limit = upstream_limit(chain)
+    return f'upstream:{chain}', limit['RATE'], limit['BURST'], limit['MAX_WAIT']
+
+
+def _admit(chain, admitted, wait):
+    if not admitted:
+        raise UpstreamThrottled(f'{chain} call budget exhausted, retry in {wait:.1f}s', retry_after=wait)
+    return wait
+
+
+def acquire_upstream(chain):
+    """Wait for a call to chain's upstream to fit the budget shared by the workers."""
+    wait = _admit(chain, *get_limiter().reserve(*_upstream_bucket(chain)))
+    if wait:
+        time.sleep(wait)
+
+
+async def aacquire_upstream(chain):
+    wait = _admit(chain, *await get_limiter().areserve(*_upstream_bucket(chain)))
+    if wait:
+        await asyncio.sleep(wait)
@@ -0,0 +1,217 @@
+"""
+Write-behind log of user searches.
+
+Searches are queued in memory and written in batches with bulk_create by a
+background thread, so the request path never waits for the database write
+lock. The queue is flushed when it reaches BATCH_SIZE, every FLUSH_INTERVAL
+seconds and when the worker exits.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import DatabaseError, close_old_connections, transaction
+from django.dispatch import receiver
+
+from blockchain.metrics import span
+from blockchain.models import SearchAddress, SearchTransaction
+from blockchain.summaries import summarize
+from blockchain.versions import SEARCHES, bump
+
+logger = logging.getLogger(__name__)
+
+
+class SearchRecorder:
+    """
+    Bounded queue of unsaved log entries. When it is full the overflow policy
+    decides: 'sync' writes the entry on the caller's thread, 'drop' discards
+    it and 'drop_oldest' discards the oldest queued entry to make room.
+    """
+    OVERFLOW_POLICIES = ('sync', 'drop', 'drop_oldest')
+
+    def __init__(self, batch_size=500, flush_interval=1.0, max_queue=10000, overflow='sync'):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ImproperlyConfigured(f"Unknown search log overflow policy {overflow!r}.")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._queue = deque()
+        self._thread = None
+        self._pid = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.overflowed = 0
+        self.failed = 0
+
+    def record(self, entry):
+        """Queue an unsaved model instance, returns False if it was dropped."""
+        write_now = False
+        with self._lock:
+            self._ensure_thread()
+            self.recorded += 1
+            if len(self._queue) >= self.max_queue:
+                self.overflowed += 1
+                if self.overflow == 'drop':
+                    self.dropped += 1
+                    return False
+                if self.overflow == 'drop_oldest':
+                    self._queue.popleft()
+                    self.dropped += 1
+                    self._queue.append(entry)
+                else:
+                    write_now = True
+            else:
+                self._queue.append(entry)
+            if len(self._queue) >= self.batch_size:
+                self._wakeup.set()
+        if write_now:
+            self._write([entry])
+        return True
+
+    def flush(self):
+        """Write everything queued so far on the calling thread."""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if not batch:
+                    return
+                self._write(batch)
+
+    def _write(self, entries):
+        by_model = {}
+        for entry in entries:
+            by_model.setdefault(type(entry), []).append(entry)
+        for model, objs in by_model.items():
+            try:
+                # bulk_create sends no post_save, the summaries are added to here.
+                with transaction.atomic():
+                    model.objects.bulk_create(objs)
+                    if model is SearchAddress:
+                        summarize(objs)
+                bump((obj.user_id for obj in objs), SEARCHES)
+            except DatabaseError:
+                # Retrying a failing batch would stall the queue behind it.
+                logger.exception("Dropped %d %s log entries", len(objs), model.__name__)
+                with self._lock:
+                    self.failed += len(objs)
+            else:
+                with self._lock:
+                    self.written += len(objs)
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            # Entries inherited from the parent process are its to write.
+            self._pid = pid
+            self._queue.clear()
+            self._thread = None
+        if self._thread is None and not self._stopped.is_set():
+            self._thread = threading.Thread(target=self._run, name='search-recorder', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+    def stop(self, timeout=5):
+        """Stop the background thread and write what is left."""
+        self._stopped.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {'queued': len(self._queue), 'recorded': self.recorded, 'written': self.written,
+                    'dropped': self.dropped, 'overflowed': self.overflowed, 'failed': self.failed}
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """Process wide recorder configured by BLOCKCHAIN_SEARCH_LOG, None when unbuffered."""
+    global _recorder
+    config = settings.BLOCKCHAIN_SEARCH_LOG
+    if not config['BUFFERED']:
+        return None
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = SearchRecorder(config['BATCH_SIZE'], config['FLUSH_INTERVAL'],
+                                           config['MAX_QUEUE'], config['OVERFLOW'])
+    return _recorder
+
+
+def flush_pending():
+    """Make the searches logged by this worker visible to the following queries."""
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.flush()
+
+
+def stop_recorder():
+    global _recorder
+    with _recorder_lock:
+        recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.stop()
+
+
+atexit.register(stop_recorder)
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    if setting == 'BLOCKCHAIN_SEARCH_LOG':
+        stop_recorder()
+
+
+def _record(entry):
+    recorder = get_recorder()
+    with span('log'):
+        if recorder is None:
+            entry.save()
+            bump([entry.user_id], SEARCHES)
+        else:
+            recorder.record(entry)
+
+
+def _fits(model, field, value):
+    """
+    Whether the column holds value. The columns hold every well-formed
+    identifier, longer values are malformed input and are not logged.
+    """
+    max_length = model._meta.get_field(field).max_length
+    if len(value) <= max_length:
+        return True
+    logger.warning("Search of a %d character %s not logged, the column holds %d", len(value), field, max_length)
+    return False
+
+
+def record_address_search(user, address, valid=True):
+    if _fits(SearchAddress, 'address', address):
+        _record(SearchAddress(user_id=user.id, address=address, valid=valid))
+
+
+def record_transaction_search(user, transaction):
+    if _fits(SearchTransaction, 'transaction', transaction):
+        _record(SearchTransaction(user_id=user.id, transaction=transaction))
@@ -0,0 +1,116 @@
+"""
+Balance snapshots of the addresses users marked as theirs.
+
+The refresh_balances command fetches balances in batches, addresses of
+recently active users and the oldest snapshots first, and stores them as
+BalanceSnapshot rows. The balance endpoint then sums the snapshots of a user
+in one aggregate query, UserAddresses joined to BalanceSnapshot on the
+address, instead of asking the upstreams.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Exists, F, Min, OuterRef, Q, Sum
+from django.utils import timezone
+
+from blockchain.balances import fetch_balances, locate
+from blockchain.models import BalanceSnapshot, SearchSummary, UserAddresses
+from blockchain.providers import UnknownChain
+from blockchain.versions import BALANCES, bump_owners
+
+# Below the 999 parameters older SQLite versions accept in a query.
+CHUNK_SIZE = 900
+FIELDS = ['chain', 'balance', 'total_received', 'tx_count', 'refreshed']
+
+
+def store_snapshots(addresses, found):
+    """
+    Insert or update the snapshots of addresses, found holds their balances
+    keyed by chain and canonical address like fetch_balances collects them.
+    """
+    now = timezone.now()
+    snapshots = {}
+    for address in addresses:
+        try:
+            provider, canonical = locate(address)
+        except UnknownChain:
+            continue
+        data = found.get((provider.chain, canonical))
+        if data is not None:
+            snapshots[address] = BalanceSnapshot(
+                chain=provider.chain, address=address, balance=data['balance'],
+                total_received=data.get('total_received') or 0, tx_count=data.get('tx_count') or 0, refreshed=now)
+    snapshots = list(snapshots.values())
+    changed = []
+    for start in range(0, len(snapshots), CHUNK_SIZE):
+        chunk = snapshots[start:start + CHUNK_SIZE]
+        stored = {address: (id, balance) for address, id, balance in BalanceSnapshot.objects
+                  .filter(address__in=[s.address for s in chunk]).values_list('address', 'id', 'balance')}
+        for snapshot in chunk:
+            snapshot.id, balance = stored.get(snapshot.address, (None, None))
+            if balance != snapshot.balance:
+                changed.append(snapshot.address)
+        BalanceSnapshot.objects.bulk_update([s for s in chunk if s.id], FIELDS)
+        # Stored concurrently since, by a request asking for a fresh balance.
+        BalanceSnapshot.objects.bulk_create([s for s in chunk if not s.id], ignore_conflicts=True)
+    # Refreshes that leave the balances as they were keep the validators.
+    bump_owners(changed, BALANCES)
+    return len(snapshots)
+
+
+def snapshot_balances(user):
+    """
+    Balance report of user served from the snapshots, as_of is the time of
+    the oldest one. None when an address has no snapshot yet or the oldest is
+    more than MAX_AGE seconds old.
+    """
+    config = settings.BLOCKCHAIN_BALANCE_SNAPSHOTS
+    rows = UserAddresses.objects.filter(user=user).values('snapshot__chain') \
+        .annotate(balance=Sum('snapshot__balance'), addresses=Count('id'), as_of=Min('snapshot__refreshed')) \
+        .order_by()
+    now = timezone.now()
+    balances, as_of = {}, now
+    for row in rows:
+        if row['snapshot__chain'] is None:
+            return None
+        balances[row['snapshot__chain']] = int(row['balance'])
+        as_of = min(as_of, row['as_of'])
+    if config['MAX_AGE'] and as_of < now - timedelta(seconds=config['MAX_AGE']):
+        return None
+    return {'balances': balances, 'failed': [], 'as_of': as_of}
+
+
+def stale_addresses(limit, min_age, active_window):
+    """
+    Up to limit marked addresses whose snapshot is missing or at least
+    min_age seconds old. Addresses of users who searched in the last
+    active_window seconds come first, then the oldest snapshots.
+    """
+    now = timezone.now()
+    active = SearchSummary.objects.filter(user=OuterRef('user'), last_seen__gte=now - timedelta(seconds=active_window))
+    queryset = UserAddresses.objects \
+        .filter(Q(snapshot__id__isnull=True) | Q(snapshot__refreshed__lte=now - timedelta(seconds=min_age))) \
+        .annotate(active=Exists(active)) \
+        .order_by('-active', F('snapshot__refreshed').asc(nulls_first=True)) \
+        .values_list('address', flat=True)
+    # Addresses marked by several users are listed once.
+    addresses = {}
+    for address in queryset.iterator(chunk_size=CHUNK_SIZE):
+        addresses[address] = None
+        if len(addresses) >= limit:
+            break
+    return list(addresses)
+
+
+def refresh_snapshots(config=None):
+    """Refresh one pass of stale snapshots, returns the pass statistics."""
+    config = config or settings.BLOCKCHAIN_BALANCE_SNAPSHOTS
+    addresses = stale_addresses(config['MAX_ADDRESSES'], config['MIN_AGE'], config['ACTIVE_WINDOW'])
+    stats = {'addresses': len(addresses), 'batches': 0, 'refreshed': 0, 'failed': 0}
+    for start in range(0, len(addresses), config['BATCH_SIZE']):
+        batch = addresses[start:start + config['BATCH_SIZE']]
+        report = fetch_balances(batch, store=store_snapshots)
+        stats['batches'] += 1
+        stats['failed'] += len(report['failed'])
+        stats['refreshed'] += len(batch) - len(report['failed'])
+    return stats
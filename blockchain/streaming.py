@@ -0,0 +1,109 @@
+"""
+Incremental parsing of large upstream JSON bodies.
+
+ObjectScanner is fed the text of a JSON object in chunks and returns its
+members as soon as they are complete. Members named in arrays are returned
+item by item instead, so the memory held is bounded by the largest single
+value, not by the size of the body. Text that cannot become valid JSON
+raises ValueError as soon as it arrives.
+"""
+import json
+import re
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DELIMITERS = ' \t\n\r,]}'
+_TOKEN_TAIL = re.compile(r'[^ \t\n\r,:\]}]*\Z')
+_decoder = json.JSONDecoder()
+
+
+class ObjectScanner:
+    MEMBER = 'member'
+    ITEM = 'item'
+
+    def __init__(self, arrays=(), max_value=8 * 1024 * 1024):
+        self.arrays = frozenset(arrays)
+        self.max_value = max_value
+        self._buffer = ''
+        self._state = 'start'
+        self._key = None
+
+    def feed(self, text):
+        """Events (kind, key, value) completed by text, kind is MEMBER or ITEM."""
+        self._buffer += text
+        events, pos = [], 0
+        while True:
+            pos = _WHITESPACE.match(self._buffer, pos).end()
+            if pos == len(self._buffer):
+                break
+            char = self._buffer[pos]
+            state = self._state
+            if state == 'start':
+                self._expect(char, '{')
+                pos, self._state = pos + 1, 'first_key'
+            elif state in ('first_key', 'key'):
+                if char == '}' and state == 'first_key':
+                    pos, self._state = pos + 1, 'done'
+                    continue
+                value, end = self._value(pos)
+                if end is None:
+                    break
+                if not isinstance(value, str):
+                    raise ValueError(f"Expected an object key at {value!r}")
+                pos, self._key, self._state = end, value, 'colon'
+            elif state == 'colon':
+                self._expect(char, ':')
+                pos, self._state = pos + 1, 'value'
+            elif state == 'value':
+                if char == '[' and self._key in self.arrays:
+                    pos, self._state = pos + 1, 'first_item'
+                    continue
+                value, end = self._value(pos)
+                if end is None:
+                    break
+                events.append((self.MEMBER, self._key, value))
+                pos, self._state = end, 'member_end'
+            elif state == 'member_end':
+                self._expect(char, ',}')
+                pos, self._state = pos + 1, 'key' if char == ',' else 'done'
+            elif state in ('first_item', 'item'):
+                if char == ']' and state == 'first_item':
+                    pos, self._state = pos + 1, 'member_end'
+                    continue
+                value, end = self._value(pos)
+                if end is None:
+                    break
+                events.append((self.ITEM, self._key, value))
+                pos, self._state = end, 'item_end'
+            elif state == 'item_end':
+                self._expect(char, ',]')
+                pos, self._state = pos + 1, 'item' if char == ',' else 'member_end'
+            else:
+                raise ValueError(f"Unexpected {char!r} after the object")
+        self._buffer = self._buffer[pos:]
+        if len(self._buffer) > self.max_value:
+            raise ValueError(f"A value is larger than {self.max_value} characters")
+        return events
+
+    def close(self):
+        """Check the whole object was fed."""
+        if self._state != 'done':
+            raise ValueError("Truncated JSON object")
+
+    def _expect(self, char, allowed):
+        if char not in allowed:
+            raise ValueError(f"Expected one of {allowed!r}, got {char!r}")
+
+    def _value(self, pos):
+        """Value at pos and the position after it, end None while it may be incomplete."""
+        try:
+            value, end = _decoder.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError as exc:
+            # Cut in a string or a token more text may complete, anything else is malformed.
+            if exc.msg.startswith('Unterminated string') or _TOKEN_TAIL.match(self._buffer, exc.pos):
+                return None, None
+            raise ValueError(f"Malformed JSON at {exc.pos}: {exc.msg}") from None
+        # A number is only complete once the character after it arrived, "1." decodes as 1.
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and \
+                (end == len(self._buffer) or self._buffer[end] not in _DELIMITERS):
+            return None, None
+        return value, end
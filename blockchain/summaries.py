@@ -0,0 +1,83 @@
+"""
+Address searches of each user folded into one row per address.
+
+A user searching the same address a thousand times logs a thousand
+SearchAddress rows. The history listing and the marking of addresses as mine
+read SearchSummary instead, which keeps the first and last search time, the
+number of searches and the validity of the latest one per (user, address), so
+they cost what the distinct addresses do. Summaries are updated with every
+write of the log, a batch at a time with relative updates, so concurrent
+writers add up instead of overwriting each other.
+"""
+from django.db import router
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest, Least
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from blockchain.models import SearchAddress, SearchSummary
+
+# Below the 999 parameters older SQLite versions accept in a query.
+CHUNK_SIZE = 900
+# Each updated row takes about ten parameters.
+UPDATE_BATCH_SIZE = CHUNK_SIZE // 10
+
+
+def _fold(searches):
+    folded = {}
+    for search in sorted(searches, key=lambda search: search.timestamp):
+        key = (search.user_id, search.address)
+        summary = folded.get(key)
+        if summary is None:
+            folded[key] = summary = SearchSummary(user_id=search.user_id, address=search.address,
+                                                  first_seen=search.timestamp, count=0)
+        summary.last_seen = search.timestamp
+        summary.count += 1
+        summary.valid = search.valid
+    return folded
+
+
+def _ids(keys):
+    users = {user_id for user_id, _ in keys}
+    addresses = {address for _, address in keys}
+    # From the primary, the rows were created a moment ago and flushes may run in replica_reads views.
+    rows = SearchSummary.objects.using(router.db_for_write(SearchSummary)) \
+        .filter(user_id__in=users, address__in=addresses).values_list('user_id', 'address', 'id')
+    return {(user_id, address): pk for user_id, address, pk in rows if (user_id, address) in keys}
+
+
+def summarize(searches):
+    """Add address searches, saved or about to be, to the summaries of their (user, address)."""
+    folded = _fold(searches)
+    keys = list(folded)
+    for start in range(0, len(keys), CHUNK_SIZE):
+        chunk = set(keys[start:start + CHUNK_SIZE])
+        ids = _ids(chunk)
+        missing = chunk - set(ids)
+        if missing:
+            # Created empty and added to below, like a row created concurrently since.
+            SearchSummary.objects.bulk_create(
+                [SearchSummary(user_id=user_id, address=address, first_seen=folded[user_id, address].first_seen,
+                               last_seen=folded[user_id, address].first_seen, count=0)
+                 for user_id, address in missing], ignore_conflicts=True)
+            ids.update(_ids(missing))
+        updates = []
+        for key, pk in ids.items():
+            summary = folded[key]
+            # valid is listed first, MySQL sees the columns already set by the statement.
+            updates.append(SearchSummary(
+                id=pk,
+                valid=Case(When(last_seen__lte=summary.last_seen, then=Value(summary.valid)), default=F('valid')),
+                first_seen=Least(F('first_seen'), Value(summary.first_seen)),
+                last_seen=Greatest(F('last_seen'), Value(summary.last_seen)),
+                count=F('count') + summary.count,
+            ))
+        SearchSummary.objects.bulk_update(updates, ['valid', 'first_seen', 'last_seen', 'count'],
+                                          batch_size=UPDATE_BATCH_SIZE)
+
+
+@receiver(post_save, sender=SearchAddress)
+def _summarize_saved(instance, created, raw=False, **kwargs):
+    # Batches written with bulk_create send no signal, the recorder adds them.
+    if created and not raw:
+        summarize([instance])
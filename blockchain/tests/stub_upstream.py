@@ -0,0 +1,210 @@
+"""
+Local stand-in for blockchain.info, so benchmarks and tests never touch the network.
+
+Runs an asyncio HTTP/1.1 keep-alive server in a background thread, which
+holds thousands of slow concurrent requests without a thread per connection.
+Responses recorded in the fixtures directory are served as they are, every
+other address and transaction is generated. Latency, the share of failing
+requests and the size of generated payloads are configurable.
+
+    python -m blockchain.tests.stub_upstream --port 8900 --latency 0.1 --error-rate 0.01 --txs 50
+    python -m blockchain.tests.stub_upstream --record rawaddr/1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1F
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'blockchain_info')
+SENDER = "1BoatSLRHtKNngkdXEeobR76b53LETtpyT"
+
+BASE58 = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+ADDRESS = re.compile(r'^([13][1-9A-HJ-NP-Za-km-z]{25,34}|bc1[02-9ac-hj-np-z]{11,71})$')
+TRANSACTION = re.compile(r'^[0-9a-f]{64}$')
+
+
+def stub_address(n, prefix='1'):
+    """Address n, a Base58Check P2PKH address, or P2SH with prefix 3, of a made up hash."""
+    raw = (b'\x05' if prefix == '3' else b'\x00') + b'stub' + n.to_bytes(16, 'big')
+    raw += hashlib.sha256(hashlib.sha256(raw).digest()).digest()[:4]
+    number, digits = int.from_bytes(raw, 'big'), ''
+    while number:
+        number, digit = divmod(number, 58)
+        digits = BASE58[digit] + digits
+    return '1' * (len(raw) - len(raw.lstrip(b'\0'))) + digits
+
+
+def transaction_payload(tx_hash, address="1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1F", height=680000, outputs=1):
+    return {"hash": tx_hash, "time": 1620000000 + height - 680000, "block_height": height, "fee": 1000,
+            "inputs": [{"prev_out": {"addr": SENDER, "value": 50000 * outputs + 1000}}],
+            "out": [{"addr": address, "value": 50000}] * outputs}
+
+
+def address_payload(address, n_tx=2, outputs=1):
+    txs = [transaction_payload(hashlib.sha256(f'{address}:{i}'.encode()).hexdigest(), address,
+                               680000 + n_tx - i, outputs) for i in range(n_tx)]
+    received = 50000 * outputs * n_tx
+    return {"address": address, "n_tx": n_tx, "total_received": received, "total_sent": 0,
+            "final_balance": received, "txs": txs}
+
+
+def load_fixtures(location):
+    """Recorded responses keyed by request path, e.g. 'rawtx/<hash>'."""
+    fixtures = {}
+    if not location or not os.path.isdir(location):
+        return fixtures
+    for endpoint in os.listdir(location):
+        directory = os.path.join(location, endpoint)
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            if name.endswith('.json'):
+                with open(os.path.join(directory, name)) as f:
+                    fixtures[f'{endpoint}/{name[:-5]}'] = json.load(f)
+    return fixtures
+
+
+class StubUpstream:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, error_status=500,
+                 txs=2, outputs=1, fixtures=FIXTURES, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.txs = txs
+        self.outputs = outputs
+        self.fixtures = load_fixtures(fixtures)
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    def address(self, address, query):
+        payload = self.fixtures.get(f'rawaddr/{address}') or address_payload(address, self.txs, self.outputs)
+        offset = int(query.get('offset', ['0'])[0])
+        limit = int(query.get('limit', ['50'])[0])
+        return {**payload, "txs": payload["txs"][offset:offset + limit]}
+
+    def balance(self, address):
+        payload = self.fixtures.get(f'rawaddr/{address}')
+        if payload is None:
+            received = 50000 * self.outputs * self.txs
+            return {"final_balance": received, "n_tx": self.txs, "total_received": received}
+        return {key: payload[key] for key in ("final_balance", "n_tx", "total_received")}
+
+    def route(self, path, query):
+        parts = path.strip('/').split('/')
+        if parts[0] == 'rawaddr' and len(parts) == 2:
+            if not ADDRESS.match(parts[1]):
+                return 400, {"error": "Invalid Bitcoin Address"}
+            return 200, self.address(parts[1], query)
+        if parts[0] == 'rawtx' and len(parts) == 2:
+            if not TRANSACTION.match(parts[1]):
+                return 400, {"error": "Invalid transaction hash"}
+            return 200, self.fixtures.get(f'rawtx/{parts[1]}') or transaction_payload(parts[1], outputs=self.outputs)
+        if parts[0] == 'balance' and 'active' in query:
+            addresses = query['active'][0].split('|')
+            if not all(ADDRESS.match(a) for a in addresses):
+                return 400, {"error": "Invalid Bitcoin Address"}
+            return 200, {a: self.balance(a) for a in addresses}
+        return 404, {"error": "not found"}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                self.requests += 1
+                target = urlsplit(request_line.split()[1].decode())
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                if self.error_rate and self._random.random() < self.error_rate:
+                    self.errors += 1
+                    code, payload = self.error_status, {"error": "stub failure"}
+                else:
+                    code, payload = self.route(target.path, parse_qs(target.query))
+                body = json.dumps(payload).encode()
+                writer.write(b'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: %d\r\n\r\n' % (code, HTTPStatus(code).phrase.encode(), len(body)) + body)
+                await writer.drain()
+        except (ConnectionError, IndexError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self.handle, self.host, self.port, backlog=4096))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        async def shutdown():
+            self._server.close()
+            for task in asyncio.all_tasks():
+                if task is not asyncio.current_task():
+                    task.cancel()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def record(paths, upstream, location):
+    """Save the live responses of paths like 'rawaddr/<address>' as fixtures."""
+    import requests
+
+    for path in paths:
+        response = requests.get(upstream.rstrip('/') + '/' + path, params={'limit': 50}, timeout=30)
+        response.raise_for_status()
+        target = os.path.join(location, f'{path.strip("/")}.json')
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'w') as f:
+            json.dump(response.json(), f, indent=1)
+        print(f"Recorded {path} to {target}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with an error')
+    parser.add_argument('--error-status', type=int, default=500, help='status of the failing requests, e.g. 429')
+    parser.add_argument('--txs', type=int, default=2, help='transactions of generated addresses')
+    parser.add_argument('--outputs', type=int, default=1, help='outputs of generated transactions')
+    parser.add_argument('--fixtures', default=FIXTURES, help='directory of recorded responses')
+    parser.add_argument('--record', nargs='+', metavar='PATH', help='record live responses of PATHs and exit')
+    parser.add_argument('--upstream', default='https://blockchain.info/', help='API recorded from')
+    args = parser.parse_args()
+    if args.record:
+        record(args.record, args.upstream, args.fixtures)
+        return
+    stub = StubUpstream(args.host, args.port, args.latency, args.error_rate, args.error_status,
+                        args.txs, args.outputs, args.fixtures).start()
+    print(f"Stub upstream listening on {stub.base_url}")
+    threading.Event().wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from blockchain.balances import afetch_balances, fetch_balances
+from blockchain.cache import reset_cache
+from blockchain.tests.test_cache import CACHE_SETTINGS
+from blockchain.upstream import UpstreamError
+import json
+
+PROVIDERS = {**settings.BLOCKCHAIN_PROVIDERS, 'BTC': {**settings.BLOCKCHAIN_PROVIDERS['BTC'], 'BATCH_SIZE': 2}}
+ADDRESSES = [f"1Addr{i}" for i in range(5)]
+
+
+def balance_response(path, params=None):
+    addresses = params['active'].split('|')
+    if '1Down' in addresses:
+        raise UpstreamError('unreachable')
+    body = {address: {'final_balance': int(address[-1]) + 1, 'n_tx': 1} for address in addresses}
+    return mock.Mock(status_code=200, content=json.dumps(body).encode())
+
+
+@override_settings(BLOCKCHAIN_CACHE=CACHE_SETTINGS, BLOCKCHAIN_PROVIDERS=PROVIDERS)
+class TestBalanceEngine(SimpleTestCase):
+    def setUp(self):
+        reset_cache()
+
+    def upstream(self, side_effect=balance_response, name='get_client', client_get=None):
+        client = mock.Mock()
+        client.get = client_get or mock.Mock(side_effect=side_effect)
+        return mock.patch(f'blockchain.providers.base.{name}', return_value=client)
+
+    def requested(self, get_client):
+        return sorted(c[1]['params']['active'] for c in get_client.return_value.get.call_args_list)
+
+    def test_addresses_are_fetched_in_provider_sized_chunks(self):
+        with self.upstream() as get_client:
+            report = fetch_balances(ADDRESSES)
+        self.assertEqual(self.requested(get_client), ['1Addr0|1Addr1', '1Addr2|1Addr3', '1Addr4'])
+        self.assertEqual(report, {'balances': {'BTC': 15}, 'failed': []})
+
+    def test_partial_failure_is_reported(self):
+        with self.upstream():
+            report = fetch_balances(ADDRESSES[:3] + ['1Down'])
+        self.assertEqual(report, {'balances': {'BTC': 3}, 'failed': ['1Addr2', '1Down']})
+
+    def test_cached_addresses_are_not_refetched(self):
+        with self.upstream():
+            fetch_balances(ADDRESSES[:4])
+        with self.upstream() as get_client:
+            report = fetch_balances(ADDRESSES)
+        self.assertEqual(self.requested(get_client), ['1Addr4'])
+        self.assertEqual(report['balances'], {'BTC': 15})
+
+    def test_balances_are_aggregated_per_chain(self):
+        eth = '0x' + 'a' * 40
+        eth_body = {'data': {eth: {'address': {'balance': '7'}}}}
+
+        def get(path, params=None):
+            if path.startswith('dashboards/address/'):
+                return mock.Mock(status_code=200, content=json.dumps(eth_body).encode())
+            return balance_response(path, params)
+
+        with self.upstream(side_effect=get):
+            report = fetch_balances(['1Addr0', eth])
+        self.assertEqual(report, {'balances': {'BTC': 1, 'ETH': 7}, 'failed': []})
+
+    def test_async_engine(self):
+        get = mock.AsyncMock(side_effect=balance_response)
+        with self.upstream(name='get_async_client', client_get=get):
+            report = async_to_sync(afetch_balances)(ADDRESSES)
+        self.assertEqual(get.call_count, 3)
+        self.assertEqual(report, {'balances': {'BTC': 15}, 'failed': []})
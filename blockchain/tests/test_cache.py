@@ -0,0 +1,133 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from blockchain.cache import FileCache, LocalLRUCache, ResponseCache, get_cache, reset_cache
+from blockchain.lookups import REJECTED, fetch_address, fetch_transaction
+from blockchain.upstream import UpstreamError
+from blockchain.tests.test_validation import ADDRESS, OTHER_ADDRESS, TRANSACTION
+import tempfile
+import time
+
+CACHE_SETTINGS = {'BACKEND': 'lru', 'LOCATION': '', 'MAX_BYTES': 1024 * 1024,
+                  'ADDRESS_TTL': 30, 'TX_TTL': 3600, 'UNCONFIRMED_TX_TTL': 5, 'BALANCE_TTL': 30,
+                  'INVALID_TTL': 30, 'CROSS_PROCESS_LOCK': False, 'LOCK_TIMEOUT': 1}
+# Keeps lookups away from the database, the index has its own tests.
+NO_INDEX_SETTINGS = {'ENABLED': False, 'ADDRESS_MAX_AGE': 30, 'ADDRESS_MAX_PAGES': 10, 'ADDRESS_TXS': 50}
+
+
+class TestLocalLRUCache(SimpleTestCase):
+    def test_evicts_least_recently_used_by_size(self):
+        cache = LocalLRUCache(max_bytes=10)
+        cache.set('a', b'1234', 60)
+        cache.set('b', b'1234', 60)
+        cache.get('a')
+        cache.set('c', b'1234', 60)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), b'1234')
+        self.assertEqual(cache.size, 8)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_oversized_value_is_not_stored(self):
+        cache = LocalLRUCache(max_bytes=3)
+        cache.set('a', b'1234', 60)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size, 0)
+
+    def test_expired_entry_is_dropped(self):
+        cache = LocalLRUCache(max_bytes=10)
+        cache.set('a', b'1', 60)
+        with mock.patch('blockchain.cache.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size, 0)
+
+
+class TestFileCache(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = FileCache(self.directory.name, max_bytes=100)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_set_get_delete(self):
+        self.cache.set('a', b'data', 60)
+        self.assertEqual(self.cache.get('a'), b'data')
+        self.cache.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_expired_entry_is_dropped(self):
+        self.cache.set('a', b'data', 60)
+        with mock.patch('blockchain.cache.time.time', return_value=time.time() + 61):
+            self.assertIsNone(self.cache.get('a'))
+
+    def test_cull_keeps_directory_under_budget(self):
+        for key in 'abcde':
+            self.cache.set(key, b'1234', 60)
+        self.cache.cull()
+        self.assertLessEqual(self.cache.info()['bytes'], 100)
+        self.assertGreater(self.cache.evictions, 0)
+
+
+class TestResponseCache(SimpleTestCase):
+    def test_counters_per_endpoint(self):
+        cache = ResponseCache(LocalLRUCache(max_bytes=100))
+        cache.get('address', 'a')
+        cache.set('address', 'a', b'{}', 10)
+        cache.get('address', 'a')
+        cache.get('transaction', 'b')
+        stats = cache.stats()['endpoints']
+        self.assertEqual(stats['address'], {'hits': 1, 'misses': 1, 'sets': 1})
+        self.assertEqual(stats['transaction'], {'hits': 0, 'misses': 1, 'sets': 0})
+
+
+@override_settings(BLOCKCHAIN_CACHE=CACHE_SETTINGS, BLOCKCHAIN_INDEX=NO_INDEX_SETTINGS)
+class TestCachedLookups(SimpleTestCase):
+    def setUp(self):
+        reset_cache()
+
+    def upstream(self, status_code, content):
+        client = mock.Mock()
+        client.get.return_value = mock.Mock(status_code=status_code, content=content)
+        return mock.patch('blockchain.providers.base.get_client', return_value=client)
+
+    def test_address_is_fetched_once(self):
+        with self.upstream(200, b'{"address": "%s", "final_balance": 5, "txs": []}' % ADDRESS.encode()) as get_client:
+            self.assertEqual(fetch_address(ADDRESS)['balance'], 5)
+            self.assertEqual(fetch_address(ADDRESS)['balance'], 5)
+        self.assertEqual(get_client.return_value.get.call_count, 1)
+
+    def test_rejected_address_is_cached_briefly(self):
+        with self.upstream(400, b'') as get_client:
+            self.assertIsNone(fetch_address(ADDRESS))
+            with mock.patch.object(get_cache(), 'set') as cache_set:
+                self.assertIsNone(fetch_address(OTHER_ADDRESS))
+            self.assertIsNone(fetch_address(ADDRESS))
+        self.assertEqual(get_client.return_value.get.call_count, 2)
+        self.assertEqual(cache_set.call_args[0][2:], (REJECTED, 30))
+
+    def test_failing_upstream_is_not_cached_as_rejected(self):
+        client = mock.Mock()
+        client.get.side_effect = [mock.Mock(status_code=503, content=b''),
+                                  mock.Mock(status_code=200, content=b'{"hash": "%s"}' % TRANSACTION.encode())]
+        with mock.patch('blockchain.providers.base.get_client', return_value=client):
+            with self.assertRaises(UpstreamError):
+                fetch_transaction(TRANSACTION)
+            self.assertEqual(fetch_transaction(TRANSACTION)['hash'], TRANSACTION)
+        self.assertEqual(client.get.call_count, 2)
+
+    def test_malformed_address_is_not_fetched(self):
+        with self.upstream(200, b'{}') as get_client:
+            self.assertIsNone(fetch_address('bad'))
+            self.assertIsNone(fetch_transaction('t'))
+        get_client.return_value.get.assert_not_called()
+
+    def test_confirmed_transaction_uses_long_ttl(self):
+        with self.upstream(200, b'{"hash": "%s", "block_height": 1}' % TRANSACTION.encode()):
+            with mock.patch.object(get_cache(), 'set') as cache_set:
+                fetch_transaction(TRANSACTION)
+        self.assertEqual(cache_set.call_args[0][3], 3600)
+
+    def test_unconfirmed_transaction_uses_short_ttl(self):
+        with self.upstream(200, b'{"hash": "%s"}' % TRANSACTION.encode()):
+            with mock.patch.object(get_cache(), 'set') as cache_set:
+                fetch_transaction(TRANSACTION)
+        self.assertEqual(cache_set.call_args[0][3], 5)
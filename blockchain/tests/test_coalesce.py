@@ -0,0 +1,114 @@
+from unittest import mock
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from django.test import SimpleTestCase, override_settings
+from blockchain.cache import FileCache
+from blockchain.coalesce import AsyncSingleFlight, SingleFlight
+from blockchain.lookups import fetch_address
+from blockchain.tests.test_cache import CACHE_SETTINGS, NO_INDEX_SETTINGS
+from blockchain.tests.test_validation import ADDRESS
+import tempfile
+import threading
+
+
+class TestSingleFlight(SimpleTestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait(5)
+            return {'value': 1}
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(flight.do, 'key', slow) for _ in range(8)]
+            while flight.stats()['coalesced'] < 7:
+                pass
+            release.set()
+            results = [f.result() for f in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(flight.stats(), {'executed': 1, 'coalesced': 7, 'in_flight': 0})
+
+    def test_error_is_shared_and_key_released(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do('key', mock.Mock(side_effect=ValueError))
+        self.assertEqual(flight.do('key', lambda: 2), 2)
+
+
+class TestAsyncSingleFlight(SimpleTestCase):
+    def test_cancelled_leader_leaves_waiters_their_result(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {'value': 1}
+
+        async def run():
+            leader = asyncio.ensure_future(flight.do('key', slow))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(flight.do('key', slow))
+            await asyncio.sleep(0)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await waiter
+
+        self.assertEqual(asyncio.run(run()), {'value': 1})
+        # The waiter ran the call again.
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(flight.stats(), {'executed': 2, 'coalesced': 1, 'in_flight': 0})
+
+    def test_error_is_shared_and_key_released(self):
+        flight = AsyncSingleFlight()
+
+        async def failing():
+            raise ValueError()
+
+        async def run():
+            with self.assertRaises(ValueError):
+                await flight.do('key', failing)
+
+            async def two():
+                return 2
+            return await flight.do('key', two)
+
+        self.assertEqual(asyncio.run(run()), 2)
+
+
+class TestCacheLocks(SimpleTestCase):
+    def test_file_lock_is_exclusive(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first, second = FileCache(directory, 100), FileCache(directory, 100)
+            with first.lock('a', timeout=1) as acquired:
+                self.assertTrue(acquired)
+                with second.lock('a', timeout=0.05) as acquired_elsewhere:
+                    self.assertFalse(acquired_elsewhere)
+            with second.lock('a', timeout=0.05) as acquired_elsewhere:
+                self.assertTrue(acquired_elsewhere)
+
+
+@override_settings(BLOCKCHAIN_CACHE=CACHE_SETTINGS, BLOCKCHAIN_INDEX=NO_INDEX_SETTINGS)
+class TestCoalescedLookups(SimpleTestCase):
+    def test_concurrent_address_lookups_hit_upstream_once(self):
+        release = threading.Event()
+
+        def upstream_get(path, params=None):
+            release.wait(5)
+            return mock.Mock(status_code=200, content=b'{"address": "%s", "final_balance": 1}' % ADDRESS.encode())
+
+        client = mock.Mock()
+        client.get.side_effect = upstream_get
+        with mock.patch('blockchain.providers.base.get_client', return_value=client):
+            with ThreadPoolExecutor(max_workers=10) as pool:
+                futures = [pool.submit(fetch_address, ADDRESS) for _ in range(10)]
+                release.set()
+                results = [f.result() for f in futures]
+        self.assertEqual(client.get.call_count, 1)
+        self.assertEqual([r['balance'] for r in results], [1] * 10)
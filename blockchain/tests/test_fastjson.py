@@ -0,0 +1,50 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from rest_framework import renderers, status
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+from blockchain import fastjson
+from blockchain.api.renderers import JSONRenderer
+import datetime
+import decimal
+import json
+
+DATA = {'address': "1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1F", 'balance': 10, 'fee': decimal.Decimal('0.5'),
+        'time': datetime.datetime(2021, 5, 1, 12, tzinfo=datetime.timezone.utc), 'memo': 'é  ',
+        'txs': [{'hash': '1' * 64, 'value': -1}, None, 1.5, True]}
+
+
+class TestFastJSON(SimpleTestCase):
+    def test_long_numbers_stay_integers(self):
+        body = b'{"wei": 123456789012345678901234, "low": [-9223372036854775809], "hash": "%s"}' % (b'1' * 64)
+        self.assertEqual(fastjson.loads(body), {'wei': 123456789012345678901234, 'low': [-9223372036854775809],
+                                                'hash': '1' * 64})
+        self.assertEqual(fastjson.loads(fastjson.dumps({'wei': 2 ** 80})), {'wei': 2 ** 80})
+
+    def test_stdlib_fallback(self):
+        body = json.dumps({'a': [1, 'é', None]})
+        with mock.patch('blockchain.fastjson.orjson', None):
+            self.assertEqual(fastjson.loads(body), {'a': [1, 'é', None]})
+            self.assertEqual(fastjson.dumps({'a': [1, 'é']}), '{"a":[1,"é"]}'.encode())
+        self.assertEqual(fastjson.loads(body.encode()), {'a': [1, 'é', None]})
+
+    def test_renders_like_drf(self):
+        expected = renderers.JSONRenderer().render(DATA)
+        self.assertEqual(JSONRenderer().render(DATA), expected)
+        with mock.patch('blockchain.fastjson.orjson', None):
+            self.assertEqual(JSONRenderer().render(DATA), expected)
+        self.assertEqual(JSONRenderer().render(None), b'')
+
+
+class TestJSONParser(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+
+    def test_invalid_body(self):
+        response = self.client.post(reverse("blockchain_api:mine_addresses"), data=b'{"address": ',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(response.json()['detail'].startswith('JSON parse error - '))
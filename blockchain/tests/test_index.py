@@ -0,0 +1,102 @@
+from unittest import mock
+from asgiref.sync import async_to_sync
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from blockchain.lookups import afetch_address, fetch_address, fetch_transaction
+from blockchain.models import AddressTransaction, IndexedAddress, IndexedTransaction
+from blockchain.tests.test_cache import CACHE_SETTINGS
+from blockchain.tests.test_providers import CASHADDR
+from blockchain.tests.test_validation import ADDRESS, TRANSACTION
+import json
+
+INDEX_SETTINGS = {'ENABLED': True, 'ADDRESS_MAX_AGE': 30, 'ADDRESS_MAX_PAGES': 10, 'ADDRESS_TXS': 50}
+
+
+def rawaddr(txs, n_tx=None, balance=0):
+    return json.dumps({'address': ADDRESS, 'final_balance': balance, 'n_tx': n_tx or len(txs),
+                       'txs': [{'hash': h, 'block_height': height, 'result': 1} for h, height in txs]}).encode()
+
+
+@override_settings(BLOCKCHAIN_CACHE={**CACHE_SETTINGS, 'ADDRESS_TTL': 0, 'TX_TTL': 0, 'UNCONFIRMED_TX_TTL': 0},
+                   BLOCKCHAIN_INDEX=INDEX_SETTINGS)
+class TestIndexedLookups(TestCase):
+    def upstream(self, *contents):
+        client = mock.Mock()
+        client.get.side_effect = [mock.Mock(status_code=200, content=content) for content in contents]
+        return mock.patch('blockchain.providers.base.get_client', return_value=client)
+
+    def expire(self):
+        IndexedAddress.objects.update(synced=timezone.now() - timedelta(minutes=5))
+
+    def test_fresh_address_is_served_from_index(self):
+        with self.upstream(rawaddr([('t2', None), ('t1', 10)], balance=3)) as get_client:
+            first = fetch_address(ADDRESS)
+            second = fetch_address(ADDRESS)
+        self.assertEqual(get_client.return_value.get.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual([tx['hash'] for tx in second['txs']], ['t2', 't1'])
+        self.assertEqual(IndexedAddress.objects.get().synced_height, 10)
+
+    def test_default_bch_search_is_served_from_index(self):
+        # Blockchair pages hold 100 transactions, more than the index keeps.
+        address = CASHADDR.split(':')[1]
+        dashboard = json.dumps({'data': {address: {
+            'address': {'balance': 5, 'received': 9, 'spent': 4, 'transaction_count': 1},
+            'transactions': [{'block_id': 10, 'hash': 'h', 'time': '2021-05-17 08:19:00', 'balance_change': 5}],
+        }}}).encode()
+        with self.upstream(dashboard) as get_client:
+            first = fetch_address(CASHADDR)
+            second = fetch_address(CASHADDR)
+        self.assertEqual(get_client.return_value.get.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(IndexedAddress.objects.get().chain, 'BCH')
+
+    def test_empty_bch_answer_is_not_indexed(self):
+        # Blockchair answers an unknown address with an empty data object.
+        empty = json.dumps({'data': {}}).encode()
+        with self.upstream(empty, empty):
+            self.assertIsNone(fetch_address(CASHADDR))
+            self.assertIsNone(async_to_sync(afetch_address)(CASHADDR))
+        self.assertFalse(IndexedAddress.objects.exists())
+
+    def test_stale_address_fetches_only_newer_pages(self):
+        with self.upstream(rawaddr([('t1', 10)])):
+            fetch_address(ADDRESS)
+        self.expire()
+        page = [(f'n{i}', 100 - i) for i in range(50)]
+        older = [(f'm{i}', 60 - i) for i in range(49)] + [('t1', 10)]
+        with self.upstream(rawaddr(page, n_tx=101), rawaddr(older, n_tx=101)) as get_client:
+            data = fetch_address(ADDRESS)
+        calls = get_client.return_value.get.call_args_list
+        self.assertEqual([c[1]['params']['offset'] for c in calls], [0, 50])
+        self.assertEqual(data['tx_count'], 101)
+        self.assertEqual(data['txs'][0]['hash'], 'n0')
+        self.assertEqual(AddressTransaction.objects.count(), 100)
+        self.assertEqual(IndexedAddress.objects.get().synced_height, 100)
+
+    def test_mined_transaction_replaces_unconfirmed(self):
+        with self.upstream(rawaddr([('t2', None), ('t1', 10)])):
+            fetch_address(ADDRESS)
+        self.expire()
+        with self.upstream(rawaddr([('t2', 11), ('t1', 10)])):
+            data = fetch_address(ADDRESS)
+        self.assertEqual([(tx['hash'], tx['block_height']) for tx in data['txs']], [('t2', 11), ('t1', 10)])
+        self.assertEqual(IndexedTransaction.objects.get(hash='t2').block_height, 11)
+
+    def test_confirmed_transaction_is_served_from_index(self):
+        payload = b'{"hash": "%s", "block_height": 1, "fee": 2, "inputs": [{"prev_out": {"addr": "a", "value": 5}}],' \
+                  b' "out": [{"addr": "b", "value": 3}]}' % TRANSACTION.encode()
+        with self.upstream(payload) as get_client:
+            first = fetch_transaction(TRANSACTION)
+            second = fetch_transaction(TRANSACTION)
+        self.assertEqual(get_client.return_value.get.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(second['outputs'], [{'address': 'b', 'value': 3}])
+
+    def test_unconfirmed_transaction_is_not_indexed(self):
+        with self.upstream(*[b'{"hash": "%s"}' % TRANSACTION.encode()] * 2) as get_client:
+            fetch_transaction(TRANSACTION)
+            fetch_transaction(TRANSACTION)
+        self.assertEqual(get_client.return_value.get.call_count, 2)
+        self.assertFalse(IndexedTransaction.objects.exists())
@@ -0,0 +1,111 @@
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+from blockchain.cache import reset_cache
+from blockchain.metrics import Histogram, span, start_request, end_request
+from blockchain.tests.test_cache import CACHE_SETTINGS
+import json
+
+ADDRESS = "1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1F"
+
+
+def upstream(content=b'{"final_balance": 1}', async_client=False):
+    client = mock.Mock()
+    response = mock.Mock(status_code=200, content=content)
+    client.get = mock.AsyncMock(return_value=response) if async_client else mock.Mock(return_value=response)
+    return mock.patch('blockchain.providers.base.get_async_client' if async_client else
+                      'blockchain.providers.base.get_client', return_value=client)
+
+
+def server_timing(response):
+    return {entry.split(';')[0]: entry for entry in response['Server-Timing'].split(', ')}
+
+
+class TestHistogram(SimpleTestCase):
+    def test_buckets_and_quantiles(self):
+        histogram = Histogram([1, 10, 100])
+        for value in [0.5, 5, 5, 50, 500]:
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['buckets'], {'1': 1, '10': 3, '100': 4, '+Inf': 5})
+        self.assertEqual((snapshot['p50'], snapshot['p95']), (10, None))
+        self.assertEqual(snapshot['sum'], 560.5)
+
+    def test_spans_outside_of_requests_are_ignored(self):
+        with span('upstream'):
+            pass
+        timings, token = start_request()
+        with span('upstream'):
+            pass
+        end_request(token)
+        self.assertEqual(list(timings.spans), ['upstream'])
+
+
+@override_settings(BLOCKCHAIN_CACHE=CACHE_SETTINGS)
+class TestRequestMetrics(APITestCase):
+    def setUp(self):
+        reset_cache()
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123", is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=self.user).key)
+        self.url = reverse("blockchain_api:search_address", kwargs={'address': ADDRESS})
+
+    def test_server_timing_breaks_down_the_request(self):
+        with upstream():
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = server_timing(response)
+        self.assertTrue({'upstream', 'decode', 'db', 'log', 'render', 'total'} <= set(timing))
+        self.assertRegex(timing['total'], r'desc="\d+ queries"')
+
+    def test_metrics_are_aggregated_per_endpoint(self):
+        with upstream():
+            self.client.get(self.url)
+            self.client.get(self.url)
+        response = self.client.get(reverse("blockchain_api:metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        search = response.json()['blockchain_api:search_address']
+        self.assertEqual(search['status'], {'200': 2})
+        self.assertEqual(search['duration_ms']['count'], 2)
+        # The second search is served from the cache.
+        self.assertEqual(search['spans_ms']['upstream']['count'], 1)
+        self.assertEqual(search['queries']['count'], 2)
+
+    def test_metrics_are_admin_only(self):
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("blockchain_api:metrics")).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_requests_are_logged_as_json(self):
+        with override_settings(BLOCKCHAIN_METRICS={**settings.BLOCKCHAIN_METRICS, 'LOG': True}), \
+                self.assertLogs('blockchain.requests') as logs, upstream():
+            self.client.get(self.url)
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['endpoint'], entry['status'], entry['user']),
+                         ('blockchain_api:search_address', 200, self.user.pk))
+        self.assertGreater(entry['queries'], 0)
+        self.assertIn('upstream', entry['spans_ms'])
+
+    def test_disabled(self):
+        with override_settings(BLOCKCHAIN_METRICS={**settings.BLOCKCHAIN_METRICS, 'ENABLED': False}), upstream():
+            response = self.client.get(self.url)
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(BLOCKCHAIN_CACHE=CACHE_SETTINGS)
+class TestAsyncRequestMetrics(TestCase):
+    def setUp(self):
+        reset_cache()
+        user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.auth = {'authorization': "Token " + Token.objects.create(user=user).key}
+
+    async def test_server_timing(self):
+        url = reverse("blockchain_api:async_search_address", kwargs={'address': ADDRESS})
+        with upstream(async_client=True):
+            response = await self.async_client.get(url, **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue({'upstream', 'db', 'render', 'total'} <= set(server_timing(response)))
@@ -0,0 +1,94 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from blockchain.lookups import fetch_address, fetch_transaction
+from blockchain.providers import UnknownChain, detect_address_chain, detect_transaction_chain, get_provider
+from blockchain.providers.base import to_int, to_timestamp
+from blockchain.tests.test_cache import NO_INDEX_SETTINGS
+from blockchain.tests.test_validation import ADDRESS
+import json
+
+ETH_ADDRESS = '0x52908400098527886e0f7030069857d2e4169ee7'
+CASHADDR = 'bitcoincash:qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6a'
+
+
+class TestChainDetection(SimpleTestCase):
+    def test_addresses(self):
+        self.assertEqual(detect_address_chain('1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1F'), 'BTC')
+        self.assertEqual(detect_address_chain('bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq'), 'BTC')
+        self.assertEqual(detect_address_chain(ETH_ADDRESS), 'ETH')
+        self.assertEqual(detect_address_chain(CASHADDR), 'BCH')
+        self.assertEqual(detect_address_chain(CASHADDR.split(':')[1]), 'BCH')
+
+    def test_transactions(self):
+        self.assertEqual(detect_transaction_chain('ab' * 32), 'BTC')
+        self.assertEqual(detect_transaction_chain('0x' + 'ab' * 32), 'ETH')
+
+    def test_unknown_chain(self):
+        with self.assertRaises(UnknownChain):
+            get_provider('DOGE')
+
+    def test_adapter_declares_limits(self):
+        self.assertEqual(get_provider('btc').batch_size, 50)
+        self.assertEqual(get_provider('ETH').batch_size, 1)
+        self.assertEqual(get_provider('BCH').client_config['READ_TIMEOUT'], 15)
+
+    def test_conversions(self):
+        self.assertEqual(to_int('1000000000000000000000'), 10 ** 21)
+        self.assertEqual(to_int(None), 0)
+        self.assertEqual(to_timestamp('2021-05-17 08:19:00'), 1621239540)
+
+
+@override_settings(BLOCKCHAIN_INDEX=NO_INDEX_SETTINGS)
+class TestNormalization(SimpleTestCase):
+    def upstream(self, payload):
+        client = mock.Mock()
+        client.get.return_value = mock.Mock(status_code=200, content=json.dumps(payload).encode())
+        return mock.patch('blockchain.providers.base.get_client', return_value=client)
+
+    def test_blockchain_info_address(self):
+        payload = {'address': ADDRESS, 'final_balance': 10, 'total_received': 30, 'total_sent': 20, 'n_tx': 2,
+                   'hash160': 'x' * 40, 'txs': [{'hash': 'h', 'time': 5, 'block_height': 7, 'result': -20,
+                                                  'inputs': [], 'out': [], 'size': 250}]}
+        with self.upstream(payload):
+            data = fetch_address(ADDRESS)
+        self.assertEqual(data, {'chain': 'BTC', 'address': ADDRESS, 'balance': 10, 'total_received': 30,
+                                'total_sent': 20, 'tx_count': 2,
+                                'txs': [{'hash': 'h', 'block_height': 7, 'time': 5, 'value': -20}]})
+
+    def test_blockchain_info_transaction(self):
+        payload = {'hash': 'cd' * 32, 'time': 5, 'fee': 1, 'block_height': None,
+                   'inputs': [{'prev_out': {'addr': '1A', 'value': 3}}, {'sequence': 1}],
+                   'out': [{'addr': '1B', 'value': 2}]}
+        with self.upstream(payload):
+            data = fetch_transaction('cd' * 32)
+        self.assertEqual(data['inputs'], [{'address': '1A', 'value': 3}, {'address': None, 'value': 0}])
+        self.assertEqual(data['outputs'], [{'address': '1B', 'value': 2}])
+        self.assertIsNone(data['block_height'])
+
+    def test_blockchair_cashaddr(self):
+        address = CASHADDR.split(':')[1]
+        payload = {'data': {address: {
+            'address': {'balance': 5, 'received': 9, 'spent': 4, 'transaction_count': 1},
+            'transactions': [{'block_id': -1, 'hash': 'h', 'time': '2021-05-17 08:19:00', 'balance_change': 5}],
+        }}}
+        with self.upstream(payload) as get_client:
+            data = fetch_address(CASHADDR)
+        self.assertEqual(get_client.return_value.get.call_args[0][0], f'dashboards/address/{address}')
+        self.assertEqual(data['address'], address)
+        self.assertEqual(data['txs'], [{'hash': 'h', 'block_height': None, 'time': 1621239540, 'value': 5}])
+
+    def test_blockchair_unknown_transaction(self):
+        with self.upstream({'data': {}}):
+            self.assertIsNone(fetch_transaction('ef' * 32, chain='BCH'))
+
+    def test_blockchair_ethereum(self):
+        payload = {'data': {ETH_ADDRESS: {
+            'address': {'balance': '2000000000000000000', 'received_approximate': '3000000000000000000',
+                        'spent_approximate': '1000000000000000000', 'transaction_count': 2},
+            'calls': [{'block_id': 10, 'transaction_hash': '0x1', 'time': '2021-05-17 08:19:00',
+                       'sender': ETH_ADDRESS, 'recipient': '0xabc', 'value': '1000000000000000000'}],
+        }}}
+        with self.upstream(payload):
+            data = fetch_address(ETH_ADDRESS.upper().replace('0X', '0x'))
+        self.assertEqual(data['balance'], 2 * 10 ** 18)
+        self.assertEqual(data['txs'][0]['value'], -10 ** 18)
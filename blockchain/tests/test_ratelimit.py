@@ -0,0 +1,138 @@
+from unittest import mock
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+from blockchain.lookups import fetch_address, fetch_transaction
+from blockchain.models import IndexedAddress
+from blockchain.ratelimit import FileBuckets, LocalBuckets, RateLimiter, get_limiter
+from blockchain.tests.test_cache import CACHE_SETTINGS
+from blockchain.tests.test_index import INDEX_SETTINGS, rawaddr
+from blockchain.tests.test_validation import ADDRESS, OTHER_ADDRESS, TRANSACTION
+from blockchain.upstream import UpstreamThrottled
+import asyncio
+import tempfile
+import threading
+
+
+def limits(user=None, upstream=None):
+    return {**settings.BLOCKCHAIN_RATE_LIMITS, 'BACKEND': 'local',
+            'USER': user or settings.BLOCKCHAIN_RATE_LIMITS['USER'],
+            'UPSTREAM': {'DEFAULT': {'RATE': 0, 'BURST': 1, 'MAX_WAIT': 0}, **(upstream or {})}}
+
+
+class TestTokenBucket(SimpleTestCase):
+    def test_burst_then_rejected_until_refilled(self):
+        limiter = RateLimiter(LocalBuckets())
+        with mock.patch('blockchain.ratelimit.time.time', return_value=100.0) as now:
+            self.assertEqual([limiter.reserve('k', 1, 2)[0] for _ in range(3)], [True, True, False])
+            self.assertEqual(limiter.reserve('k', 1, 2), (False, 1.0))
+            now.return_value = 101.0
+            self.assertEqual(limiter.reserve('k', 1, 2), (True, 0.0))
+        self.assertEqual(limiter.stats(), {'k': {'served': 3, 'queued': 0, 'throttled': 2}})
+
+    def test_calls_over_budget_are_queued_in_order(self):
+        limiter = RateLimiter(LocalBuckets())
+        with mock.patch('blockchain.ratelimit.time.time', return_value=100.0):
+            waits = [limiter.reserve('k', 2, 1, max_wait=1) for _ in range(4)]
+        self.assertEqual(waits, [(True, 0.0), (True, 0.5), (True, 1.0), (False, 1.5)])
+        self.assertEqual(limiter.stats()['k'], {'served': 1, 'queued': 2, 'throttled': 1})
+
+    def test_zero_rate_is_unlimited(self):
+        limiter = RateLimiter(LocalBuckets())
+        self.assertTrue(all(limiter.reserve('k', 0, 1)[0] for _ in range(100)))
+
+    def test_file_buckets_are_shared(self):
+        with tempfile.TemporaryDirectory() as location:
+            first, second = RateLimiter(FileBuckets(location)), RateLimiter(FileBuckets(location))
+            with mock.patch('blockchain.ratelimit.time.time', return_value=100.0):
+                self.assertTrue(first.reserve('k', 1, 1)[0])
+                self.assertFalse(second.reserve('k', 1, 1)[0])
+
+
+    def test_file_buckets_reserve_off_the_event_loop(self):
+        async def reserve(limiter):
+            return threading.current_thread(), await limiter.areserve('k', 1, 1)
+
+        with tempfile.TemporaryDirectory() as location:
+            limiter = RateLimiter(FileBuckets(location))
+            transact, threads = limiter.backend.transact, []
+
+            def locked(key, fn):
+                threads.append(threading.current_thread())
+                return transact(key, fn)
+
+            with mock.patch.object(limiter.backend, 'transact', side_effect=locked):
+                loop_thread, reserved = asyncio.run(reserve(limiter))
+        self.assertEqual(reserved, (True, 0.0))
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], loop_thread)
+
+
+@override_settings(BLOCKCHAIN_CACHE={**CACHE_SETTINGS, 'ADDRESS_TTL': 0, 'TX_TTL': 0, 'UNCONFIRMED_TX_TTL': 0},
+                   BLOCKCHAIN_INDEX=INDEX_SETTINGS,
+                   BLOCKCHAIN_RATE_LIMITS=limits(upstream={'BTC': {'RATE': 0.01, 'BURST': 1, 'MAX_WAIT': 0}}))
+class TestUpstreamBudget(TestCase):
+    def upstream(self, *responses):
+        client = mock.Mock()
+        client.get.side_effect = [mock.Mock(status_code=200, content=content, headers={})
+                                  if isinstance(content, bytes) else content for content in responses]
+        return mock.patch('blockchain.providers.base.get_client', return_value=client)
+
+    def test_indexed_address_is_served_when_over_budget(self):
+        with self.upstream(rawaddr([('t1', 10)])):
+            fetch_address(ADDRESS)
+        IndexedAddress.objects.update(synced=timezone.now() - timedelta(minutes=5))
+        with self.upstream() as get_client:
+            data = fetch_address(ADDRESS)
+        get_client.return_value.get.assert_not_called()
+        self.assertEqual([tx['hash'] for tx in data['txs']], ['t1'])
+        self.assertEqual(get_limiter().stats()['upstream:BTC'], {'served': 1, 'queued': 0, 'throttled': 1})
+
+    def test_unknown_address_over_budget_raises(self):
+        with self.upstream(rawaddr([('t1', 10)])):
+            fetch_address(ADDRESS)
+        with self.assertRaises(UpstreamThrottled) as raised:
+            fetch_address(OTHER_ADDRESS)
+        self.assertGreater(raised.exception.retry_after, 0)
+
+    def test_provider_rate_limit_is_reported(self):
+        with self.upstream(mock.Mock(status_code=429, headers={'Retry-After': '7'})):
+            with self.assertRaises(UpstreamThrottled) as raised:
+                fetch_transaction(TRANSACTION)
+        self.assertEqual(raised.exception.retry_after, 7)
+
+
+@override_settings(BLOCKCHAIN_RATE_LIMITS=limits(user={'search': {'RATE': 0.01, 'BURST': 2}}))
+class TestUserThrottle(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=self.user).key)
+        self.url = reverse("blockchain_api:search_address", kwargs={'address': "1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1F"})
+
+    @mock.patch('blockchain.api.views.fetch_address', return_value={'address': '1A', 'txs': []})
+    def test_searches_over_burst_are_throttled(self, fetch):
+        codes = [self.client.get(self.url).status_code for _ in range(3)]
+        self.assertEqual(codes, [status.HTTP_200_OK, status.HTTP_200_OK, status.HTTP_429_TOO_MANY_REQUESTS])
+        self.assertEqual(self.client.get(self.url)['Retry-After'], '100')
+        self.assertEqual(fetch.call_count, 2)
+        # Endpoints without a scope are not limited.
+        self.assertEqual(self.client.get(reverse("blockchain_api:mine_addresses")).status_code, status.HTTP_200_OK)
+
+    @mock.patch('blockchain.api.async_views.afetch_address', return_value={'address': '1A', 'txs': []})
+    def test_async_searches_share_the_bucket(self, fetch):
+        self.client.get(self.url)
+        url = reverse("blockchain_api:async_search_address", kwargs={'address': "1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1F"})
+        codes = [self.client.get(url).status_code for _ in range(2)]
+        self.assertEqual(codes, [status.HTTP_200_OK, status.HTTP_429_TOO_MANY_REQUESTS])
+
+    @mock.patch('blockchain.api.views.fetch_address', side_effect=UpstreamThrottled('busy', retry_after=3))
+    def test_exhausted_upstream_answers_429(self, fetch):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '3')
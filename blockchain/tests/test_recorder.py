@@ -0,0 +1,119 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase, override_settings
+from blockchain.models import SearchAddress, SearchTransaction
+from blockchain.recorder import SearchRecorder, get_recorder, record_address_search, record_transaction_search
+from blockchain.versions import SEARCHES, bump
+import time
+
+SEARCH_LOG_SETTINGS = {'BUFFERED': True, 'BATCH_SIZE': 3, 'FLUSH_INTERVAL': 60, 'MAX_QUEUE': 5, 'OVERFLOW': 'sync'}
+
+
+class TestSearchRecorder(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+
+    def recorder(self, **kwargs):
+        recorder = SearchRecorder(**{'batch_size': 3, 'flush_interval': 60, 'max_queue': 5, **kwargs})
+        # The background thread has its own connection, flush from the test's instead.
+        recorder._ensure_thread = lambda: None
+        return recorder
+
+    def entry(self, i):
+        return SearchAddress(user=self.user, address=f"a{i}")
+
+    def test_flush_writes_in_batches(self):
+        recorder = self.recorder()
+        for i in range(4):
+            recorder.record(self.entry(i))
+        self.assertEqual(SearchAddress.objects.count(), 0)
+        bump([self.user.id], SEARCHES)
+        # Per batch in a savepoint an insert and the summaries of new addresses, looked up,
+        # created, looked up and added to, then a bump of the searches version.
+        with self.assertNumQueries(16):
+            recorder.flush()
+        self.assertEqual(SearchAddress.objects.count(), 4)
+        self.assertEqual(recorder.stats()['written'], 4)
+
+    def test_timestamp_is_taken_when_recorded(self):
+        recorder = self.recorder()
+        entry = self.entry(0)
+        recorder.record(entry)
+        recorded_at = entry.timestamp
+        time.sleep(0.01)
+        recorder.flush()
+        self.assertEqual(SearchAddress.objects.get().timestamp, recorded_at)
+
+    def test_mixed_models(self):
+        recorder = self.recorder()
+        recorder.record(self.entry(0))
+        recorder.record(SearchTransaction(user=self.user, transaction="t"))
+        recorder.flush()
+        self.assertEqual((SearchAddress.objects.count(), SearchTransaction.objects.count()), (1, 1))
+
+    def test_overflow_sync_writes_immediately(self):
+        recorder = self.recorder()
+        for i in range(6):
+            self.assertTrue(recorder.record(self.entry(i)))
+        self.assertEqual(list(SearchAddress.objects.values_list('address', flat=True)), ['a5'])
+        self.assertEqual(recorder.stats()['overflowed'], 1)
+
+    def test_overflow_drop(self):
+        recorder = self.recorder(overflow='drop')
+        results = [recorder.record(self.entry(i)) for i in range(6)]
+        recorder.flush()
+        self.assertEqual(results, [True] * 5 + [False])
+        self.assertFalse(SearchAddress.objects.filter(address='a5').exists())
+        self.assertEqual(recorder.stats()['dropped'], 1)
+
+    def test_overflow_drop_oldest(self):
+        recorder = self.recorder(overflow='drop_oldest')
+        for i in range(6):
+            recorder.record(self.entry(i))
+        recorder.flush()
+        self.assertEqual(set(SearchAddress.objects.values_list('address', flat=True)), {'a1', 'a2', 'a3', 'a4', 'a5'})
+
+    def test_unknown_overflow_policy(self):
+        with self.assertRaises(ImproperlyConfigured):
+            SearchRecorder(overflow='block')
+
+    def test_failed_batch_is_dropped(self):
+        recorder = self.recorder()
+        recorder.record(self.entry(0))
+        with mock.patch.object(SearchAddress.objects, 'bulk_create', side_effect=DatabaseError):
+            recorder.flush()
+        self.assertEqual(recorder.stats()['failed'], 1)
+        self.assertEqual(recorder.stats()['queued'], 0)
+
+    def test_overlong_values_are_not_logged(self):
+        with self.assertLogs('blockchain.recorder', 'WARNING') as logs:
+            record_address_search(self.user, "a" * 91)
+            record_transaction_search(self.user, "t" * 67)
+        self.assertFalse(SearchAddress.objects.exists() or SearchTransaction.objects.exists())
+        self.assertEqual(len(logs.records), 2)
+
+    def test_longest_identifiers_are_logged(self):
+        # A P2WSH address and a 0x prefixed ETH transaction hash.
+        record_address_search(self.user, "bc1qrp33g0q5c5txsp9arysrx4k6zdkfs4nce4xj0gdcccefvpysxf3qccfmv3")
+        record_transaction_search(self.user, "0x" + "ab" * 32)
+        self.assertEqual((SearchAddress.objects.count(), SearchTransaction.objects.count()), (1, 1))
+
+
+class TestBackgroundFlush(TransactionTestCase):
+    def test_batch_size_wakes_flusher_and_stop_flushes_rest(self):
+        user = User.objects.create_user(username='test', password="passwordTesting.123")
+        with override_settings(BLOCKCHAIN_SEARCH_LOG=SEARCH_LOG_SETTINGS):
+            for i in range(4):
+                record_address_search(user, f"a{i}")
+            recorder = get_recorder()
+            # Reads the stats, the table is locked while the flusher writes a batch.
+            deadline = time.monotonic() + 5
+            while recorder.stats()['written'] < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            # The flusher drains whatever is queued by the time it runs.
+            self.assertGreaterEqual(recorder.stats()['written'], 3)
+        # Leaving override_settings stops the recorder, which writes what is left.
+        self.assertEqual(SearchAddress.objects.count(), 4)
+        self.assertEqual(recorder.stats()['written'], 4)
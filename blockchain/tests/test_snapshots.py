@@ -0,0 +1,107 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+from blockchain.cache import reset_cache
+from blockchain.models import BalanceSnapshot, SearchAddress, UserAddresses
+from blockchain.snapshots import refresh_snapshots, snapshot_balances, stale_addresses
+from blockchain.tests.test_balances import balance_response
+from blockchain.tests.test_cache import CACHE_SETTINGS
+
+SNAPSHOTS = {**settings.BLOCKCHAIN_BALANCE_SNAPSHOTS, 'BATCH_SIZE': 2, 'MAX_ADDRESSES': 100}
+
+
+def upstream():
+    client = mock.Mock()
+    client.get = mock.Mock(side_effect=balance_response)
+    return mock.patch('blockchain.providers.base.get_client', return_value=client)
+
+
+def snapshot(address, balance, age=0, chain='BTC'):
+    return BalanceSnapshot.objects.create(chain=chain, address=address, balance=balance, total_received=balance,
+                                          refreshed=timezone.now() - timedelta(seconds=age))
+
+
+@override_settings(BLOCKCHAIN_CACHE=CACHE_SETTINGS, BLOCKCHAIN_BALANCE_SNAPSHOTS=SNAPSHOTS)
+class TestSnapshots(TestCase):
+    def setUp(self):
+        reset_cache()
+        self.idle = User.objects.create_user(username='idle', password="passwordTesting.123")
+        self.active = User.objects.create_user(username='active', password="passwordTesting.123")
+        SearchAddress.objects.create(user=self.active, address="1Addr3")
+        for user, address in [(self.idle, "1Addr1"), (self.idle, "1Addr2"), (self.active, "1Addr3"),
+                              (self.active, "1Addr1")]:
+            UserAddresses.objects.create(user=user, address=address)
+
+    def test_active_users_and_oldest_snapshots_first(self):
+        snapshot("1Addr2", 1, age=600)
+        snapshot("1Addr1", 1, age=6000)
+        self.assertEqual(stale_addresses(10, 60, 3600), ["1Addr3", "1Addr1", "1Addr2"])
+        snapshot("1Addr3", 1)
+        self.assertEqual(stale_addresses(10, 60, 3600), ["1Addr1", "1Addr2"])
+        self.assertEqual(stale_addresses(1, 60, 3600), ["1Addr1"])
+
+    def test_refresh(self):
+        with upstream():
+            stats = refresh_snapshots()
+        self.assertEqual(stats, {'addresses': 3, 'batches': 2, 'refreshed': 3, 'failed': 0})
+        self.assertEqual(dict(BalanceSnapshot.objects.values_list('address', 'balance')),
+                         {"1Addr1": 2, "1Addr2": 3, "1Addr3": 4})
+        with upstream():
+            self.assertEqual(refresh_snapshots()['addresses'], 0)
+
+    def test_one_aggregate_query(self):
+        snapshot("1Addr1", 2)
+        snapshot("1Addr2", 3, age=30)
+        snapshot("0xabc", 10, chain='ETH')
+        UserAddresses.objects.create(user=self.idle, address="0xabc")
+        with self.assertNumQueries(1):
+            report = snapshot_balances(self.idle)
+        self.assertEqual(report['balances'], {'BTC': 5, 'ETH': 10})
+        self.assertLess(report['as_of'], timezone.now() - timedelta(seconds=29))
+
+    def test_missing_or_old_snapshots_are_not_served(self):
+        snapshot("1Addr1", 2)
+        self.assertIsNone(snapshot_balances(self.idle))
+        snapshot("1Addr2", 3, age=SNAPSHOTS['MAX_AGE'] + 1)
+        self.assertIsNone(snapshot_balances(self.idle))
+
+    def test_command(self):
+        out = StringIO()
+        with upstream():
+            call_command('refresh_balances', '--once', stdout=out)
+        self.assertIn("3 refreshed", out.getvalue())
+
+
+@override_settings(BLOCKCHAIN_CACHE=CACHE_SETTINGS)
+class TestSnapshotBalanceView(APITestCase):
+    def setUp(self):
+        reset_cache()
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=self.user).key)
+        self.url = reverse("blockchain_api:balance")
+        UserAddresses.objects.create(user=self.user, address="1Addr1")
+
+    def test_served_from_snapshots(self):
+        snapshot("1Addr1", 7, age=10)
+        with upstream() as get_client:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['balances'], {'BTC': 7})
+        get_client.return_value.get.assert_not_called()
+
+    def test_fresh_balance_is_stored(self):
+        snapshot("1Addr1", 7, age=10)
+        with upstream():
+            response = self.client.get(self.url, {'fresh': 'true'})
+        self.assertEqual(response.json()['balances'], {'BTC': 2})
+        self.assertEqual(BalanceSnapshot.objects.get(address="1Addr1").balance, 2)
+        self.assertEqual(self.client.get(self.url).json()['balances'], {'BTC': 2})
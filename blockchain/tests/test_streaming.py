@@ -0,0 +1,177 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+from blockchain.cache import reset_cache
+from blockchain.lookups import fetch_address, stream_address
+from blockchain.models import SearchAddress
+from blockchain.providers import get_provider
+from blockchain.streaming import ObjectScanner
+from blockchain.tests.test_cache import CACHE_SETTINGS
+from blockchain.tests.test_index import INDEX_SETTINGS
+import json
+import tracemalloc
+
+ADDRESS = "1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1F"
+
+
+def tx(i, inputs=1):
+    return {'hash': f'{i:064x}', 'block_height': 700000 - i, 'time': 1620000000 - i, 'result': 1000 + i,
+            'inputs': [{'prev_out': {'addr': ADDRESS, 'value': 5000, 'script': 'ab' * 50}}] * inputs}
+
+
+def rawaddr_chunks(n_tx, inputs=1, size=1000):
+    """Body of a rawaddr response with n_tx transactions, generated while it is read."""
+    def body():
+        yield '{"hash160": "66", "address": "%s", "n_tx": %d, "total_received": 12,\n "txs": [' % (ADDRESS, n_tx)
+        for i in range(n_tx):
+            yield (',' if i else '') + json.dumps(tx(i, inputs))
+        yield '], "total_sent": 2, "final_balance": 10}'
+
+    pending = ''
+    for part in body():
+        pending += part
+        while len(pending) >= size:
+            yield pending[:size].encode()
+            pending = pending[size:]
+    yield pending.encode()
+
+
+def upstream(status_code=200, chunks=()):
+    client = mock.Mock()
+    response = mock.Mock(status_code=status_code, headers={})
+    response.iter_content.return_value = chunks
+    client.get.return_value = response
+    return mock.patch('blockchain.providers.base.get_client', return_value=client)
+
+
+class TestObjectScanner(SimpleTestCase):
+    document = '{"a": 12, "txs": [{"b": [1, 2]}, 3, "x"], "c": {"d": null}, "e": 1.5}'
+
+    def scan(self, parts):
+        scanner = ObjectScanner(arrays=['txs'])
+        events = [event for part in parts for event in scanner.feed(part)]
+        scanner.close()
+        return events
+
+    def test_members_and_items_in_any_chunking(self):
+        expected = [('member', 'a', 12), ('item', 'txs', {'b': [1, 2]}), ('item', 'txs', 3), ('item', 'txs', 'x'),
+                    ('member', 'c', {'d': None}), ('member', 'e', 1.5)]
+        self.assertEqual(self.scan([self.document]), expected)
+        self.assertEqual(self.scan(list(self.document)), expected)
+        self.assertEqual(self.scan([self.document[:7], self.document[7:]]), expected)
+
+    def test_empty_values(self):
+        self.assertEqual(self.scan(['{}']), [])
+        self.assertEqual(self.scan(['{"txs": [], "a": []}']), [('member', 'a', [])])
+
+    def test_truncated_or_invalid(self):
+        with self.assertRaises(ValueError):
+            self.scan(['{"a": 1, "txs": [1, 2'])
+        with self.assertRaises(ValueError):
+            self.scan(['{"a" 1}'])
+        with self.assertRaises(ValueError):
+            ObjectScanner(max_value=10).feed('{"a": "' + 'x' * 20)
+
+    def test_malformed_text_raises_when_fed(self):
+        for corrupt in ['{"a": }', '{"txs": [1, ]', '{"txs": [{"b": 1]}', '{"a": nope, ', '{"a": "x\n"']:
+            with self.assertRaises(ValueError, msg=corrupt):
+                ObjectScanner(arrays=['txs']).feed(corrupt)
+        # Cut within a token or a string, it waits for the rest.
+        for partial in ['{"a": tr', '{"a": "x, y', '{"txs": [{"b": [1, 2']:
+            self.assertEqual(ObjectScanner(arrays=['txs']).feed(partial), [], msg=partial)
+
+
+@override_settings(BLOCKCHAIN_CACHE=CACHE_SETTINGS, BLOCKCHAIN_INDEX=INDEX_SETTINGS)
+class TestStreamAddress(SimpleTestCase):
+    def setUp(self):
+        reset_cache()
+
+    def test_streamed_like_fetched(self):
+        payload = json.loads(b''.join(rawaddr_chunks(30)))
+        with upstream(chunks=rawaddr_chunks(30, size=7)):
+            address, chunks = stream_address(ADDRESS)
+            streamed = json.loads(b''.join(chunks))
+        self.assertEqual(address, ADDRESS)
+        self.assertEqual(streamed, get_provider('BTC').parse_address(payload, ADDRESS))
+
+    def test_peak_memory_does_not_grow_with_the_payload(self):
+        def peak(n_tx):
+            with upstream(chunks=rawaddr_chunks(n_tx, inputs=20, size=16384)):
+                tracemalloc.start()
+                _, chunks = stream_address(ADDRESS, limit=n_tx)
+                received = sum(len(chunk) for chunk in chunks)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            self.assertGreater(received, n_tx * 100)
+            return peak
+
+        small, large = peak(50), peak(2000)
+        # The large body is about 5 MB.
+        self.assertLess(large, 2 * small + 256 * 1024)
+
+    def test_corrupt_chunk_ends_with_an_error(self):
+        body = b''.join(rawaddr_chunks(5))
+        cut = body.index(b',{"hash"', body.index(b',{"hash"') + 1)
+        body = body[:cut] + b'}' + body[cut:]
+        with upstream(chunks=[body[start:start + 200] for start in range(0, len(body), 200)]):
+            _, streamed = stream_address(ADDRESS)
+            with self.assertLogs('blockchain.lookups', 'ERROR'):
+                document = json.loads(b''.join(streamed))
+        self.assertIn('error', document)
+        self.assertNotIn('final_balance', document)
+        self.assertLess(len(document['txs']), 5)
+
+    def test_rejected_address(self):
+        with upstream(status_code=400):
+            self.assertEqual(stream_address(ADDRESS), (ADDRESS, None))
+
+
+@override_settings(BLOCKCHAIN_CACHE={**CACHE_SETTINGS, 'ADDRESS_TTL': 0}, BLOCKCHAIN_INDEX={**INDEX_SETTINGS,
+                                                                                           'ENABLED': False})
+class TestAddressPages(SimpleTestCase):
+    def fetch(self, **page):
+        body = b''.join(rawaddr_chunks(50))
+        with mock.patch('blockchain.providers.base.get_client') as get_client:
+            get_client.return_value.get.return_value = mock.Mock(status_code=200, content=body)
+            data = fetch_address(ADDRESS, **page)
+        return data, get_client.return_value.get.call_args[1]['params']
+
+    def test_page_of_the_latest_transactions_is_cut_from_them(self):
+        data, params = self.fetch(offset=10, limit=5)
+        self.assertEqual(params, {'limit': 50, 'offset': 0})
+        self.assertEqual([t['value'] for t in data['txs']], [1010, 1011, 1012, 1013, 1014])
+
+    def test_older_pages_are_pushed_down(self):
+        _, params = self.fetch(offset=100, limit=20)
+        self.assertEqual(params, {'limit': 20, 'offset': 100})
+
+    def test_limit_is_capped_by_the_provider(self):
+        _, params = self.fetch(offset=100, limit=500)
+        self.assertEqual(params, {'limit': 50, 'offset': 100})
+
+
+@override_settings(BLOCKCHAIN_CACHE=CACHE_SETTINGS)
+class TestStreamingView(APITestCase):
+    def setUp(self):
+        reset_cache()
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=self.user).key)
+        self.url = reverse("blockchain_api:search_address", kwargs={'address': ADDRESS})
+
+    def test_stream(self):
+        with upstream(chunks=rawaddr_chunks(3)):
+            response = self.client.get(self.url, {'stream': 'true', 'limit': 3})
+            body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual((body['balance'], len(body['txs'])), (10, 3))
+        self.assertTrue(SearchAddress.objects.filter(user=self.user, address=ADDRESS, valid=True).exists())
+
+    def test_invalid_page(self):
+        response = self.client.get(self.url, {'offset': -1, 'limit': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.json()), {'offset', 'limit'})
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+from blockchain.models import SearchAddress, SearchSummary
+from blockchain.recorder import SearchRecorder
+from blockchain.summaries import summarize
+from blockchain.tests.test_validation import ADDRESS, OTHER_ADDRESS
+
+
+class TestSummarize(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.start = timezone.now() - timedelta(hours=1)
+
+    def search(self, minutes, address=ADDRESS, valid=True):
+        return SearchAddress(user=self.user, address=address, valid=valid,
+                             timestamp=self.start + timedelta(minutes=minutes))
+
+    def test_repeats_are_folded(self):
+        summarize([self.search(2), self.search(0), self.search(5, valid=False), self.search(1, OTHER_ADDRESS)])
+        summary = SearchSummary.objects.get(address=ADDRESS)
+        self.assertEqual((summary.count, summary.valid), (3, False))
+        self.assertEqual((summary.first_seen, summary.last_seen),
+                         (self.start, self.start + timedelta(minutes=5)))
+        self.assertEqual(SearchSummary.objects.get(address=OTHER_ADDRESS).count, 1)
+
+    def test_older_batch_keeps_latest_validity(self):
+        summarize([self.search(5, valid=False)])
+        summarize([self.search(0), self.search(1)])
+        summary = SearchSummary.objects.get()
+        self.assertEqual((summary.count, summary.valid), (3, False))
+        self.assertEqual((summary.first_seen, summary.last_seen),
+                         (self.start, self.start + timedelta(minutes=5)))
+
+    def test_saved_search_is_summarized(self):
+        SearchAddress.objects.create(user=self.user, address=ADDRESS)
+        SearchAddress.objects.create(user=self.user, address=ADDRESS, valid=False)
+        self.assertEqual(list(SearchSummary.objects.values_list('count', 'valid')), [(2, False)])
+
+    def test_recorder_batches_are_summarized(self):
+        recorder = SearchRecorder(batch_size=10, flush_interval=60)
+        recorder._ensure_thread = lambda: None
+        for i in range(4):
+            recorder.record(self.search(i))
+        recorder.flush()
+        self.assertEqual(list(SearchSummary.objects.values_list('count', flat=True)), [4])
+
+
+class TestSummaryReads(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.client.force_authenticate(user=self.user)
+        summarize(SearchAddress.objects.bulk_create(
+            [SearchAddress(user=self.user, address=ADDRESS) for _ in range(1000)]))
+
+    def test_history_lists_an_address_once(self):
+        response = self.client.get(reverse("blockchain_api:past_searches"))
+        [entry] = response.json()['results']
+        self.assertEqual((entry['address'], entry['count'], entry['valid']), (ADDRESS, 1000, True))
+        self.assertLessEqual(entry['first_seen'], entry['timestamp'])
+
+    def test_marking_reads_one_row(self):
+        url = reverse("blockchain_api:mine_addresses")
+        # However many searches: the user, the two checks, the insert in a savepoint and
+        # the first bump of the addresses version.
+        with self.assertNumQueries(10):
+            response = self.client.post(url, data={'address': ADDRESS})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_marking_uses_latest_validity(self):
+        SearchAddress.objects.create(user=self.user, address=ADDRESS, valid=False)
+        response = self.client.post(reverse("blockchain_api:mine_addresses"), data={'address': ADDRESS})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['non_field_errors'], ["Invalid active address"])
@@ -0,0 +1,77 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.test import SimpleTestCase, override_settings
+from blockchain.upstream import UpstreamClient, UpstreamError, client_stats, get_client
+import threading
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    failures = 0
+
+    def do_GET(self):
+        if self.path.startswith('/flaky') and type(self).failures > 0:
+            type(self).failures -= 1
+            self._reply(503, b'{}')
+        else:
+            self._reply(200, b'{"ok": true}')
+
+    def _reply(self, code, body):
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestUpstreamClient(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}/"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = UpstreamClient(self.base_url, pool_size=2, backoff_factor=0)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_keep_alive_connection_is_reused(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get('rawaddr/abc').status_code, 200)
+        stats = self.client.stats.as_dict()
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['new_connections'], 1)
+        self.assertEqual(stats['pool_hits'], 4)
+
+    def test_retry_on_server_error(self):
+        _Handler.failures = 2
+        response = self.client.get('flaky')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.stats.as_dict()['retries'], 2)
+
+    def test_unreachable_upstream_raises(self):
+        client = UpstreamClient('http://127.0.0.1:9/', retries=0, connect_timeout=0.5)
+        with self.assertRaises(UpstreamError):
+            client.get('rawaddr/abc')
+        self.assertEqual(client.stats.as_dict()['errors'], 1)
+
+    def test_client_is_shared_per_name(self):
+        config = {'BASE_URL': self.base_url, 'POOL_SIZE': 1, 'ASYNC_POOL_SIZE': 1, 'CONNECT_TIMEOUT': 1,
+                  'READ_TIMEOUT': 1, 'RETRIES': 0, 'BACKOFF_FACTOR': 0}
+        client = get_client('test', config)
+        self.assertIs(get_client('test', config), client)
+        self.assertEqual(client.timeout, (1, 1))
+        self.assertIn('test', client_stats())
+        with override_settings(BLOCKCHAIN_UPSTREAM={}):
+            self.assertIsNot(get_client('test', config), client)
@@ -0,0 +1,65 @@
+from django.test import SimpleTestCase
+from blockchain.validation import is_valid_address, is_valid_transaction, keccak256
+
+# Well formed identifiers for the tests of the lookups.
+ADDRESS = "1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1F"
+OTHER_ADDRESS = "1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2"
+TRANSACTION = "ab" * 32
+
+
+class TestAddressFormats(SimpleTestCase):
+    def assertValid(self, chain, *addresses):
+        for address in addresses:
+            self.assertTrue(is_valid_address(address, chain), address)
+
+    def assertInvalid(self, chain, *addresses):
+        for address in addresses:
+            self.assertFalse(is_valid_address(address, chain), address)
+
+    def test_base58check(self):
+        self.assertValid('BTC', ADDRESS, "3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy")
+        # A changed character, a testnet version byte and a non base58 character.
+        self.assertInvalid('BTC', "1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn1G", "mipcBbFg9gMiCh81Kj8tqqdgoZub1ZJRfn",
+                           "1AJbsFZ64EpEfS5UAjAfcUG8pH8Jn3rn10", "test123", "")
+
+    def test_segwit(self):
+        # BIP 173 and BIP 350 test vectors.
+        self.assertValid('BTC', "BC1QW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4",
+                         "bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq",
+                         "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqzk5jj0",
+                         "bc1zw508d6qejxtdg4y5r3zarvaryvaxxpcs")
+        # Bad checksum, mixed case, v0 with a Bech32m checksum and v1 with a Bech32 one.
+        self.assertInvalid('BTC', "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t5",
+                           "bc1QW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4",
+                           "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kemeawh",
+                           "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqh2y7hd")
+
+    def test_cashaddr(self):
+        self.assertValid('BCH', "bitcoincash:qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6a",
+                         "qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6a",
+                         "BITCOINCASH:QPM2QSZNHKS23Z7629MMS6S4CWEF74VCWVY22GDX6A",
+                         "ppm2qsznhks23z7629mms6s4cwef74vcwvn0h829pq", ADDRESS)
+        self.assertInvalid('BCH', "bitcoincash:qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6b",
+                           "qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6A",
+                           "bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq")
+
+    def test_eip55(self):
+        # EIP-55 test vectors, all lower or upper case addresses carry no checksum.
+        self.assertValid('ETH', "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed",
+                         "0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359", "0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB",
+                         "0x" + "ab" * 20, "0x" + "AB" * 20)
+        self.assertInvalid('ETH', "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAeD", "0x" + "ab" * 19, ADDRESS)
+
+    def test_keccak256(self):
+        self.assertEqual(keccak256(b'').hex(), "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470")
+        self.assertEqual(keccak256(b'hello world').hex(),
+                         "47173285a8d7341e5e972fc677286384f802f8ef42a5ec5f03bbfa254cb01fad")
+
+
+class TestTransactionFormats(SimpleTestCase):
+    def test_hashes(self):
+        self.assertTrue(is_valid_transaction(TRANSACTION, 'BTC'))
+        self.assertTrue(is_valid_transaction("0x" + TRANSACTION, 'ETH'))
+        self.assertFalse(is_valid_transaction("0x" + TRANSACTION, 'BTC'))
+        self.assertFalse(is_valid_transaction(TRANSACTION, 'ETH'))
+        self.assertFalse(is_valid_transaction(TRANSACTION[:-1] + "g", 'BCH'))
@@ -0,0 +1,139 @@
+from unittest import mock
+from datetime import datetime, timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.timezone import utc
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+from blockchain.models import DataVersion, SearchAddress, UserAddresses
+from blockchain.recorder import record_address_search
+from blockchain.snapshots import store_snapshots
+from blockchain.tests.test_snapshots import SNAPSHOTS, snapshot
+from blockchain.versions import ADDRESSES, BALANCES, SEARCHES, bump, bump_owners
+
+SEARCH_LOG_SETTINGS = {'BUFFERED': False, 'BATCH_SIZE': 3, 'FLUSH_INTERVAL': 60, 'MAX_QUEUE': 5, 'OVERFLOW': 'sync'}
+
+
+class TestBump(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'u{i}', password="passwordTesting.123") for i in range(3)]
+
+    def versions(self, kind):
+        return dict(DataVersion.objects.filter(kind=kind).values_list('user_id', 'version'))
+
+    def test_bump_creates_and_increments(self):
+        bump([self.users[0].id], SEARCHES)
+        bump([user.id for user in self.users], SEARCHES)
+        self.assertEqual(self.versions(SEARCHES), {self.users[0].id: 2, self.users[1].id: 1, self.users[2].id: 1})
+        self.assertEqual(self.versions(ADDRESSES), {})
+
+    def test_bump_owners(self):
+        UserAddresses.objects.create(user=self.users[0], address="a")
+        UserAddresses.objects.create(user=self.users[1], address="a")
+        UserAddresses.objects.create(user=self.users[1], address="b")
+        bump_owners(["a", "b"], BALANCES)
+        self.assertEqual(self.versions(BALANCES), {self.users[0].id: 1, self.users[1].id: 1})
+
+    def test_store_snapshots_bumps_changed_balances(self):
+        UserAddresses.objects.create(user=self.users[0], address="1A")
+        UserAddresses.objects.create(user=self.users[1], address="1B")
+        snapshot("1A", 5)
+        snapshot("1B", 7)
+        store_snapshots(["1A", "1B"], {('BTC', "1A"): {'balance': 5}, ('BTC', "1B"): {'balance': 8}})
+        self.assertEqual(self.versions(BALANCES), {self.users[1].id: 1})
+
+    @override_settings(BLOCKCHAIN_SEARCH_LOG=SEARCH_LOG_SETTINGS)
+    def test_unbuffered_search_bumps(self):
+        record_address_search(self.users[0], "1A")
+        self.assertEqual(self.versions(SEARCHES), {self.users[0].id: 1})
+
+
+@override_settings(BLOCKCHAIN_BALANCE_SNAPSHOTS=SNAPSHOTS)
+class TestConditionalGet(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.client.force_authenticate(user=self.user)
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_searches(self):
+        url = reverse("blockchain_api:past_searches")
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first).status_code, status.HTTP_304_NOT_MODIFIED)
+        # Other pages have their own validators.
+        self.assertNotEqual(self.client.get(url + '?kind=address')['ETag'], first['ETag'])
+        record_address_search(self.user, "1A")
+        response = self.revalidate(url, first)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results']), 1)
+        DataVersion.objects.update(modified=timezone.now() - timedelta(seconds=5))
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+    def test_bump_within_the_second_of_last_modified(self):
+        url = reverse("blockchain_api:past_searches")
+        with mock.patch('blockchain.versions.timezone.now') as now:
+            def at(seconds):
+                now.return_value = datetime.fromtimestamp(seconds, tz=utc)
+
+            at(1000.2)
+            bump([self.user.id], SEARCHES)
+            at(1000.4)
+            # Another bump may follow in this second, only the ETag validates.
+            self.assertNotIn('Last-Modified', self.client.get(url))
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(1000)).status_code,
+                             status.HTTP_200_OK)
+            at(1000.7)
+            bump([self.user.id], SEARCHES)
+            at(1001.1)
+            last_modified = self.client.get(url)['Last-Modified']
+            self.assertEqual(last_modified, http_date(1000))
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code,
+                             status.HTTP_304_NOT_MODIFIED)
+            at(1001.3)
+            bump([self.user.id], SEARCHES)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code,
+                             status.HTTP_200_OK)
+
+    def test_addresses(self):
+        url = reverse("blockchain_api:mine_addresses")
+        SearchAddress.objects.create(user=self.user, address="1A")
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.client.post(url, data={'address': "1A"})
+        self.assertEqual(self.revalidate(url, first).status_code, status.HTTP_200_OK)
+
+    def test_balance(self):
+        url = reverse("blockchain_api:balance")
+        UserAddresses.objects.create(user=self.user, address="1A")
+        snapshot("1A", 5)
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first).status_code, status.HTTP_304_NOT_MODIFIED)
+        store_snapshots(["1A"], {('BTC', "1A"): {'balance': 5}})
+        self.assertEqual(self.revalidate(url, first).status_code, status.HTTP_304_NOT_MODIFIED)
+        store_snapshots(["1A"], {('BTC', "1A"): {'balance': 6}})
+        self.assertEqual(self.revalidate(url, first).status_code, status.HTTP_200_OK)
+
+    @mock.patch('blockchain.api.views.fetch_balances', return_value={'balances': {}, 'failed': []})
+    def test_fresh_balance_is_unconditional(self, fetch):
+        response = self.client.get(reverse("blockchain_api:balance") + '?fresh=true', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+
+    def test_search_address(self):
+        url = reverse("blockchain_api:search_address", kwargs={'address': "1A"})
+        data = {'chain': 'BTC', 'address': "1A", 'balance': 5, 'tx_count': 1,
+                'txs': [{'hash': 't', 'block_height': None}]}
+        with mock.patch('blockchain.api.views.fetch_address', return_value=data):
+            first = self.client.get(url)
+            self.assertEqual(self.revalidate(url, first).status_code, status.HTTP_304_NOT_MODIFIED)
+        confirmed = {**data, 'txs': [{'hash': 't', 'block_height': 100}]}
+        with mock.patch('blockchain.api.views.fetch_address', return_value=confirmed):
+            self.assertEqual(self.revalidate(url, first).status_code, status.HTTP_200_OK)
+        # A repeated search is still logged.
+        self.assertEqual(SearchAddress.objects.filter(user=self.user).count(), 3)
@@ -0,0 +1,252 @@
+import asyncio
+import os
+import threading
+import weakref
+from urllib.parse import urljoin
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+
+class UpstreamError(Exception):
+    """Upstream provider could not be reached or kept failing after retries."""
+
+
+class UpstreamThrottled(UpstreamError):
+    """The call budget of the upstream is exhausted, by us or as the provider reports."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamStats:
+    """Thread safe counters describing how well the connection pool is reused."""
+
+    FIELDS = ('requests', 'checkouts', 'new_connections', 'retries', 'errors')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def incr(self, field, amount=1):
+        with self._lock:
+            self._counts[field] += amount
+
+    def as_dict(self):
+        with self._lock:
+            data = dict(self._counts)
+        data['pool_hits'] = max(data['checkouts'] - data['new_connections'], 0)
+        data['pool_hit_ratio'] = round(data['pool_hits'] / data['checkouts'], 4) if data['checkouts'] else None
+        return data
+
+
+class _CountingRetry(Retry):
+    def __init__(self, *args, stats=None, **kwargs):
+        self.stats = stats
+        super().__init__(*args, **kwargs)
+
+    def new(self, **kw):
+        kw.setdefault('stats', self.stats)
+        return super().new(**kw)
+
+    def increment(self, *args, **kwargs):
+        # Only counted when another attempt is actually made.
+        new_retry = super().increment(*args, **kwargs)
+        if self.stats is not None:
+            self.stats.incr('retries')
+        return new_retry
+
+
+def _counting_pool_class(base, stats):
+    def _get_conn(self, timeout=None):
+        stats.incr('checkouts')
+        return base._get_conn(self, timeout=timeout)
+
+    def _new_conn(self):
+        stats.incr('new_connections')
+        return base._new_conn(self)
+
+    return type(base.__name__, (base,), {'_get_conn': _get_conn, '_new_conn': _new_conn})
+
+
+class _CountingAdapter(HTTPAdapter):
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool_class(HTTPConnectionPool, self.stats),
+            'https': _counting_pool_class(HTTPSConnectionPool, self.stats),
+        }
+
+
+class UpstreamClient:
+    """
+    Keep-alive HTTP client for a single upstream provider.
+    One instance is shared by all threads of a worker process, so TCP and TLS
+    handshakes are paid once per pooled connection instead of once per request.
+    """
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url, pool_size=10, connect_timeout=3.05, read_timeout=10,
+                 retries=3, backoff_factor=0.5):
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.timeout = (connect_timeout, read_timeout)
+        self.stats = UpstreamStats()
+        retry = _CountingRetry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+            stats=self.stats,
+        )
+        adapter = _CountingAdapter(self.stats, pool_connections=1, pool_maxsize=pool_size,
+                                   max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update({'content-type': 'application/json'})
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @classmethod
+    def from_settings(cls, config):
+        return cls(
+            base_url=config['BASE_URL'],
+            pool_size=config['POOL_SIZE'],
+            connect_timeout=config['CONNECT_TIMEOUT'],
+            read_timeout=config['READ_TIMEOUT'],
+            retries=config['RETRIES'],
+            backoff_factor=config['BACKOFF_FACTOR'],
+        )
+
+    def url(self, path):
+        return urljoin(self.base_url, path.lstrip('/'))
+
+    def get(self, path, params=None, **kwargs):
+        self.stats.incr('requests')
+        kwargs.setdefault('timeout', self.timeout)
+        try:
+            return self.session.get(self.url(path), params=params, **kwargs)
+        except requests.RequestException as exc:
+            self.stats.incr('errors')
+            raise UpstreamError(str(exc)) from exc
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncUpstreamClient:
+    """
+    Non-blocking counterpart of UpstreamClient for the ASGI views.
+    It is bound to the event loop it was created in.
+    """
+    RETRY_STATUSES = UpstreamClient.RETRY_STATUSES
+
+    def __init__(self, base_url, pool_size=100, connect_timeout=3.05, read_timeout=10,
+                 retries=3, backoff_factor=0.5):
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.stats = UpstreamStats()
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={'content-type': 'application/json'},
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+
+    @classmethod
+    def from_settings(cls, config):
+        return cls(
+            base_url=config['BASE_URL'],
+            pool_size=config['ASYNC_POOL_SIZE'],
+            connect_timeout=config['CONNECT_TIMEOUT'],
+            read_timeout=config['READ_TIMEOUT'],
+            retries=config['RETRIES'],
+            backoff_factor=config['BACKOFF_FACTOR'],
+        )
+
+    async def get(self, path, params=None):
+        self.stats.incr('requests')
+        attempt = 0
+        while True:
+            try:
+                res = await self.client.get(path.lstrip('/'), params=params)
+            except httpx.HTTPError as exc:
+                if attempt >= self.retries:
+                    self.stats.incr('errors')
+                    raise UpstreamError(str(exc)) from exc
+            else:
+                if res.status_code not in self.RETRY_STATUSES or attempt >= self.retries:
+                    return res
+            self.stats.incr('retries')
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+            attempt += 1
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_clients = {}
+_clients_pid = None
+_clients_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_client(name, config):
+    """
+    Return the upstream client called name of the current worker process,
+    creating it from config on first use.
+    """
+    global _clients_pid
+    pid = os.getpid()
+    client = _clients.get(name) if _clients_pid == pid else None
+    if client is None:
+        with _clients_lock:
+            if _clients_pid != pid:
+                # Sockets must never be shared with a forked parent.
+                _clients.clear()
+                _clients_pid = pid
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = UpstreamClient.from_settings(config)
+    return client
+
+
+def get_async_client(name, config):
+    """Return the async upstream client called name of the running event loop."""
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(name)
+    if client is None:
+        client = clients[name] = AsyncUpstreamClient.from_settings(config)
+    return client
+
+
+def client_stats():
+    if _clients_pid != os.getpid():
+        return {}
+    return {name: client.stats.as_dict() for name, client in list(_clients.items())}
+
+
+def reset_clients():
+    with _clients_lock:
+        if _clients_pid == os.getpid():
+            for client in _clients.values():
+                client.close()
+        _clients.clear()
+    _async_clients.clear()
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    if setting in ('BLOCKCHAIN_UPSTREAM', 'BLOCKCHAIN_PROVIDERS'):
+        reset_clients()
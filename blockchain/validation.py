@@ -0,0 +1,196 @@
+"""
+Format checks of addresses and transaction hashes, made before any upstream call.
+
+    BTC  Base58Check P2PKH and P2SH, Bech32 (BIP 173) and Bech32m (BIP 350) segwit
+    BCH  CashAddr, with or without the bitcoincash: prefix, and legacy Base58Check
+    ETH  0x and 40 hex digits, mixed case ones must carry the EIP-55 checksum
+
+Transactions are 64 hex digits, 0x prefixed on ETH. A cheap precompiled
+pattern rejects garbage before any checksum is computed, and results are
+kept in a bounded memo, so repeated inputs, valid or not, cost a lookup.
+"""
+import hashlib
+import re
+from functools import lru_cache
+
+MEMO_SIZE = 4096
+
+BASE58 = re.compile(r'^[1-9A-HJ-NP-Za-km-z]{25,35}$')
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+BASE58_DIGITS = {c: i for i, c in enumerate(BASE58_ALPHABET)}
+# Mainnet P2PKH and P2SH, BCH legacy addresses use the same ones.
+BASE58_VERSIONS = (0x00, 0x05)
+
+BECH32 = re.compile(r'^bc1[02-9ac-hj-np-z]{8,87}$')
+BECH32_CHARSET = 'qpzry9x8gf2tvdw0s3jn54khce6mua7l'
+BECH32_DIGITS = {c: i for i, c in enumerate(BECH32_CHARSET)}
+BECH32_CONST = 1
+BECH32M_CONST = 0x2bc830a3
+BECH32_GENERATOR = (0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3)
+
+CASHADDR = re.compile(r'^(bitcoincash:)?[qp][02-9ac-hj-np-z]{41}$')
+CASHADDR_PREFIX = 'bitcoincash'
+CASHADDR_GENERATOR = (0x98f2bc8e61, 0x79b76d99e2, 0xf33e5fb3c4, 0xae2eabe2a8, 0x1e4f43e470)
+# 160 bit P2PKH and P2SH hashes.
+CASHADDR_VERSIONS = (0x00, 0x08)
+
+ETH_ADDRESS = re.compile(r'^0x[0-9a-fA-F]{40}$')
+ETH_TRANSACTION = re.compile(r'^0x[0-9a-fA-F]{64}$')
+TRANSACTION = re.compile(r'^[0-9a-fA-F]{64}$')
+
+
+def _base58check(address):
+    if not BASE58.match(address):
+        return False
+    number = 0
+    for char in address:
+        number = number * 58 + BASE58_DIGITS[char]
+    # Leading 1s stand for leading zero bytes.
+    zeros = len(address) - len(address.lstrip('1'))
+    raw = b'\0' * zeros + number.to_bytes((number.bit_length() + 7) // 8, 'big')
+    if len(raw) != 25 or raw[0] not in BASE58_VERSIONS:
+        return False
+    return hashlib.sha256(hashlib.sha256(raw[:-4]).digest()).digest()[:4] == raw[-4:]
+
+
+def _convertbits(data, frombits, tobits):
+    """Regroup data without padding, None if the leftover bits are not zero padding."""
+    acc, bits, result = 0, 0, []
+    maxv = (1 << tobits) - 1
+    for value in data:
+        acc = (acc << frombits) | value
+        bits += frombits
+        while bits >= tobits:
+            bits -= tobits
+            result.append((acc >> bits) & maxv)
+    if bits >= frombits or (acc << (tobits - bits)) & maxv:
+        return None
+    return result
+
+
+def _bech32_polymod(values):
+    chk = 1
+    for value in values:
+        top = chk >> 25
+        chk = (chk & 0x1ffffff) << 5 ^ value
+        for i in range(5):
+            if (top >> i) & 1:
+                chk ^= BECH32_GENERATOR[i]
+    return chk
+
+
+def _segwit(address):
+    # Either case but not mixed, checksums are over the lower case form.
+    if address != address.lower() and address != address.upper():
+        return False
+    address = address.lower()
+    if len(address) > 90 or not BECH32.match(address):
+        return False
+    data = [BECH32_DIGITS[c] for c in address[3:]]
+    # bc expanded, the high bits of both characters then the low ones.
+    const = _bech32_polymod([3, 3, 0, 2, 3] + data)
+    version = data[0]
+    program = _convertbits(data[1:-6], 5, 8)
+    if program is None or version > 16 or not 2 <= len(program) <= 40:
+        return False
+    if version == 0:
+        return const == BECH32_CONST and len(program) in (20, 32)
+    return const == BECH32M_CONST
+
+
+def _cashaddr_polymod(values):
+    chk = 1
+    for value in values:
+        top = chk >> 35
+        chk = ((chk & 0x07ffffffff) << 5) ^ value
+        for i in range(5):
+            if (top >> i) & 1:
+                chk ^= CASHADDR_GENERATOR[i]
+    return chk ^ 1
+
+
+def _cashaddr(address):
+    if address != address.lower() and address != address.upper():
+        return False
+    address = address.lower()
+    if not CASHADDR.match(address):
+        return False
+    payload = address.rsplit(':', 1)[-1]
+    data = [BECH32_DIGITS[c] for c in payload]
+    if _cashaddr_polymod([ord(c) & 31 for c in CASHADDR_PREFIX] + [0] + data):
+        return False
+    raw = _convertbits(data[:-8], 5, 8)
+    return raw is not None and len(raw) == 21 and raw[0] in CASHADDR_VERSIONS
+
+
+_KECCAK_ROUNDS = (
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+)
+# Rotation of lane (x, y), at index x + 5 * y.
+_KECCAK_ROTATIONS = (0, 1, 62, 28, 27, 36, 44, 6, 55, 20, 3, 10, 43, 25, 39,
+                     41, 45, 15, 21, 8, 18, 2, 61, 56, 14)
+# Lane x + 5 * y moves to y + 5 * (2x + 3y) in the pi step.
+_KECCAK_PI = tuple(y + 5 * ((2 * x + 3 * y) % 5) for y in range(5) for x in range(5))
+_MASK = (1 << 64) - 1
+
+
+def _keccak_f(lanes):
+    for round_constant in _KECCAK_ROUNDS:
+        c = [lanes[x] ^ lanes[x + 5] ^ lanes[x + 10] ^ lanes[x + 15] ^ lanes[x + 20] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ (((c[(x + 1) % 5] << 1) | (c[(x + 1) % 5] >> 63)) & _MASK) for x in range(5)]
+        b = [0] * 25
+        for i in range(25):
+            lane, rotation = lanes[i] ^ d[i % 5], _KECCAK_ROTATIONS[i]
+            b[_KECCAK_PI[i]] = ((lane << rotation) | (lane >> (64 - rotation))) & _MASK
+        lanes = [b[i] ^ (~b[i - i % 5 + (i + 1) % 5] & b[i - i % 5 + (i + 2) % 5]) for i in range(25)]
+        lanes[0] ^= round_constant
+    return lanes
+
+
+def keccak256(data):
+    """Keccak-256 as Ethereum uses it, with the padding before SHA-3 changed it."""
+    rate = 136
+    padded = bytearray(data) + b'\x01' + b'\0' * (-(len(data) + 1) % rate)
+    padded[-1] |= 0x80
+    lanes = [0] * 25
+    for start in range(0, len(padded), rate):
+        block = padded[start:start + rate]
+        for i in range(rate // 8):
+            lanes[i] ^= int.from_bytes(block[i * 8:i * 8 + 8], 'little')
+        lanes = _keccak_f(lanes)
+    return b''.join(lane.to_bytes(8, 'little') for lane in lanes[:4])
+
+
+def _eth_address(address):
+    if not ETH_ADDRESS.match(address):
+        return False
+    digits = address[2:]
+    if digits == digits.lower() or digits == digits.upper():
+        return True
+    checksum = keccak256(digits.lower().encode()).hex()
+    return all(char.isdigit() or char.isupper() == (int(nibble, 16) >= 8)
+               for char, nibble in zip(digits, checksum))
+
+
+ADDRESS_CHECKS = {
+    'BTC': (_base58check, _segwit),
+    'BCH': (_cashaddr, _base58check),
+    'ETH': (_eth_address,),
+}
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def is_valid_address(address, chain):
+    """Whether address has the format of an address of chain, chains without checks accept anything."""
+    return any(check(address) for check in ADDRESS_CHECKS.get(chain, (lambda address: True,)))
+
+
+def is_valid_transaction(transaction, chain):
+    if chain == 'ETH':
+        return bool(ETH_TRANSACTION.match(transaction))
+    return bool(TRANSACTION.match(transaction))
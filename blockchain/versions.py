@@ -0,0 +1,110 @@
+"""
+Validators of the read endpoints, so clients polling them get 304 Not Modified.
+
+Every write of the searches, the marked addresses or the balance snapshots of
+a user bumps a DataVersion counter of that kind. The ETag of an endpoint
+hashes the counters it depends on with the request path and the media type,
+Last-Modified is the time of the latest bump once its second is over,
+neither needs the response body. Endpoints backed by the upstreams hash the fields of the data that
+change when an address or transaction does instead.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from blockchain.models import DataVersion, UserAddresses
+
+SEARCHES = 'searches'
+ADDRESSES = 'addresses'
+BALANCES = 'balances'
+
+# Below the 999 parameters older SQLite versions accept in a query.
+CHUNK_SIZE = 900
+
+
+def bump(user_ids, kind):
+    """Bump the kind counters of user_ids, after their data was written."""
+    user_ids = list(set(user_ids))
+    now = timezone.now()
+    for start in range(0, len(user_ids), CHUNK_SIZE):
+        chunk = user_ids[start:start + CHUNK_SIZE]
+        versions = DataVersion.objects.filter(kind=kind, user_id__in=chunk)
+        if versions.update(version=F('version') + 1, modified=now) == len(chunk):
+            continue
+        missing = set(chunk) - set(versions.values_list('user_id', flat=True))
+        # Created at 0 and bumped, a row created concurrently since is bumped too.
+        DataVersion.objects.bulk_create([DataVersion(user_id=user_id, kind=kind) for user_id in missing],
+                                        ignore_conflicts=True)
+        DataVersion.objects.filter(kind=kind, user_id__in=missing).update(version=F('version') + 1, modified=now)
+
+
+def bump_owners(addresses, kind):
+    """Bump the kind counters of the users who marked any of addresses as theirs."""
+    addresses = list(addresses)
+    for start in range(0, len(addresses), CHUNK_SIZE):
+        chunk = addresses[start:start + CHUNK_SIZE]
+        bump(UserAddresses.objects.filter(address__in=chunk).values_list('user_id', flat=True), kind)
+
+
+def _etag(request, *parts):
+    key = repr((request.get_full_path(), getattr(request, 'accepted_media_type', None)) + parts)
+    # Weak, equal data may render differently, like the as_of of balances.
+    return 'W/"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+
+def conditional(*kinds, skip=None):
+    """
+    Answer a GET of the view method with 304 when the kinds counters of the
+    user did not change since the validators the client sends. skip(request)
+    true serves the request unconditionally, like live upstream data.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if skip is not None and skip(request):
+                return method(view, request, *args, **kwargs)
+            rows = DataVersion.objects.filter(user=request.user.id, kind__in=kinds) \
+                .values_list('kind', 'version', 'modified')
+            versions = {kind: (version, modified) for kind, version, modified in rows}
+            etag = _etag(request, request.user.id, *(versions.get(kind, (0,))[0] for kind in kinds))
+            last_modified = max((modified for _, modified in versions.values()), default=None)
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+            if timestamp is not None and timestamp >= int(timezone.now().timestamp()):
+                # Last-Modified has whole seconds, a bump later in this one would not change it.
+                timestamp = None
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = method(view, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if timestamp is not None:
+                    response['Last-Modified'] = http_date(timestamp)
+            return response
+        return wrapper
+    return decorator
+
+
+def validated_response(request, data, *parts):
+    """
+    Response of upstream data with an ETag of parts, the fields that change
+    with it, or 304 when the client has it already.
+    """
+    etag = _etag(request, *parts)
+    response = get_conditional_response(request, etag=etag) or Response(data)
+    response['ETag'] = etag
+    return response
+
+
+def address_validators(data):
+    return (data.get('chain'), data.get('address'), data.get('balance'), data.get('tx_count'),
+            tuple((tx.get('hash'), tx.get('block_height')) for tx in data.get('txs', ())))
+
+
+def transaction_validators(data):
+    # Confirmed transactions only change when a reorganization moves them.
+    return data.get('chain'), data.get('hash'), data.get('block_height')
@@ -0,0 +1,18 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def unbuffered_search_log(settings):
+    # Tests read the search log right after the request that wrote it.
+    settings.BLOCKCHAIN_SEARCH_LOG = {**settings.BLOCKCHAIN_SEARCH_LOG, 'BUFFERED': False}
+
+
+@pytest.fixture(autouse=True)
+def local_rate_limits(settings):
+    # Buckets start full in every test instead of being shared through files.
+    settings.BLOCKCHAIN_RATE_LIMITS = {**settings.BLOCKCHAIN_RATE_LIMITS, 'BACKEND': 'local'}
+
+
+@pytest.fixture(autouse=True)
+def quiet_request_log(settings):
+    settings.BLOCKCHAIN_METRICS = {**settings.BLOCKCHAIN_METRICS, 'LOG': False}
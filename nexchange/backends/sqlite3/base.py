@@ -0,0 +1,30 @@
+"""
+SQLite backend running the PRAGMAS of its DATABASES entry on every new
+connection and, like Django 5.1, starting transactions with BEGIN
+IMMEDIATE when OPTIONS['transaction_mode'] is IMMEDIATE.
+
+A deferred transaction that read before writing cannot wait for the write
+lock, it fails at once with "database is locked" if another connection
+wrote in the meantime. An immediate one waits for the lock up to the timeout.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict.get('PRAGMAS', {}).items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode:
+            self.cursor().execute(f'BEGIN {mode}')
+        else:
+            super()._start_transaction_under_autocommit()
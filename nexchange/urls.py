@@ -19,5 +19,6 @@ from django.urls import path, include
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('account/api/', include('accounts.urls', namespace='api_register')),
-    path('blockchain/api/', include('blockchain.api.urls', 'blockchain_api'))
+    path('blockchain/api/', include('blockchain.api.urls', 'blockchain_api')),
+    path('orders/api/', include('orders.api.urls', 'orders_api')),
 ]
@@ -0,0 +1,4 @@
+from django.contrib import admin
+from orders.models import Order
+
+admin.site.register(Order)
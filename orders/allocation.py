@@ -0,0 +1,119 @@
+"""
+Deposit address pool of the orders.
+
+A user's address is free while its allocated flag is unset. Creating an
+order claims one free address, completing it releases the address again,
+so neither needs to look at the other open orders.
+"""
+import logging
+import time
+
+from django.db import OperationalError, transaction
+from django.utils import timezone
+
+from blockchain.lookups import fetch_balance
+from blockchain.models import UserAddresses
+from blockchain.providers import UnknownChain, detect_address_chain, get_provider
+from blockchain.upstream import UpstreamError
+from orders.models import Order
+
+logger = logging.getLogger(__name__)
+
+
+class NoFreeAddress(Exception):
+    pass
+
+
+def create_order(user, amount, attempts=10):
+    """
+    Open an order paid to a free address of user. Raises NoFreeAddress
+    when every marked address already serves an open order.
+    """
+    for attempt in range(attempts):
+        try:
+            address = _claim(user)
+        except OperationalError:
+            if attempt == attempts - 1:
+                raise
+            address = None
+        if address is not None:
+            return _open(user, amount, address, attempts)
+        time.sleep(_backoff(attempt))
+    raise NoFreeAddress()
+
+
+def _backoff(attempt):
+    # SQLite reports a conflicting writer instead of waiting for it.
+    return 0.005 * (attempt + 1)
+
+
+def _retried(write, attempts):
+    for attempt in range(attempts):
+        try:
+            return write()
+        except OperationalError:
+            if attempt == attempts - 1:
+                raise
+        time.sleep(_backoff(attempt))
+
+
+def _claim(user):
+    """The claimed address, or None if another creation claimed the same address first."""
+    with transaction.atomic():
+        # Concurrent creations skip each other's locked candidates where the
+        # database supports it, the conditional update settles the rest.
+        address = UserAddresses.objects.select_for_update(skip_locked=True) \
+            .filter(user=user, allocated=False).order_by('id').first()
+        if address is None:
+            raise NoFreeAddress()
+        if not UserAddresses.objects.filter(pk=address.pk, allocated=False).update(allocated=True):
+            return None
+    return address
+
+
+def _open(user, amount, address, attempts):
+    """The order paid to a claimed address, the address is released if it cannot be created."""
+    try:
+        # Outside the claim, which would hold its write lock for the upstream round trip.
+        chain = detect_address_chain(address.address)
+        received_before = _received(address.address, chain)
+        return _retried(lambda: Order.objects.create(user=user, amount=amount, address=address,
+                                                     deposit_address=address.address, chain=chain,
+                                                     received_before=received_before), attempts)
+    except Exception:
+        _retried(lambda: UserAddresses.objects.filter(pk=address.pk).update(allocated=False), attempts)
+        raise
+
+
+def _received(address, chain):
+    """
+    Total received by address so far, the baseline of the order. Taken
+    while allocating, a payment made before the first poll of the watcher
+    counts. None while the upstream rejects the address or cannot be
+    reached, the watcher then takes it at its first poll.
+    """
+    try:
+        provider = get_provider(chain)
+    except UnknownChain:
+        return None
+    address = provider.canonical_address(address)
+    try:
+        data = fetch_balance([address], chain)
+    except UpstreamError as exc:
+        logger.warning("Baseline of %s left pending: %s", address, exc)
+        return None
+    if data is None or address not in data:
+        return None
+    return data[address]['total_received']
+
+
+def complete_order(order):
+    """Complete an open or paid order and return its address to the pool, False if it was neither."""
+    with transaction.atomic():
+        now = timezone.now()
+        if not Order.objects.filter(pk=order.pk, status__in=Order.ACTIVE).update(status=Order.COMPLETED,
+                                                                                 completed=now):
+            return False
+        UserAddresses.objects.filter(pk=order.address_id).update(allocated=False)
+    order.status, order.completed = Order.COMPLETED, now
+    return True
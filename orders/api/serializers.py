@@ -0,0 +1,12 @@
+from rest_framework import serializers
+from orders.models import Order
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    # Smallest unit of the chain, wei overflow a float.
+    amount = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'amount', 'chain', 'deposit_address', 'status', 'created', 'paid', 'completed']
+        read_only_fields = ['chain', 'deposit_address', 'status', 'created', 'paid', 'completed']
@@ -0,0 +1,144 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection
+from django.test import TransactionTestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from rest_framework.reverse import reverse
+from rest_framework import status
+from blockchain.models import UserAddresses
+from blockchain.upstream import UpstreamError
+from orders.allocation import NoFreeAddress, create_order
+from orders.models import Order
+
+
+def received_nothing(addresses, chain):
+    return {address: {'final_balance': 0, 'total_received': 0} for address in addresses}
+
+
+class TestOrdersView(APITestCase):
+    def setUp(self):
+        upstream = mock.patch('orders.allocation.fetch_balance', side_effect=received_nothing)
+        self.fetch_balance = upstream.start()
+        self.addCleanup(upstream.stop)
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+        self.token = Token.objects.create(user=self.user)
+        self.api_auth()
+        self.url = reverse("orders_api:orders")
+        for address in ("1BoatSLRHtKNngkdXEeobR76b53LETtpyT", "0x" + "a" * 40):
+            UserAddresses.objects.create(user=self.user, address=address)
+
+    def api_auth(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+
+    def test_create_order(self):
+        response = self.client.post(self.url, data={"amount": 1000})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['deposit_address'], "1BoatSLRHtKNngkdXEeobR76b53LETtpyT")
+        self.assertEqual(response.json()['chain'], "BTC")
+        self.assertEqual(response.json()['status'], "open")
+        self.assertTrue(UserAddresses.objects.get(address="1BoatSLRHtKNngkdXEeobR76b53LETtpyT").allocated)
+
+    def test_unreachable_upstream_leaves_baseline_pending(self):
+        self.fetch_balance.side_effect = UpstreamError("down")
+        response = self.client.post(self.url, data={"amount": 1000})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(Order.objects.get().received_before)
+        self.assertTrue(UserAddresses.objects.get(address=response.json()['deposit_address']).allocated)
+
+    def test_baseline_is_fetched_after_the_claim_commits(self):
+        depth = len(connection.savepoint_ids)
+
+        def fetch(addresses, chain):
+            self.assertEqual(len(connection.savepoint_ids), depth)
+            self.assertTrue(UserAddresses.objects.get(address=addresses[0]).allocated)
+            return received_nothing(addresses, chain)
+
+        self.fetch_balance.side_effect = fetch
+        self.assertEqual(create_order(self.user, 5).received_before, 0)
+
+    def test_failed_creation_releases_address(self):
+        with mock.patch.object(Order.objects, 'create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                create_order(self.user, 5)
+        self.assertFalse(UserAddresses.objects.filter(allocated=True).exists())
+        self.assertFalse(Order.objects.exists())
+
+    def test_open_orders_get_distinct_addresses(self):
+        first = self.client.post(self.url, data={"amount": 1}).json()
+        second = self.client.post(self.url, data={"amount": 1}).json()
+        self.assertNotEqual(first['deposit_address'], second['deposit_address'])
+        response = self.client.post(self.url, data={"amount": 1})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_completed_order_releases_address(self):
+        orders = [self.client.post(self.url, data={"amount": 1}).json() for _ in range(2)]
+        url = reverse("orders_api:complete_order", kwargs={'pk': orders[1]['id']})
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['status'], "completed")
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_400_BAD_REQUEST)
+        reused = self.client.post(self.url, data={"amount": 1}).json()
+        self.assertEqual(reused['deposit_address'], orders[1]['deposit_address'])
+
+    def test_paid_order_can_be_completed(self):
+        order = self.client.post(self.url, data={"amount": 1}).json()
+        Order.objects.filter(pk=order['id']).update(status=Order.PAID)
+        response = self.client.post(reverse("orders_api:complete_order", kwargs={'pk': order['id']}))
+        self.assertEqual(response.json()['status'], "completed")
+        self.assertFalse(UserAddresses.objects.get(address=order['deposit_address']).allocated)
+
+    def test_list_orders(self):
+        for amount in (1, 2):
+            self.client.post(self.url, data={"amount": amount})
+        response = self.client.get(self.url)
+        self.assertEqual([o['amount'] for o in response.json()['results']], [2, 1])
+        self.assertEqual(self.client.get(self.url + '?status=completed').json()['count'], 0)
+
+    def test_invalid_amount(self):
+        self.assertEqual(self.client.post(self.url, data={"amount": 0}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(self.url, data={}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_order(self):
+        other = User.objects.create_user(username='other', password="passwordTesting.123")
+        UserAddresses.objects.create(user=other, address="1Other")
+        order = create_order(other, 5)
+        url = reverse("orders_api:order", kwargs={'pk': order.id})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        url = reverse("orders_api:complete_order", kwargs={'pk': order.id})
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_allocated_address_cannot_be_unmarked(self):
+        self.client.post(self.url, data={"amount": 1})
+        response = self.client.delete(reverse("blockchain_api:mine_addresses"),
+                                      data={"address": "1BoatSLRHtKNngkdXEeobR76b53LETtpyT"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unauthenticated(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TestConcurrentOrders(TransactionTestCase):
+    def test_parallel_creations_never_share_an_address(self):
+        user = User.objects.create_user(username='test', password="passwordTesting.123")
+        UserAddresses.objects.bulk_create([UserAddresses(user=user, address=f"1Pool{i}") for i in range(20)])
+
+        def create(_):
+            try:
+                return create_order(user, 1).deposit_address
+            except NoFreeAddress:
+                return None
+            finally:
+                connection.close()
+
+        with mock.patch('orders.allocation.fetch_balance', side_effect=received_nothing), \
+                ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(create, range(30)))
+        allocated = [address for address in results if address]
+        self.assertEqual(len(allocated), len(set(allocated)))
+        self.assertEqual(len(allocated), 20)
+        self.assertEqual(Order.objects.count(), 20)
+        self.assertFalse(UserAddresses.objects.filter(allocated=False).exists())
@@ -0,0 +1,12 @@
+from django.urls import path
+from rest_framework.urlpatterns import format_suffix_patterns
+from . import views
+
+app_name = "orders_api"
+urlpatterns = [
+    path('orders/', views.OrdersView.as_view(), name="orders"),
+    path('orders/<int:pk>/', views.OrderView.as_view(), name="order"),
+    path('orders/<int:pk>/complete/', views.OrderCompleteView.as_view(), name="complete_order"),
+]
+
+urlpatterns = format_suffix_patterns(urlpatterns)
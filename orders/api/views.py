@@ -0,0 +1,73 @@
+from orders.allocation import NoFreeAddress, complete_order, create_order
+from orders.api.serializers import OrderSerializer
+from orders.models import Order
+from django.http import Http404
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status, permissions
+
+
+class OrdersView(APIView):
+    """
+    Orders
+    GET lists the user's orders, newest first.
+    Optional query parameters:
+    status - open, paid or completed
+    POST creates an order paid to one of the addresses marked as mine, each
+    open order gets a different one.
+    Required attributes:
+    amount - in the smallest unit of the deposit address chain (satoshi, wei)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, format=None):
+        orders = Order.objects.filter(user=request.user.id).order_by('-created', '-id')
+        if request.query_params.get('status'):
+            orders = orders.filter(status=request.query_params['status'])
+        paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+        page = paginator.paginate_queryset(orders, request, view=self)
+        return paginator.get_paginated_response(OrderSerializer(page, many=True).data)
+
+    def post(self, request, format=None):
+        serializer = OrderSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            order = create_order(request.user, serializer.validated_data['amount'])
+        except NoFreeAddress:
+            return Response({"non_field_errors": ["Every address marked as mine serves an open order."]},
+                            status=status.HTTP_409_CONFLICT)
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+
+
+def get_order(pk, user_id):
+    try:
+        return Order.objects.get(pk=pk, user=user_id)
+    except Order.DoesNotExist:
+        raise Http404
+
+
+class OrderView(APIView):
+    """
+    Order
+    Returns one order of the user.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk, format=None):
+        return Response(OrderSerializer(get_order(pk, request.user.id)).data)
+
+
+class OrderCompleteView(APIView):
+    """
+    Order completion
+    Completes an open or paid order, its deposit address can serve a new order again.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk, format=None):
+        order = get_order(pk, request.user.id)
+        if not complete_order(order):
+            return Response({"status": ["Order is already completed."]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(OrderSerializer(order).data)
@@ -0,0 +1,37 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from orders.watcher import DepositWatcher
+
+
+class Command(BaseCommand):
+    help = "Watch the deposit addresses of open orders and mark the orders paid."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Poll once and exit.")
+        parser.add_argument('--min-interval', type=float, help="Overrides DEPOSIT_WATCHER['MIN_INTERVAL'].")
+        parser.add_argument('--max-interval', type=float, help="Overrides DEPOSIT_WATCHER['MAX_INTERVAL'].")
+
+    def handle(self, *args, **options):
+        watcher = DepositWatcher.from_settings()
+        if options['min_interval'] is not None:
+            watcher.min_interval = watcher.interval = options['min_interval']
+        if options['max_interval'] is not None:
+            watcher.max_interval = options['max_interval']
+
+        stop = threading.Event()
+        if not options['once']:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *args: stop.set())
+
+        while not stop.is_set():
+            stats = watcher.poll()
+            if options['verbosity'] > 0:
+                self.stdout.write(
+                    "{orders} open orders, {addresses} addresses in {calls} calls "
+                    "({addresses_per_call} per call), {paid} paid, next poll in {next_interval:g}s".format(**stats))
+            if options['once']:
+                break
+            stop.wait(watcher.interval)
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.2 on 2026-10-18 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='order',
+            name='unique_open_order_address',
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='paid',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='received_before',
+            field=models.DecimalField(blank=True, decimal_places=0, max_digits=40, null=True),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('open', 'Open'), ('paid', 'Paid'), ('completed', 'Completed')], default='open', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'chain'], name='order_status_chain'),
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['open', 'paid'])), fields=('address',), name='unique_open_order_address'),
+        ),
+    ]
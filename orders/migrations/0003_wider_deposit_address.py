@@ -0,0 +1,18 @@
+# Generated by Django 3.2.2 on 2026-10-18 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_paid_orders'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='deposit_address',
+            field=models.CharField(max_length=90),
+        ),
+    ]
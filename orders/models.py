@@ -0,0 +1,44 @@
+from django.db import models
+from django.conf import settings
+from django.db.models import Q
+
+from blockchain.models import UserAddresses
+
+
+class Order(models.Model):
+    OPEN = 'open'
+    PAID = 'paid'
+    COMPLETED = 'completed'
+    STATUSES = [(OPEN, 'Open'), (PAID, 'Paid'), (COMPLETED, 'Completed')]
+    # Orders holding their deposit address.
+    ACTIVE = [OPEN, PAID]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    # In the smallest unit of the deposit address chain, satoshi or wei.
+    amount = models.DecimalField(max_digits=40, decimal_places=0)
+    chain = models.CharField(max_length=3)
+    deposit_address = models.CharField(max_length=90)
+    # Allocated from the user's addresses until the order is completed.
+    address = models.ForeignKey(UserAddresses, on_delete=models.SET_NULL, null=True, related_name='orders')
+    status = models.CharField(max_length=10, choices=STATUSES, default=OPEN)
+    # Total received by the deposit address when it was allocated, addresses
+    # are reused so only what arrives on top of it counts. Pending while the
+    # upstream could not be asked, the deposit watcher then fills it in.
+    received_before = models.DecimalField(max_digits=40, decimal_places=0, null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    paid = models.DateTimeField(null=True, blank=True)
+    completed = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Backs the allocation, an address serves one order at a time.
+            models.UniqueConstraint(fields=['address'], condition=Q(status__in=['open', 'paid']),
+                                    name='unique_open_order_address'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'status', 'created'], name='order_user_status'),
+            models.Index(fields=['status', 'chain'], name='order_status_chain'),
+        ]
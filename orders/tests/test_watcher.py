@@ -0,0 +1,88 @@
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from blockchain.models import UserAddresses
+from blockchain.tests.test_cache import CACHE_SETTINGS
+from orders.allocation import create_order
+from orders.models import Order
+from orders.watcher import DepositWatcher
+import json
+
+PROVIDERS = {**settings.BLOCKCHAIN_PROVIDERS, 'BTC': {**settings.BLOCKCHAIN_PROVIDERS['BTC'], 'BATCH_SIZE': 2}}
+
+
+@override_settings(BLOCKCHAIN_CACHE=CACHE_SETTINGS, BLOCKCHAIN_PROVIDERS=PROVIDERS)
+class TestDepositWatcher(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password="passwordTesting.123")
+        UserAddresses.objects.bulk_create([UserAddresses(user=self.user, address=f"1Dep{i}") for i in range(3)])
+        self.received = {f"1Dep{i}": 1000 for i in range(3)}
+        with self.upstream():
+            self.orders = [create_order(self.user, 100) for _ in range(3)]
+        self.watcher = DepositWatcher(min_interval=10, max_interval=300, backoff=2)
+
+    def upstream(self):
+        def get(path, params=None):
+            body = {a: {'final_balance': 0, 'total_received': self.received[a]} for a in params['active'].split('|')}
+            return mock.Mock(status_code=200, content=json.dumps(body).encode())
+
+        client = mock.Mock()
+        client.get.side_effect = get
+        return mock.patch('blockchain.providers.base.get_client', return_value=client)
+
+    def test_allocation_records_what_the_address_received_before(self):
+        self.assertEqual(set(Order.objects.values_list('received_before', flat=True)), {1000})
+
+    def test_payment_before_the_first_poll_counts(self):
+        self.received['1Dep0'] += 100
+        with self.upstream():
+            stats = self.watcher.poll()
+        self.assertEqual(stats['paid'], 1)
+        self.assertEqual(Order.objects.get(status=Order.PAID).deposit_address, '1Dep0')
+
+    def test_first_poll_records_a_missing_baseline(self):
+        Order.objects.update(received_before=None)
+        with self.upstream() as get_client:
+            stats = self.watcher.poll()
+        self.assertEqual(get_client.return_value.get.call_count, 2)
+        self.assertEqual((stats['addresses'], stats['calls'], stats['addresses_per_call']), (3, 2, 1.5))
+        self.assertEqual(stats['new'], 3)
+        self.assertEqual(set(Order.objects.values_list('received_before', flat=True)), {1000})
+        self.assertFalse(Order.objects.filter(status=Order.PAID).exists())
+
+    def test_orders_are_paid_once_the_amount_arrived(self):
+        with self.upstream():
+            self.watcher.poll()
+            self.received['1Dep0'] += 100
+            self.received['1Dep1'] += 99
+            with self.assertNumQueries(2):
+                stats = self.watcher.poll()
+        self.assertEqual(stats['paid'], 1)
+        self.assertEqual(Order.objects.get(status=Order.PAID).deposit_address, '1Dep0')
+
+    def test_interval_adapts_to_activity(self):
+        with self.upstream():
+            self.assertEqual(self.watcher.poll()['next_interval'], 20)
+            self.assertEqual(self.watcher.poll()['next_interval'], 40)
+            self.assertEqual(self.watcher.poll()['next_interval'], 80)
+            self.received['1Dep2'] += 500
+            self.assertEqual(self.watcher.poll()['next_interval'], 10)
+        Order.objects.update(status=Order.COMPLETED)
+        self.assertEqual(self.watcher.poll()['next_interval'], 300)
+
+    def test_failed_calls_are_counted(self):
+        client = mock.Mock()
+        client.get.return_value = mock.Mock(status_code=500, content=b'')
+        with mock.patch('blockchain.providers.base.get_client', return_value=client):
+            stats = self.watcher.poll()
+        self.assertEqual((stats['calls'], stats['failed_calls'], stats['addresses']), (2, 2, 0))
+        self.assertFalse(Order.objects.filter(status=Order.PAID).exists())
+
+    def test_command_polls_once(self):
+        out = StringIO()
+        with self.upstream():
+            call_command('watch_deposits', '--once', stdout=out)
+        self.assertIn("3 addresses in 2 calls (1.5 per call)", out.getvalue())
@@ -0,0 +1,100 @@
+"""
+Watcher marking orders paid once their amount arrived at the deposit address.
+
+Every poll checks the deposit addresses of all open orders in multi-address
+balance requests of the provider's batch size. The interval between polls
+drops to MIN_INTERVAL while orders are being created or paid and grows by
+BACKOFF up to MAX_INTERVAL while nothing happens.
+"""
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+
+from blockchain.lookups import fetch_balance
+from blockchain.providers import UnknownChain, get_provider
+from blockchain.upstream import UpstreamError
+from orders.models import Order
+
+logger = logging.getLogger(__name__)
+
+# Keeps id__in lists under SQLite's limit of query parameters.
+UPDATE_BATCH = 500
+
+
+class DepositWatcher:
+    def __init__(self, min_interval, max_interval, backoff):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+
+    @classmethod
+    def from_settings(cls, config=None):
+        config = config or settings.DEPOSIT_WATCHER
+        return cls(config['MIN_INTERVAL'], config['MAX_INTERVAL'], config['BACKOFF'])
+
+    def poll(self):
+        """Check every open order once, returns the poll statistics."""
+        orders = list(Order.objects.filter(status=Order.OPEN)
+                      .only('id', 'chain', 'deposit_address', 'amount', 'received_before'))
+        by_chain = {}
+        for order in orders:
+            by_chain.setdefault(order.chain, []).append(order)
+
+        stats = {'orders': len(orders), 'addresses': 0, 'calls': 0, 'failed_calls': 0, 'new': 0, 'paid': 0}
+        received = {}
+        for chain, chain_orders in by_chain.items():
+            try:
+                provider = get_provider(chain)
+            except UnknownChain:
+                logger.warning("No provider for %d orders on %s", len(chain_orders), chain)
+                continue
+            by_address = {}
+            for order in chain_orders:
+                by_address.setdefault(provider.canonical_address(order.deposit_address), []).append(order)
+            for chunk in provider.chunks(sorted(by_address)):
+                stats['calls'] += 1
+                try:
+                    data = fetch_balance(chunk, chain)
+                except UpstreamError:
+                    data = None
+                if data is None:
+                    stats['failed_calls'] += 1
+                    continue
+                stats['addresses'] += len(chunk)
+                for address in chunk:
+                    if address in data:
+                        for order in by_address[address]:
+                            received[order.id] = data[address]['total_received']
+
+        new, paid = [], []
+        for order in orders:
+            total = received.get(order.id)
+            if total is None:
+                continue
+            # Allocation records the baseline, unless the upstream was down or rejected the address.
+            if order.received_before is None:
+                order.received_before = total
+                new.append(order)
+            elif total - order.received_before >= order.amount:
+                paid.append(order.id)
+
+        Order.objects.bulk_update(new, ['received_before'], batch_size=UPDATE_BATCH)
+        now = timezone.now()
+        for start in range(0, len(paid), UPDATE_BATCH):
+            stats['paid'] += Order.objects.filter(id__in=paid[start:start + UPDATE_BATCH], status=Order.OPEN) \
+                .update(status=Order.PAID, paid=now)
+        stats['new'] = len(new)
+        stats['addresses_per_call'] = round(stats['addresses'] / stats['calls'], 2) if stats['calls'] else 0.0
+        self.adapt(stats)
+        stats['next_interval'] = self.interval
+        return stats
+
+    def adapt(self, stats):
+        if not stats['orders']:
+            self.interval = self.max_interval
+        elif stats['new'] or stats['paid']:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)